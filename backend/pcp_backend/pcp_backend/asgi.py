@@ -2,6 +2,9 @@
 ASGI config for pcp_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve through this entry point (e.g. ``uvicorn pcp_backend.asgi:application``)
+so the chat event stream (/api/projectchatstream/) runs without tying up a
+worker thread per open connection.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -96,6 +96,12 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',},
 ]
 
+# bcrypt hashing/checking runs in a dedicated process pool. Requests beyond
+# workers + queue depth are rejected with 429 instead of queueing.
+PASSWORD_HASHER_WORKERS = int(os.environ.get('PASSWORD_HASHER_WORKERS', 2))
+PASSWORD_HASHER_QUEUE_DEPTH = int(os.environ.get('PASSWORD_HASHER_QUEUE_DEPTH', 16))
+PASSWORD_HASH_ROUNDS = 12
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),  # or whatever you prefer
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -103,6 +109,66 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Background worker threads (bulk notification fan-out and other deferred jobs)
+BACKGROUND_WORKERS = 2
+BACKGROUND_TASKS_EAGER = False  # True runs jobs inline
+
+# Notifications: recipients per INSERT batch, and the broadcast size handed to a background worker
+NOTIFICATION_BATCH_SIZE = 1000
+NOTIFICATION_ASYNC_THRESHOLD = 500
+
+# Seconds a user's unread notification count stays cached (link changes invalidate it)
+UNREAD_COUNT_CACHE_TIMEOUT = 300
+
+# Background project deletion: rows deleted per transaction, and how long an unfinished job
+# may go without progress before resume_project_deletions picks it up again
+PROJECT_DELETION_BATCH_SIZE = 500
+PROJECT_DELETION_STALE_MINUTES = 10
+
+# Days of past due dates kept in the iCalendar feed
+CALENDAR_FEED_PAST_DAYS = 90
+
+# Caches (in-process LRU; swap for a shared backend when running several workers)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pcp-default',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Shared by every worker on the host without a cache server (select with PROJECT_CACHE_ALIAS=files).
+    # A DatabaseCache entry works the same way after `manage.py createcachetable`.
+    'files': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'files'),
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Cache holding project detail payloads (data keyed by project version, see project_cache),
+# and how long (seconds) an entry for a version may be kept
+PROJECT_CACHE_ALIAS = os.environ.get('PROJECT_CACHE_ALIAS', 'default')
+PROJECT_CACHE_TIMEOUT = 3600
+# How often (seconds) each worker process logs its own project cache hit/miss counts
+PROJECT_CACHE_STATS_INTERVAL = 300
+
+# /api/batch/: most sub-requests per batch, and threads running GET sub-requests concurrently
+BATCH_MAX_REQUESTS = 20
+BATCH_WORKERS = 4
+
+# Seconds a JWT -> User resolution stays cached (never longer than the token lifetime)
+AUTH_USER_CACHE_TIMEOUT = 300
+
+# Seconds a user's {project_id: role} membership map stays cached (UserProject changes invalidate it)
+MEMBERSHIP_CACHE_TIMEOUT = 300
+
+# Chat push (Server-Sent Events). 'memory' fans out within one process;
+# 'postgres' uses LISTEN/NOTIFY so every ASGI worker sees every message.
+CHAT_PUBSUB_BACKEND = os.environ.get('CHAT_PUBSUB_BACKEND', 'memory')
+CHAT_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+CHAT_STREAM_QUEUE_SIZE = 100  # undelivered messages per stream before it is dropped
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -156,6 +222,23 @@ mimetypes.add_type('application/vnd.ms-powerpoint', '.ppt')
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 FILE_UPLOAD_PERMISSIONS = 0o644
+# Same as Django's defaults, but uploads are SHA-256 hashed as they stream in (content-addressed storage)
+FILE_UPLOAD_HANDLERS = [
+    'pcp_webapp.blob_store.HashingMemoryFileUploadHandler',
+    'pcp_webapp.blob_store.HashingTemporaryFileUploadHandler',
+]
+
+# Document delivery. 'django' streams files from the worker; 'x-accel-redirect' (nginx)
+# and 'x-sendfile' (Apache/lighttpd) only check access and let the proxy send the bytes.
+# nginx example:
+#   location /protected-media/ { internal; alias /path/to/media/; }
+DOCUMENT_DELIVERY_MODE = os.environ.get('DOCUMENT_DELIVERY_MODE', 'django')
+DOCUMENT_ACCEL_REDIRECT_PREFIX = os.environ.get('DOCUMENT_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Resumable chunked uploads (/api/uploadsessions/)
+UPLOAD_SESSION_CHUNK_SIZE = 5 * 1024 * 1024  # largest chunk accepted per PUT
+UPLOAD_SESSION_MAX_SIZE = 1024 * 1024 * 1024  # 1GB
+UPLOAD_SESSION_TTL_HOURS = 24  # unfinished sessions idle this long are pruned
 
 # Security settings for file handling
 SECURE_CONTENT_TYPE_NOSNIFF = True
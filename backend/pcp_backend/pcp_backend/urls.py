@@ -13,7 +13,10 @@ from pcp_webapp.views import (
     CreateNotificationView, DeleteNotificationView, CompleteTaskView, GetFinalizedTasksView,
     GetTaskDetailsView, RemoveTaskMemberView, AddTaskMemberView, UploadDocumentView, GetProjectMeetingsView,
     CreateNotificationView, ResetPasswordView, DeleteProjectView, ChangeRoleView, AddMeetingView,
-    AddProjectLinkView, DeleteProjectLinkView, GetUserDetailsView, VerifySecurityAnswerView, GetUserMeetingsView,GetUserNotificationsView
+    AddProjectLinkView, DeleteProjectLinkView, GetUserDetailsView, VerifySecurityAnswerView, GetUserMeetingsView,GetUserNotificationsView,
+    project_chat_stream, UploadSessionView, UploadSessionDetailView, FinalizeUploadSessionView,
+    GetUnreadNotificationCountView, MarkNotificationsReadView, ProjectDeletionStatusView,
+    CalendarFeedUrlView, calendar_feed, BatchView
 )
 
 urlpatterns = [
@@ -25,6 +28,8 @@ urlpatterns = [
     path('api/getmembers/', GetMembersView.as_view(), name='getmembers'),
     path('api/addtask/', AddTaskView.as_view(), name='addtask'),
     path('api/calendar/', CalendarView.as_view(), name='calendar'),
+    path('api/calendar/feedurl/', CalendarFeedUrlView.as_view(), name='calendarfeedurl'),
+    path('api/calendar/feed.ics', calendar_feed, name='calendarfeed'),
     path('api/getusertasks/', GetUserTasksView.as_view(), name='getusertasks'),
     path('api/uploaddocument/', UploadDocumentView.as_view(), name='upload-document'),
     path('api/getprojecttasks/', GetProjectTasksView.as_view(), name='get-project-tasks'),
@@ -33,6 +38,9 @@ urlpatterns = [
     path('api/document-upload/', DocumentUploadView.as_view(), name='document_upload'),
     path('api/getprojectdata/', GetProjectDataView.as_view(), name='getprojectdata'),
     path('api/document-download/', DownloadDocumentView.as_view(), name='document_download'),
+    path('api/uploadsessions/', UploadSessionView.as_view(), name='uploadsessions'),
+    path('api/uploadsessions/<uuid:upload_id>/', UploadSessionDetailView.as_view(), name='uploadsessiondetail'),
+    path('api/uploadsessions/<uuid:upload_id>/finalize/', FinalizeUploadSessionView.as_view(), name='finalizeuploadsession'),
     path('api/deletetask/<int:task_id>/', DeleteTaskView.as_view(), name='deletetask'),
     path('api/updatetask/<int:task_id>/', ReviewTask.as_view(), name='review_task'),
     path('api/addprojectmember/', AddProjectUserView.as_view(), name='addmember'),
@@ -42,6 +50,7 @@ urlpatterns = [
     path('api/getfinalizedtasks/<int:requested_project_id>/', GetFinalizedTasksView.as_view(), name='getfinalizedtasks'),
     path('api/getprojectchat/', GetProjectChatView.as_view(), name='getprojectchat'),
     path('api/sendchatmessage/', SendChatMessageView.as_view(), name='sendchatmessage'),
+    path('api/projectchatstream/', project_chat_stream, name='projectchatstream'),
     path('api/updateprojectdetails/', UpdateProjectDetailsView.as_view(), name='updateprojectdetails'),
     path('api/updateprojectfeedback/', UpdateProjectFeedbackView.as_view(), name='updateprojectfeedback'),
     path('api/updateprofile/', UpdateProfileView.as_view(), name='updateprofile'),
@@ -54,6 +63,8 @@ urlpatterns = [
     path('api/addtaskmember/', AddTaskMemberView.as_view(), name="addtaskmember"),
     path('api/resetpassword/', ResetPasswordView.as_view(), name='resetpassword'),
     path('api/deleteproject/<int:project_id>/', DeleteProjectView.as_view(), name="deleteproject"),
+    path('api/projectdeletion/<uuid:job_id>/', ProjectDeletionStatusView.as_view(), name='projectdeletion'),
+    path('api/batch/', BatchView.as_view(), name='batch'),
     path('api/changerole/', ChangeRoleView.as_view(), name="changerole"),
     path('api/addprojectlink/', AddProjectLinkView.as_view(), name='addprojectlink'),
     path('api/deleteprojectlink/', DeleteProjectLinkView.as_view(), name='deleteprojectlink'),
@@ -63,6 +74,8 @@ urlpatterns = [
     path('api/getusermeetings/', GetUserMeetingsView.as_view(), name='getusermeetings'),
     path('api/getprojectlinks/', GetProjectLinksView.as_view(), name="getprojectlinks"),
     path('api/getusernotifications/', GetUserNotificationsView.as_view(), name='getusernotifications'),
+    path('api/unreadnotificationcount/', GetUnreadNotificationCountView.as_view(), name='unreadnotificationcount'),
+    path('api/marknotificationsread/', MarkNotificationsReadView.as_view(), name='marknotificationsread'),
     path('api/addmeeting/', AddMeetingView.as_view(), name='addmeeting'),
     path('api/getprojectmeetings/', GetProjectMeetingsView.as_view(), name='getprojectmeetings'),
 ]
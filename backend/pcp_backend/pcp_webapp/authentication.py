@@ -0,0 +1,88 @@
+import time
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.tokens import UntypedToken
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# How long (seconds) a resolved user is kept in the cache. Entries never outlive the token itself.
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+
+# Attribute used to memoise the resolved user on the underlying HttpRequest
+REQUEST_USER_ATTR = '_pcp_token_user'
+
+def _user_cache_key(token_id):
+    return f'auth:user:{token_id}'
+
+def _user_version_key(email):
+    return f'auth:user_version:{email}'
+
+def _current_user_version(email):
+    """Return the cache version for a user, creating one if it has not been set (or was evicted)"""
+    version_key = _user_version_key(email)
+    cache.add(version_key, time.time_ns(), None)
+    return cache.get(version_key)
+
+def get_bearer_token(request, allow_query_param=False):
+    """Return the raw JWT from the Authorization header (or ?token= when allowed)"""
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    if allow_query_param:
+        return request.GET.get('token')
+    return None
+
+def resolve_user(token):
+    """
+    Validate a JWT and return the matching User.
+    Raises InvalidToken for bad or expired tokens and User.DoesNotExist for unknown users.
+    Resolved users are cached by token id (jti) until the token expires or the user changes.
+    """
+    try:
+        payload = UntypedToken(token).payload
+    except TokenError as e:
+        raise InvalidToken(str(e))
+
+    user_email = payload.get('user_email')
+    token_id = payload.get('jti')
+    if not token_id:
+        return User.objects.get(email=user_email)
+
+    cache_key = _user_cache_key(token_id)
+    version = _current_user_version(user_email)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        cached_version, cached_user = cached
+        if cached_version == version and cached_user.email == user_email:
+            return cached_user
+
+    user = User.objects.get(email=user_email)
+    timeout = min(USER_CACHE_TIMEOUT, int(payload.get('exp', 0) - time.time()))
+    if timeout > 0:
+        cache.set(cache_key, (version, user), timeout)
+    return user
+
+def invalidate_user(email):
+    """Drop every cached token resolution for this user (e.g. after a profile or password change)"""
+    cache.set(_user_version_key(email), time.time_ns(), None)
+
+# Helper function to extract user from JWT token
+def get_user_from_token(request, allow_query_param=False):
+    """Helper function to extract user from JWT token, memoised for the lifetime of the request"""
+    http_request = getattr(request, '_request', request)
+    if hasattr(http_request, REQUEST_USER_ATTR):
+        return getattr(http_request, REQUEST_USER_ATTR)
+
+    user = None
+    token = get_bearer_token(request, allow_query_param=allow_query_param)
+    if token:
+        try:
+            user = resolve_user(token)
+        except (InvalidToken, User.DoesNotExist) as e:
+            logger.warning(f"Token validation failed: {e}")
+
+    setattr(http_request, REQUEST_USER_ATTR, user)
+    return user
@@ -0,0 +1,41 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+def _get_executor():
+    """Create the worker threads lazily so every server process gets its own"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+                thread_name_prefix='pcp-background',
+            )
+        return _executor
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Background job {fn.__name__} failed: {str(e)}")
+        raise
+    finally:
+        close_old_connections()
+
+def submit(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) on a background worker thread with its own DB connection.
+    Call it from transaction.on_commit when the job reads rows written by the request.
+    With BACKGROUND_TASKS_EAGER the job runs inline instead (tests, management commands).
+    """
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        return fn(*args, **kwargs)
+    return _get_executor().submit(_run, fn, args, kwargs)
@@ -0,0 +1,159 @@
+"""
+Batched API calls (/api/batch/).
+
+A batch is a list of sub-requests to existing /api/ routes, e.g. everything the project
+page loads when it opens. The caller is authenticated once: every sub-request carries the
+resolved user (see authentication.REQUEST_USER_ATTR) and the user's membership map is loaded
+into the cache before dispatch. Consecutive GET sub-requests do not depend on each other and
+run concurrently on BATCH_WORKERS threads, each with its own database connection; any other
+method runs alone, in request order, after everything before it has finished.
+"""
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from django.urls import resolve, Resolver404
+from .authentication import REQUEST_USER_ATTR
+from .membership import get_memberships
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = '/api/batch/'
+CONCURRENT_METHODS = {'GET', 'HEAD'}
+ALLOWED_METHODS = CONCURRENT_METHODS | {'POST', 'PUT', 'PATCH', 'DELETE'}
+# Request headers copied from the batch onto every sub-request; sub-requests may only add If-None-Match
+SHARED_HEADERS = ('HTTP_AUTHORIZATION', 'HTTP_HOST', 'HTTP_USER_AGENT', 'HTTP_ACCEPT_LANGUAGE', 'SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR')
+# Response headers returned with each sub-response
+RETURNED_HEADERS = ('ETag', 'Cache-Control', 'X-Cache', 'Location')
+
+class BatchError(ValueError):
+    """The batch itself is malformed (the whole request is rejected with 400)"""
+
+_executor = None
+_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BATCH_WORKERS', 4),
+                thread_name_prefix='pcp-batch',
+            )
+        return _executor
+
+def parse_batch(data):
+    """Validated [(id, method, path, query, if_none_match, body)] from the batch payload; raises BatchError"""
+    items = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BatchError('requests must be a non-empty list')
+    max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+    if len(items) > max_requests:
+        raise BatchError(f'A batch may contain at most {max_requests} requests')
+
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('url'), str):
+            raise BatchError(f'Request {index} needs a url')
+        method = str(item.get('method', 'GET')).upper()
+        if method not in ALLOWED_METHODS:
+            raise BatchError(f'Request {index}: method {method} is not allowed')
+        url = urlsplit(item['url'])
+        if url.scheme or url.netloc or not url.path.startswith('/api/') or url.path == BATCH_PATH:
+            raise BatchError(f'Request {index}: only /api/ routes other than {BATCH_PATH} can be batched')
+        headers = item.get('headers') or {}
+        if_none_match = headers.get('If-None-Match') if isinstance(headers, dict) else None
+        parsed.append((item.get('id', index), method, url.path, url.query, if_none_match, item.get('body')))
+    return parsed
+
+def _sub_request(request, user, method, path, query, if_none_match, body):
+    sub = HttpRequest()
+    sub.method = method
+    sub.path = sub.path_info = path
+    sub.META = {key: request.META[key] for key in SHARED_HEADERS if key in request.META}
+    sub.META.update(REQUEST_METHOD=method, PATH_INFO=path, QUERY_STRING=query)
+    sub.META['wsgi.url_scheme'] = request.scheme
+    if if_none_match:
+        sub.META['HTTP_IF_NONE_MATCH'] = if_none_match
+    sub.GET = QueryDict(query)
+    payload = json.dumps(body).encode() if body is not None else b''
+    if payload:
+        sub.META.update(CONTENT_TYPE='application/json', CONTENT_LENGTH=str(len(payload)))
+    sub._stream = io.BytesIO(payload)
+    sub._read_started = False
+    sub._dont_enforce_csrf_checks = True
+    # The batch already authenticated the caller
+    setattr(sub, REQUEST_USER_ATTR, user)
+    return sub
+
+def _decode(response):
+    if response.status_code == 304 or not response.content:
+        return None
+    if 'json' in response.get('Content-Type', ''):
+        return json.loads(response.content)
+    return response.content.decode(response.charset or 'utf-8', errors='replace')
+
+def _dispatch(request, user, item):
+    request_id, method, path, query, if_none_match, body = item
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {'id': request_id, 'status': 404, 'body': {'error': 'Not found'}}
+    if iscoroutinefunction(match.func):
+        return {'id': request_id, 'status': 400, 'body': {'error': 'Async views cannot be batched'}}
+
+    sub = _sub_request(request, user, method, path, query, if_none_match, body)
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        if response.streaming:
+            response.close()
+            return {'id': request_id, 'status': 400, 'body': {'error': 'Streaming responses cannot be batched'}}
+        return {
+            'id': request_id,
+            'status': response.status_code,
+            'headers': {name: response[name] for name in RETURNED_HEADERS if response.has_header(name)},
+            'body': _decode(response),
+        }
+    except Exception as e:
+        logger.error(f"Batched request {method} {path} failed: {str(e)}")
+        return {'id': request_id, 'status': 500, 'body': {'error': str(e)}}
+
+def _dispatch_in_worker(request, user, item):
+    close_old_connections()
+    try:
+        return _dispatch(request, user, item)
+    finally:
+        close_old_connections()
+
+def run_batch(request, user, items):
+    """Responses for the parsed sub-requests, in request order"""
+    get_memberships(user)  # One membership load shared by every sub-request's access check
+
+    results = []
+    workers = getattr(settings, 'BATCH_WORKERS', 4)
+    group = []
+
+    def flush():
+        if len(group) > 1 and workers > 1:
+            results.extend(_get_executor().map(lambda item: _dispatch_in_worker(request, user, item), group))
+        else:
+            results.extend(_dispatch(request, user, item) for item in group)
+        group.clear()
+
+    for item in items:
+        if item[1] in CONCURRENT_METHODS:
+            group.append(item)
+            continue
+        flush()
+        results.append(_dispatch(request, user, item))
+    flush()
+    return results
@@ -0,0 +1,118 @@
+"""
+Content-addressed document storage.
+
+Uploads are SHA-256 hashed while they stream in (see the upload handlers below,
+enabled through settings.FILE_UPLOAD_HANDLERS). Each distinct content is written
+once under blobs/ab/cd/<sha256> as a DocumentBlob, and Document rows (and task
+uploads, through UploadedDocument.blob) reference it; the blob (and its file) is
+deleted when the last reference goes.
+"""
+import os
+import shutil
+import hashlib
+import logging
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from .models import Document, DocumentBlob, blob_upload_to
+
+logger = logging.getLogger(__name__)
+
+class HashingMemoryFileUploadHandler(MemoryFileUploadHandler):
+    """MemoryFileUploadHandler that also records the upload's SHA-256 as file.sha256"""
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.activated:
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """TemporaryFileUploadHandler that also records the upload's SHA-256 as file.sha256"""
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+def file_sha256(file):
+    """Digest recorded by the upload handlers, or computed by reading the file in chunks"""
+    digest = getattr(file, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+def store_blob(file):
+    """
+    Return the DocumentBlob holding this content, writing it to storage only when it is new.
+    Call inside a transaction and create the referencing Document in the same one:
+    the blob row stays locked so a concurrent release cannot delete it in between.
+    """
+    digest = file_sha256(file)
+    blob = DocumentBlob.objects.select_for_update().filter(sha256=digest).first()
+    if blob is not None:
+        if not blob.file.storage.exists(blob.file.name):
+            logger.error(f"Blob {digest} is missing from storage, rewriting it")
+            blob.file.save(digest, file, save=True)
+        return blob
+
+    blob = DocumentBlob(sha256=digest, size=file.size)
+    name = blob_upload_to(blob, file.name)
+    if blob.file.storage.exists(name):
+        # Left behind by an interrupted upload; the content is identical by construction
+        blob.file.name = name
+    else:
+        blob.file.save(digest, file, save=False)
+    try:
+        with transaction.atomic():
+            blob.save(force_insert=True)
+    except IntegrityError:
+        # A concurrent upload of the same content won the race
+        if blob.file.name != name:
+            blob.file.storage.delete(blob.file.name)
+        blob = DocumentBlob.objects.select_for_update().get(sha256=digest)
+    return blob
+
+def create_document(file, **fields):
+    """Create a Document whose file is the shared blob for this upload's content"""
+    with transaction.atomic():
+        blob = store_blob(file)
+        return Document.objects.create(file=blob.file.name, blob=blob, **fields)
+
+def release_blob(sha256):
+    """Delete a blob (django_cleanup removes its file) once no Document or task upload references it"""
+    with transaction.atomic():
+        blob = DocumentBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is None or blob.documents.exists() or blob.uploads.exists():
+            return False
+        blob.delete()
+    return True
+
+def link_blob(blob, path):
+    """Expose a blob at a filesystem path as a hard link (a copy where links are unsupported)"""
+    if os.path.lexists(path):
+        os.remove(path)
+    try:
+        os.link(blob.file.path, path)
+    except OSError:
+        shutil.copyfile(blob.file.path, path)
@@ -0,0 +1,161 @@
+"""
+Calendar events (project and task due dates) for CalendarView and the iCalendar feed.
+
+Each user has a calendar version (a UserCalendar row, shared by every worker),
+bumped by the signals whenever one of their projects, tasks, memberships or
+assignments changes. Responses carry an ETag derived from it, so clients
+re-polling an unchanged calendar get a 304 after a single version lookup. The .ics feed authenticates with a signed key in its URL
+(calendar clients cannot send the Bearer header); the key includes the user's
+current feed secret, so rotating the secret revokes every URL issued before.
+"""
+import time
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core import signing
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from .models import UserProject, User_Task, UserCalendar
+
+FEED_SALT = 'pcp_webapp.calendar_feed'
+
+def calendar_version(email):
+    """Current calendar version of a user (the time_ns stamp of their last calendar change, 0 before any)"""
+    return UserCalendar.objects.filter(user_id=email).values_list('version', flat=True).first() or 0
+
+def bump_calendar_versions(emails):
+    """
+    Move the users' calendar versions forward inside the writing transaction: to now, or
+    by one when that is not later (clock skew between workers must never repeat a version).
+    """
+    emails = list(dict.fromkeys(emails))
+    if not emails:
+        return
+    UserCalendar.objects.bulk_create([UserCalendar(user_id=email) for email in emails], ignore_conflicts=True)
+    UserCalendar.objects.filter(user_id__in=emails).update(version=Greatest(F('version') + 1, Value(time.time_ns())))
+
+def calendar_etag(email, version, *parts):
+    """Weak ETag for one representation (window, format) of the user's calendar at a version"""
+    digest = hashlib.sha1(':'.join(str(part) for part in (email, version, *parts)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def calendar_events(user, start=None, end=None):
+    """
+    Project and task events with a due date between start and end (inclusive, either optional),
+    read as plain values from two joined queries that can use the due-date indexes.
+    """
+    projects = UserProject.objects.filter(email=user, project_id__is_deleted=False)
+    tasks = User_Task.objects.filter(email=user, task_id__project_id__is_deleted=False)
+    if start:
+        projects = projects.filter(project_id__due_date__gte=start)
+        tasks = tasks.filter(task_id__task_due_date__gte=start)
+    if end:
+        projects = projects.filter(project_id__due_date__lte=end)
+        tasks = tasks.filter(task_id__task_due_date__lte=end)
+
+    project_events = [
+        {
+            'title': f"Project: {row['project_id__project_name']}",
+            'start': row['project_id__due_date'].isoformat(),
+            'type': 'project',
+            'id': row['project_id'],
+            'name': row['project_id__project_name'],
+            'description': row['project_id__project_description'] or '',
+            'grade': row['project_id__grade'],
+            'role': row['role']
+        }
+        for row in projects.values(
+            'role', 'project_id', 'project_id__project_name', 'project_id__due_date',
+            'project_id__project_description', 'project_id__grade'
+        )
+    ]
+    task_events = [
+        {
+            'title': f"Task: {row['task_id__task_name']}",
+            'start': row['task_id__task_due_date'].isoformat(),
+            'type': 'task',
+            'id': row['task_id'],
+            'name': row['task_id__task_name'],
+            'description': row['task_id__task_description'] or '',
+            'status': row['task_id__task_status'],
+            'priority': row['task_id__task_priority'],
+            'project': {
+                'id': row['task_id__project_id'],
+                'name': row['task_id__project_id__project_name']
+            }
+        }
+        for row in tasks.values(
+            'task_id', 'task_id__task_name', 'task_id__task_due_date', 'task_id__task_description',
+            'task_id__task_status', 'task_id__task_priority', 'task_id__project_id', 'task_id__project_id__project_name'
+        )
+    ]
+    return project_events + task_events
+
+def _feed_secret(email):
+    """The user's feed secret, created on first use"""
+    UserCalendar.objects.get_or_create(user_id=email)
+    UserCalendar.objects.filter(user_id=email, feed_secret='').update(feed_secret=secrets.token_urlsafe(32))
+    return UserCalendar.objects.filter(user_id=email).values_list('feed_secret', flat=True).get()
+
+def feed_key(user):
+    """Signed key identifying the user (and their current feed secret) in their .ics feed URL"""
+    return signing.dumps([user.email, _feed_secret(user.email)], salt=FEED_SALT, compress=True)
+
+def rotate_feed_key(user):
+    """Give the user a new feed secret: every feed URL issued before stops working"""
+    UserCalendar.objects.get_or_create(user_id=user.email)
+    UserCalendar.objects.filter(user_id=user.email).update(feed_secret=secrets.token_urlsafe(32))
+
+def feed_calendar(key):
+    """UserCalendar (with its user) the feed key was issued for, or None when it is invalid or revoked"""
+    try:
+        email, secret = signing.loads(key, salt=FEED_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if not secret:
+        return None
+    return UserCalendar.objects.select_related('user').filter(user_id=email, feed_secret=secret).first()
+
+def feed_window(today):
+    """First due date included in the feed: CALENDAR_FEED_PAST_DAYS before today"""
+    return today - timedelta(days=getattr(settings, 'CALENDAR_FEED_PAST_DAYS', 90))
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+def _fold(line):
+    # RFC 5545: content lines longer than 75 octets continue on lines starting with a space
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # Never split a UTF-8 sequence
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+def render_ics(events, version):
+    """iCalendar document with one all-day VEVENT per event; DTSTAMP is the calendar version time"""
+    stamp = datetime.fromtimestamp(version / 1e9, tz=dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Project Collaboration Portal//Calendar//EN',
+             'CALSCALE:GREGORIAN', 'X-WR-CALNAME:Project Collaboration Portal']
+    for event in events:
+        day = datetime.strptime(event['start'], '%Y-%m-%d').date()
+        summary = event['title'] if event['type'] == 'project' else f"{event['title']} ({event['project']['name']})"
+        lines += [
+            'BEGIN:VEVENT',
+            f"UID:{event['type']}-{event['id']}@pcp",
+            f'DTSTAMP:{stamp}',
+            f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}",
+            f'SUMMARY:{_escape(summary)}',
+            f"DESCRIPTION:{_escape(event['description'])}",
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
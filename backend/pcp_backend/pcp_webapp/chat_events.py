@@ -0,0 +1,200 @@
+"""
+Push delivery of project chat messages over Server-Sent Events.
+
+SendChatMessageView publishes every new message through the configured backend.
+Streams opened on /api/projectchatstream/ subscribe to the in-process ChatHub,
+which fans each message out to one asyncio queue per open connection.
+
+Backends (settings.CHAT_PUBSUB_BACKEND):
+  'memory'   - publish straight into this process's hub (single ASGI worker)
+  'postgres' - publish with pg_notify; every worker runs a LISTEN thread that
+               feeds its own hub, so subscribers on any worker get the message
+"""
+import json
+import time
+import select
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.db import connection, close_old_connections
+
+logger = logging.getLogger(__name__)
+
+SAST = ZoneInfo('Africa/Johannesburg')
+
+def serialize_chat_message(msg):
+    """Chat message payload shared by GetProjectChatView and the event stream"""
+    return {
+        'id': msg.chat_message_id,
+        'sender_email': msg.email.email,
+        'sender_name': f"{msg.email.first_name} {msg.email.last_name}",
+        'content': msg.content,
+        'sent_at': msg.sent_at.astimezone(SAST).strftime('%Y-%m-%d %H:%M:%S'),  # Converted to SAST
+        'role': msg.Role
+    }
+
+class Subscription:
+    """One open stream: a bounded queue living on the event loop that serves the connection"""
+
+    def __init__(self, project_id, loop, maxsize):
+        self.project_id = project_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def push(self, payload):
+        # Runs on self.loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Slow consumer: end its stream; the client reconnects with Last-Event-ID and catches up
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        return await self.queue.get()
+
+class ChatHub:
+    """In-process pub/sub keyed by project id"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, project_id):
+        subscription = Subscription(
+            int(project_id),
+            asyncio.get_running_loop(),
+            getattr(settings, 'CHAT_STREAM_QUEUE_SIZE', 100),
+        )
+        with self._lock:
+            self._subscribers[subscription.project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.project_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.project_id]
+
+    def subscriber_count(self, project_id=None):
+        with self._lock:
+            if project_id is not None:
+                return len(self._subscribers.get(int(project_id), ()))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, project_id, payload):
+        """Deliver a payload to every local subscriber of the project. Safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(int(project_id), ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, payload)
+            except RuntimeError:
+                # Event loop already closed; the connection is gone
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+hub = ChatHub()
+
+class MemoryBackend:
+    def publish(self, project_id, payload):
+        hub.publish(project_id, payload)
+
+    def ensure_listening(self):
+        pass
+
+class PostgresNotifyBackend:
+    channel = 'pcp_chat'
+    # NOTIFY payloads are capped at 8000 bytes; larger messages are sent by id and loaded by the listener
+    max_payload = 7500
+
+    def __init__(self):
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, project_id, payload):
+        body = json.dumps({'project_id': int(project_id), 'message': payload})
+        if len(body.encode('utf-8')) > self.max_payload:
+            body = json.dumps({'project_id': int(project_id), 'message_id': payload['id']})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, body])
+
+    def ensure_listening(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen_forever, name='pcp-chat-listener', daemon=True)
+                self._listener.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"Chat LISTEN connection failed, retrying: {str(e)}")
+                time.sleep(2)
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        db = settings.DATABASES['default']
+        conn = psycopg2.connect(
+            dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'],
+            host=db['HOST'], port=db['PORT'],
+        )
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel}')
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._dispatch(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def _dispatch(self, raw):
+        data = json.loads(raw)
+        payload = data.get('message')
+        if payload is None:
+            from .models import ChatMessage
+            close_old_connections()
+            msg = ChatMessage.objects.select_related('email').filter(chat_message_id=data['message_id']).first()
+            if msg is None:
+                return
+            payload = serialize_chat_message(msg)
+        hub.publish(data['project_id'], payload)
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if getattr(settings, 'CHAT_PUBSUB_BACKEND', 'memory') == 'postgres':
+            _backend = PostgresNotifyBackend()
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+def publish_chat_message(project_id, msg):
+    """Publish a saved ChatMessage to every stream subscribed to the project"""
+    try:
+        get_backend().publish(project_id, serialize_chat_message(msg))
+    except Exception as e:
+        # Streams are best effort; polling clients still see the message
+        logger.error(f"Failed to publish chat message {msg.chat_message_id}: {str(e)}")
+
+def format_event(payload):
+    return f"id: {payload['id']}\nevent: message\ndata: {json.dumps(payload)}\n\n"
@@ -0,0 +1,102 @@
+import threading
+from contextlib import contextmanager
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Project, Task, ProjectTaskCounter
+
+COUNTER_FIELDS = ['total_tasks', 'completed_tasks', 'finalized_tasks', 'overdue_tasks']
+
+_state = threading.local()
+
+@contextmanager
+def counters_suspended():
+    """Skip per-task counter refreshes, e.g. while a whole project is being deleted"""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+def counters_are_suspended():
+    return getattr(_state, 'suspended', False)
+
+def _count_aggregates(today):
+    return {
+        'total_tasks': Count('task_id'),
+        'completed_tasks': Count('task_id', filter=Q(task_status='Completed')),
+        'finalized_tasks': Count('task_id', filter=Q(task_status='Finalized')),
+        'overdue_tasks': Count('task_id', filter=Q(task_due_date__lt=today) & ~Q(task_status__in=['Completed', 'Finalized'])),
+    }
+
+def refresh_project_counters(project_id, create=True):
+    """Recount one project's tasks and store the result. Returns the counter row (or None)."""
+    today = timezone.localdate()
+    counts = Task.objects.filter(project_id=project_id).aggregate(**_count_aggregates(today))
+    counts['counted_on'] = today
+    if not create:
+        ProjectTaskCounter.objects.filter(project_id=project_id).update(**counts)
+        return None
+    counter, _ = ProjectTaskCounter.objects.update_or_create(project_id=project_id, defaults=counts)
+    return counter
+
+def _cached_counter(project):
+    try:
+        return project.task_counter
+    except ProjectTaskCounter.DoesNotExist:
+        return None
+
+def get_project_counters(project):
+    """Return the counters of a project, building them on first use or when the overdue count is from an earlier day"""
+    counter = _cached_counter(project)
+    if counter is None or counter.counted_on != timezone.localdate():
+        counter = refresh_project_counters(project.pk)
+    return counter
+
+def _rebuild_counters(project_ids, today, tasks=None):
+    """Recount the tasks of the given projects with one grouped query and upsert their counters"""
+    if tasks is None:
+        tasks = Task.objects.filter(project_id__in=project_ids)
+    grouped = {
+        row['project_id']: row
+        for row in tasks.values('project_id').annotate(**_count_aggregates(today)).order_by()
+    }
+    counters = [
+        ProjectTaskCounter(
+            project_id=project_id,
+            counted_on=today,
+            **{field: grouped.get(project_id, {}).get(field, 0) for field in COUNTER_FIELDS}
+        )
+        for project_id in project_ids
+    ]
+    ProjectTaskCounter.objects.bulk_create(
+        counters,
+        update_conflicts=True,
+        unique_fields=['project'],
+        update_fields=COUNTER_FIELDS + ['counted_on'],
+        batch_size=1000,
+    )
+    return counters
+
+def refresh_stale_counters(projects):
+    """
+    Recount, together, the projects whose counters are missing or from an earlier day (the
+    overdue count moves with the date), so the first dashboard load of a day costs two queries
+    instead of one aggregate per project. Pass projects with task_counter already selected.
+    """
+    today = timezone.localdate()
+    stale = []
+    for project in projects:
+        counter = _cached_counter(project)
+        if counter is None or counter.counted_on != today:
+            stale.append(project)
+    if not stale:
+        return
+    counters = {counter.project_id: counter for counter in _rebuild_counters([project.pk for project in stale], today)}
+    for project in stale:
+        project.task_counter = counters[project.pk]
+
+def rebuild_all_counters():
+    """Recompute every project's counters with one grouped query. Returns the number of projects."""
+    project_ids = list(Project.objects.values_list('project_id', flat=True))
+    return len(_rebuild_counters(project_ids, timezone.localdate(), tasks=Task.objects.all()))
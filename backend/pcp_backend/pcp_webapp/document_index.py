@@ -0,0 +1,109 @@
+"""
+Database index of the files under media/documents/<email>/.
+
+upload_document and upload_task_document still write their JSON sidecars, but
+every sidecar is also recorded as an UploadedDocument row, and the listing
+endpoints read those rows instead of walking directories.
+import_sidecars() backfills the index from existing media.
+"""
+import os
+import json
+import logging
+from django.conf import settings
+from django.db import transaction
+from .models import User, Task, UploadedDocument
+from .blob_store import release_blob
+
+logger = logging.getLogger(__name__)
+
+def _task_or_none(task_id):
+    try:
+        return Task.objects.filter(task_id=int(task_id)).first()
+    except (TypeError, ValueError):
+        return None
+
+def index_upload(user, metadata, metadata_path):
+    """Record an upload_document file from its `_metadata.json` sidecar contents"""
+    file_path = metadata.get('file_path', '')
+    document, _ = UploadedDocument.objects.update_or_create(
+        file_path=file_path,
+        defaults={
+            'email': user,
+            'source': 'upload',
+            'metadata_path': metadata_path,
+            'filename': os.path.basename(file_path),
+            'title': metadata.get('title') or '',
+            'description': metadata.get('description') or '',
+            'file_size': metadata.get('file_size') or 0,
+            'file_type': metadata.get('file_type') or '',
+            'upload_date': metadata.get('upload_date') or '',
+            'uploader': metadata.get('uploaded_by') or user.email,
+        },
+    )
+    return document
+
+def index_task_upload(user, filename, metadata, metadata_path, blob=None):
+    """
+    Record an upload_task_document file from its `<filename>.json` sidecar contents.
+    blob is the DocumentBlob the file is linked to; a blob the row referenced before
+    (the same filename uploaded with other content) is released after commit.
+    """
+    file_path = f'documents/{user.email}/{filename}'
+    previous = UploadedDocument.objects.filter(file_path=file_path).values_list('blob_id', flat=True).first()
+    blob_fields = {'blob': blob} if blob is not None else {}
+    document, _ = UploadedDocument.objects.update_or_create(
+        file_path=file_path,
+        defaults={
+            **blob_fields,
+            'email': user,
+            'source': 'task',
+            'task_id': _task_or_none(metadata.get('task_id')),
+            'metadata_path': metadata_path,
+            'filename': filename,
+            'title': metadata.get('title') or filename,
+            'description': metadata.get('description') or '',
+            'file_size': metadata.get('size') or 0,
+            'file_type': metadata.get('type') or '',
+            'upload_date': metadata.get('upload_date') or '',
+            'uploader': metadata.get('uploader') or user.email,
+        },
+    )
+    if previous and blob is not None and previous != blob.sha256:
+        transaction.on_commit(lambda: release_blob(previous))
+    return document
+
+def import_sidecars(media_root=None):
+    """Index every sidecar under media_root/documents; returns the number of files indexed"""
+    documents_dir = os.path.join(media_root or settings.MEDIA_ROOT, 'documents')
+    if not os.path.isdir(documents_dir):
+        return 0
+
+    count = 0
+    for email in sorted(os.listdir(documents_dir)):
+        user_dir = os.path.join(documents_dir, email)
+        if not os.path.isdir(user_dir):
+            continue
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            logger.warning(f"Skipping {user_dir}: no user {email}")
+            continue
+
+        filenames = set(os.listdir(user_dir))
+        for filename in sorted(filenames):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(user_dir, filename), 'r') as f:
+                    metadata = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Error reading metadata file {filename}: {str(e)}")
+                continue
+
+            metadata_path = f'documents/{email}/{filename}'
+            if filename.endswith('_metadata.json'):
+                index_upload(user, metadata, metadata_path)
+                count += 1
+            elif filename[:-len('.json')] in filenames:
+                index_task_upload(user, filename[:-len('.json')], metadata, metadata_path)
+                count += 1
+    return count
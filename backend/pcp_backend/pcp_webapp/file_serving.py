@@ -0,0 +1,139 @@
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+# Bytes read per iteration when streaming a file; memory per download stays at about this size
+STREAM_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def file_chunks(file_obj, start=0, length=None, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield up to `length` bytes of an open file from `start`, one chunk at a time, then close it"""
+    try:
+        file_obj.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = file_obj.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        file_obj.close()
+
+def parse_range(header, size):
+    """
+    Parse a single-range "bytes=" header into (start, end) inclusive.
+    Returns None when the header should be ignored (missing, malformed or multi-range)
+    and raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+def not_modified(request, etag, last_modified):
+    """True when the client's cached copy (If-None-Match / If-Modified-Since) is still current"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag is not None and (if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')])
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return bool(if_modified_since and last_modified and int(last_modified.timestamp()) <= if_modified_since)
+
+def offload_response(name, content_type, storage=default_storage):
+    """
+    Empty response telling the front proxy to send the file itself (DOCUMENT_DELIVERY_MODE).
+    Returns None when delivery stays in Django or the storage has no local path.
+    """
+    mode = getattr(settings, 'DOCUMENT_DELIVERY_MODE', 'django')
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'DOCUMENT_ACCEL_REDIRECT_PREFIX', '/protected-media/').rstrip('/')
+        header, value = 'X-Accel-Redirect', f"{prefix}/{quote(name.lstrip('/'))}"
+    elif mode == 'x-sendfile':
+        try:
+            header, value = 'X-Sendfile', storage.path(name)
+        except (AttributeError, NotImplementedError):
+            return None
+    else:
+        return None
+    response = HttpResponse(content_type=content_type)
+    response[header] = value
+    return response
+
+def stream_file(request, file, content_type, filename, disposition='attachment', last_modified=None, etag=None, name=None):
+    """
+    Serve a stored file as a constant-memory stream with HTTP Range (206) and conditional GET (304) support,
+    or hand it to the front proxy when an offloaded DOCUMENT_DELIVERY_MODE is configured.
+    `file` is a Django File/FieldFile; `name` is its storage name when `file` is not a FieldFile;
+    `etag` is an unquoted validator string.
+    """
+    etag = quote_etag(etag) if etag else None
+    validators = {}
+    if etag:
+        validators['ETag'] = etag
+    if last_modified:
+        validators['Last-Modified'] = http_date(last_modified.timestamp())
+
+    if not_modified(request, etag, last_modified):
+        file.close()
+        response = HttpResponse(status=304)
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    response = offload_response(name or file.name, content_type, getattr(file, 'storage', default_storage))
+    if response is not None:
+        # The proxy handles Range requests against the real file
+        file.close()
+        response['Content-Disposition'] = f'{disposition}; filename="{filename}"; filename*=UTF-8\'\'{filename}'
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    size = file.size
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    # A stale If-Range means "send me the whole (new) file"
+    if not if_range or if_range.strip() in (etag, validators.get('Last-Modified')):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file.open('rb')
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(file_chunks(file, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = StreamingHttpResponse(file_chunks(file), content_type=content_type)
+        response['Content-Length'] = size
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'{disposition}; filename="{filename}"; filename*=UTF-8\'\'{filename}'
+    for header, value in validators.items():
+        response[header] = value
+    return response
@@ -0,0 +1,74 @@
+import bcrypt
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+class HashingPoolBusy(Exception):
+    """Raised when the password hashing pool and its queue are full"""
+
+def busy_response(message='Server is busy, please try again'):
+    """429 response for a request turned away by HashingPoolBusy; clients retry after a second"""
+    return Response({'error': message}, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': '1'})
+
+# Worker functions (run inside the pool processes)
+def _hashpw(value, rounds):
+    return bcrypt.hashpw(value.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _checkpw(value, hashed):
+    return bcrypt.checkpw(value.encode('utf-8'), hashed.encode('utf-8'))
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+def _get_pool():
+    """Create the process pool lazily so every server worker gets its own"""
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, 'PASSWORD_HASHER_WORKERS', 2)
+            queue_depth = getattr(settings, 'PASSWORD_HASHER_QUEUE_DEPTH', 16)
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _slots = threading.BoundedSemaphore(workers + queue_depth)
+        return _executor, _slots
+
+def shutdown_pool():
+    """Stop the pool; the next hash/check call starts a fresh one"""
+    global _executor, _slots
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor, _slots = None, None
+
+def _run(fn, *args):
+    executor, slots = _get_pool()
+    # Admission control: reject straight away instead of queueing behind a login burst
+    if not slots.acquire(blocking=False):
+        raise HashingPoolBusy()
+    try:
+        future = executor.submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        logger.error("Password hashing pool crashed, restarting it")
+        shutdown_pool()
+        raise
+
+def hash_password(value):
+    """bcrypt-hash a password (or security answer) in the hashing pool"""
+    return _run(_hashpw, value, getattr(settings, 'PASSWORD_HASH_ROUNDS', 12))
+
+def check_password(value, hashed):
+    """Check a value against a stored bcrypt hash in the hashing pool"""
+    return _run(_checkpw, value, hashed)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.core.files.storage import default_storage
+from pcp_webapp.models import Document, DocumentBlob, UploadedDocument
+from pcp_webapp.blob_store import store_blob, release_blob, file_sha256
+
+class Command(BaseCommand):
+    help = 'Move documents stored before content addressing into shared blobs and drop unreferenced blobs'
+
+    def handle(self, *args, **options):
+        moved = 0
+        for document in Document.objects.filter(blob__isnull=True).exclude(file='').iterator():
+            storage, old_name = document.file.storage, document.file.name
+            if not storage.exists(old_name):
+                self.stderr.write(f'Skipping document {document.document_id}: {old_name} is missing')
+                continue
+            with transaction.atomic():
+                with document.file.open('rb') as f:
+                    blob = store_blob(f)
+                # update() keeps date_time_last_modified (and so download ETags) unchanged
+                Document.objects.filter(pk=document.pk).update(file=blob.file.name, blob=blob)
+                transaction.on_commit(lambda name=old_name: storage.delete(name))
+            moved += 1
+
+        # Task uploads stored before they referenced their blob: link them by content first,
+        # so the blob they are hard-linked to is not pruned below
+        linked = 0
+        for upload in UploadedDocument.objects.filter(source='task', blob__isnull=True).iterator():
+            if not default_storage.exists(upload.file_path):
+                continue
+            with default_storage.open(upload.file_path, 'rb') as f:
+                digest = file_sha256(f)
+            if DocumentBlob.objects.filter(sha256=digest).exists():
+                linked += UploadedDocument.objects.filter(pk=upload.pk).update(blob_id=digest)
+
+        pruned = sum(
+            release_blob(sha256)
+            for sha256 in DocumentBlob.objects.filter(documents__isnull=True, uploads__isnull=True).values_list('sha256', flat=True)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} documents into blobs, linked {linked} task uploads, removed {pruned} unreferenced blobs'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from pcp_webapp.document_index import import_sidecars
+
+class Command(BaseCommand):
+    help = 'Backfill the UploadedDocument index from the JSON sidecars under MEDIA_ROOT/documents'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = import_sidecars()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} documents'))
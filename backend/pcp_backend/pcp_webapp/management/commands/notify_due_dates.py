@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from pcp_webapp.utils import notify_due_dates
+
+class Command(BaseCommand):
+    help = 'Notify members of projects and tasks due within the next few days; safe to run repeatedly (e.g. daily from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Notify for due dates up to this many days ahead')
+
+    def handle(self, *args, **options):
+        notifications, links = notify_due_dates(days_ahead=options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Created {notifications} due date notifications for {links} recipients'))
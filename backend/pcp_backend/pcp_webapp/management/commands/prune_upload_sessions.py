@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from pcp_webapp.upload_sessions import prune_sessions
+
+class Command(BaseCommand):
+    help = 'Delete unfinished chunked uploads idle for longer than UPLOAD_SESSION_TTL_HOURS, with their part files'
+
+    def handle(self, *args, **options):
+        count = prune_sessions()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {count} upload sessions'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from pcp_webapp.counters import rebuild_all_counters
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-project task counters (total, completed, finalized, overdue) from the Task table; run it daily after midnight to refresh the overdue counts ahead of the first dashboard load'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_all_counters()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt task counters for {count} projects'))
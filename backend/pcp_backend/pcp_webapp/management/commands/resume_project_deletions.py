@@ -0,0 +1,18 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from pcp_webapp.project_deletion import resume_deletions
+
+class Command(BaseCommand):
+    help = 'Finish project deletions left unfinished by a crashed or restarted worker (safe to run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-minutes', type=int, default=None,
+                            help='Only resume jobs without progress for this long (default PROJECT_DELETION_STALE_MINUTES)')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options['stale_minutes']) if options['stale_minutes'] is not None else None
+        jobs = resume_deletions(stale_after)
+        for job in jobs:
+            self.stdout.write(f'Project {job.project_id} ({job.project_name}): {job.status} {job.error}'.rstrip())
+        failed = sum(job.status != 'complete' for job in jobs)
+        self.stdout.write(self.style.SUCCESS(f'Resumed {len(jobs)} project deletions ({failed} failed)'))
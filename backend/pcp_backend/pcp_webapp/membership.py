@@ -0,0 +1,65 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from .models import UserProject, UserMembershipVersion
+
+# How long (seconds) a user's {project_id: role} map stays cached; changes invalidate it immediately
+MEMBERSHIP_CACHE_TIMEOUT = getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 300)
+
+def _memberships_key(email):
+    return f'membership:projects:{email}'
+
+def _email(user):
+    return getattr(user, 'email', user)
+
+def _project_id(project):
+    return int(getattr(project, 'project_id', project))
+
+def membership_version(email):
+    """Current membership version of a user (the time_ns stamp of their last membership change, 0 before any)"""
+    return UserMembershipVersion.objects.filter(user_id=email).values_list('version', flat=True).first() or 0
+
+def get_memberships(user):
+    """
+    Return {project_id: role} for every project the user belongs to.
+    The map is cached per worker process, but only served while it was built at the
+    version stored in the database, so a change made through any worker applies at once.
+    """
+    email = _email(user)
+    version = membership_version(email)
+
+    cached = cache.get(_memberships_key(email))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # Projects being deleted in the background are already hidden from their members
+    memberships = dict(UserProject.objects.filter(email=email, project_id__is_deleted=False).values_list('project_id', 'role'))
+    cache.set(_memberships_key(email), (version, memberships), MEMBERSHIP_CACHE_TIMEOUT)
+    return memberships
+
+def get_role(user, project):
+    """The user's role in the project, or None when they are not a member"""
+    try:
+        return get_memberships(user).get(_project_id(project))
+    except (TypeError, ValueError):
+        return None
+
+def is_member(user, project):
+    return get_role(user, project) is not None
+
+def member_project_ids(user):
+    return list(get_memberships(user))
+
+def invalidate_memberships(*emails):
+    """
+    Bump the stored membership version of users (called inside the writing transaction).
+    time_ns keeps versions unique, so a map cached under a version that was rolled back
+    is never matched again.
+    """
+    emails = list(dict.fromkeys(emails))
+    if not emails:
+        return
+    UserMembershipVersion.objects.bulk_create([UserMembershipVersion(user_id=email) for email in emails], ignore_conflicts=True)
+    UserMembershipVersion.objects.filter(user_id__in=emails).update(version=Greatest(F('version') + 1, Value(time.time_ns())))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcp_webapp', '0002_projecttaskcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['sent_at', 'chat_message_id'], name='chatmsg_sent_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectchat',
+            index=models.Index(fields=['project_id', 'chat_message'], name='projectchat_project_msg_idx'),
+        ),
+    ]
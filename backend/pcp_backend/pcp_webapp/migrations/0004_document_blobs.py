@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:02
+
+import django.db.models.deletion
+import django.utils.timezone
+import pcp_webapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcp_webapp', '0003_chat_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('file', models.FileField(max_length=255, upload_to=pcp_webapp.models.blob_upload_to)),
+                ('size', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documents', to='pcp_webapp.documentblob'),
+        ),
+    ]
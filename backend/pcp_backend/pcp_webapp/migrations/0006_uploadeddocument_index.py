@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcp_webapp', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadedDocument',
+            fields=[
+                ('uploaded_document_id', models.AutoField(primary_key=True, serialize=False)),
+                ('source', models.CharField(choices=[('upload', 'Upload'), ('task', 'Task')], max_length=10)),
+                ('file_path', models.CharField(max_length=500, unique=True)),
+                ('metadata_path', models.CharField(blank=True, max_length=500)),
+                ('filename', models.CharField(max_length=255)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('file_type', models.CharField(blank=True, max_length=255)),
+                ('upload_date', models.CharField(blank=True, max_length=64)),
+                ('uploader', models.CharField(blank=True, max_length=100)),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pcp_webapp.user')),
+                ('task_id', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='pcp_webapp.task')),
+            ],
+            options={
+                'managed': True,
+                'indexes': [models.Index(fields=['email', 'source'], name='uploadeddoc_email_source_idx'), models.Index(fields=['task_id', 'email'], name='uploadeddoc_task_email_idx')],
+            },
+        ),
+    ]
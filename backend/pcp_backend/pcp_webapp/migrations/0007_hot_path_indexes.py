@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:08
+
+from django.db import migrations, models
+from pcp_webapp.migration_operations import AddIndexConcurrently, AddUniqueConstraintConcurrently
+
+
+def remove_duplicate_memberships(apps, schema_editor):
+    """Keep the oldest row of each duplicated (email, project) / (email, task) pair"""
+    for model_name, fields, pk in [
+        ('UserProject', ['email', 'project_id'], 'user_project_id'),
+        ('User_Task', ['email', 'task_id'], 'user_task_id'),
+    ]:
+        model = apps.get_model('pcp_webapp', model_name)
+        duplicates = (
+            model.objects.values(*fields)
+            .annotate(keep=models.Min(pk), rows=models.Count(pk))
+            .filter(rows__gt=1)
+        )
+        for duplicate in duplicates:
+            keep = duplicate.pop('keep')
+            duplicate.pop('rows')
+            model.objects.filter(**duplicate).exclude(**{pk: keep}).delete()
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('pcp_webapp', '0006_uploadeddocument_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_memberships, migrations.RunPython.noop, atomic=True),
+        AddIndexConcurrently(
+            model_name='meeting',
+            index=models.Index(fields=['project_id', 'date_time'], name='meeting_project_datetime_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['project_id', 'task_status'], name='task_project_status_idx'),
+        ),
+        AddUniqueConstraintConcurrently(
+            model_name='user_task',
+            constraint=models.UniqueConstraint(fields=('email', 'task_id'), name='usertask_email_task_uniq'),
+        ),
+        AddUniqueConstraintConcurrently(
+            model_name='userproject',
+            constraint=models.UniqueConstraint(fields=('email', 'project_id'), name='userproject_email_project_uniq'),
+        ),
+    ]
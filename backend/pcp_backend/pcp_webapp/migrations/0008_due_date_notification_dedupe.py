@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:12
+
+from django.db import migrations, models
+from pcp_webapp.migration_operations import AddUniqueConstraintConcurrently
+
+
+def remove_duplicate_user_notifications(apps, schema_editor):
+    """Keep the oldest link of each duplicated (email, notif) pair"""
+    UserNotification = apps.get_model('pcp_webapp', 'UserNotification')
+    duplicates = (
+        UserNotification.objects.values('email', 'notif')
+        .annotate(keep=models.Min('user_notification_id'), rows=models.Count('user_notification_id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        UserNotification.objects.filter(email=duplicate['email'], notif=duplicate['notif']).exclude(
+            user_notification_id=duplicate['keep']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('pcp_webapp', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(remove_duplicate_user_notifications, migrations.RunPython.noop, atomic=True),
+        AddUniqueConstraintConcurrently(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('dedupe_key',), name='notification_dedupe_key_uniq'),
+        ),
+        AddUniqueConstraintConcurrently(
+            model_name='usernotification',
+            constraint=models.UniqueConstraint(fields=('email', 'notif'), name='usernotification_email_notif_uniq'),
+        ),
+    ]
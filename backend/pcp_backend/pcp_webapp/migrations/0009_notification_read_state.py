@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:15
+
+from django.db import migrations, models
+from pcp_webapp.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('pcp_webapp', '0008_due_date_notification_dedupe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usernotification',
+            name='is_read',
+            field=models.BooleanField(default=False),
+        ),
+        AddIndexConcurrently(
+            model_name='usernotification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['email'], name='usernotif_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:18
+
+import re
+import django.db.models.deletion
+from collections import defaultdict
+from django.db import migrations, models
+from pcp_webapp.migration_operations import AddIndexConcurrently
+
+# Messages name their project as: project "Name" (frontend) or project 'Name' (due-date job)
+PROJECT_NAME_RE = re.compile(r'''project ["']([^"']+)["']''', re.IGNORECASE)
+DUE_KEY_RE = re.compile(r'^due:(project|task):(\d+):')
+BATCH_SIZE = 1000
+
+
+def backfill_notification_projects(apps, schema_editor):
+    """
+    Best-effort link of existing notifications to their project: exact for due-date
+    notifications (dedupe_key), otherwise by a quoted project name in the message that
+    matches exactly one project. Ambiguous or unmatched notifications stay unlinked.
+    """
+    Notification = apps.get_model('pcp_webapp', 'Notification')
+    Project = apps.get_model('pcp_webapp', 'Project')
+    Task = apps.get_model('pcp_webapp', 'Task')
+
+    projects_by_name = defaultdict(set)
+    for project_id, name in Project.objects.values_list('project_id', 'project_name'):
+        projects_by_name[name].add(project_id)
+    project_ids = set().union(*projects_by_name.values())
+    task_projects = dict(Task.objects.values_list('task_id', 'project_id'))
+
+    last_id = 0
+    while True:
+        batch = list(
+            Notification.objects.filter(project__isnull=True, notif_id__gt=last_id)
+            .order_by('notif_id').only('notif_id', 'message', 'dedupe_key')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].notif_id
+
+        linked = []
+        for notification in batch:
+            match = DUE_KEY_RE.match(notification.dedupe_key or '')
+            if match:
+                kind, pk = match.group(1), int(match.group(2))
+                project_id = pk if kind == 'project' else task_projects.get(pk)
+                candidates = {project_id} & project_ids
+            else:
+                candidates = set()
+                for name in PROJECT_NAME_RE.findall(notification.message or ''):
+                    candidates |= projects_by_name.get(name, set())
+            if len(candidates) == 1:
+                notification.project_id = candidates.pop()
+                linked.append(notification)
+        Notification.objects.bulk_update(linked, ['project'])
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('pcp_webapp', '0009_notification_read_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='project',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='pcp_webapp.project'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(fields=['project'], name='notification_project_idx'),
+        ),
+        migrations.RunPython(backfill_notification_projects, migrations.RunPython.noop, atomic=True),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:24
+
+from django.db import migrations, models
+from pcp_webapp.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('pcp_webapp', '0011_project_deletion_jobs'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(fields=['due_date'], name='project_due_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['task_due_date'], name='task_due_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcp_webapp', '0012_due_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from pcp_webapp.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('pcp_webapp', '0013_project_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='blob',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='uploads', to='pcp_webapp.documentblob'),
+        ),
+        AddIndexConcurrently(
+            model_name='uploadeddocument',
+            index=models.Index(fields=['blob'], name='uploadeddoc_blob_idx'),
+        ),
+    ]
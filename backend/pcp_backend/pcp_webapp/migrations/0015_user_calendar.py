@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcp_webapp', '0014_uploaded_document_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCalendar',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calendar', serialize=False, to='pcp_webapp.user')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+    ]
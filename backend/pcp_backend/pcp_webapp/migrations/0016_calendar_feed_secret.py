@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcp_webapp', '0015_user_calendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercalendar',
+            name='feed_secret',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
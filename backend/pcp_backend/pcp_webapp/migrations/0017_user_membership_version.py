@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcp_webapp', '0016_calendar_feed_secret'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserMembershipVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='membership_version', serialize=False, to='pcp_webapp.user')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+    ]
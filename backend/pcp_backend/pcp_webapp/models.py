@@ -1,6 +1,8 @@
+import uuid
 from django.utils import timezone
 from django.db import models
 from django.conf import settings
+from django_cleanup import cleanup
 
 class User(models.Model):
     email = models.CharField(max_length=100, unique=True, primary_key=True)
@@ -25,13 +27,29 @@ class Project(models.Model):
     project_name = models.CharField(max_length=100)
     project_description = models.TextField(null=True, blank=True)
     created_on = models.DateField()
+    is_deleted = models.BooleanField(default=False)  # Hidden while a ProjectDeletionJob removes its data
+    # Bumped on every write to the project's data (see project_versions); the read endpoints' ETag
+    version = models.BigIntegerField(default=0)
 
     class Meta:
         managed = True
+        indexes = [
+            models.Index(fields=['due_date'], name='project_due_date_idx'),  # Calendar windows, due-date job
+        ]
 
     def __str__(self):
         return self.project_name
 
+    def save(self, *args, **kwargs):
+        # version only moves through F() updates; saving a stale instance must not roll it back
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname != 'version' and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 class UserProject(models.Model):
     user_project_id = models.BigAutoField(primary_key=True)
     email = models.ForeignKey(User, on_delete=models.DO_NOTHING)
@@ -40,6 +58,10 @@ class UserProject(models.Model):
 
     class Meta:
         managed = True
+        constraints = [
+            # Also serves the (email, project) access check on almost every view
+            models.UniqueConstraint(fields=['email', 'project_id'], name='userproject_email_project_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.email} - {self.user_project_id}"
@@ -56,10 +78,52 @@ class Task(models.Model):
 
     class Meta:
         managed = True
+        indexes = [
+            models.Index(fields=['project_id', 'task_status'], name='task_project_status_idx'),
+            models.Index(fields=['task_due_date'], name='task_due_date_idx'),  # Calendar windows, due-date job
+        ]
 
     def __str__(self):
         return self.task_name
 
+# Denormalized task totals per project, kept current by signals (see counters.py)
+class ProjectTaskCounter(models.Model):
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='task_counter')
+    total_tasks = models.IntegerField(default=0)
+    completed_tasks = models.IntegerField(default=0)
+    finalized_tasks = models.IntegerField(default=0)
+    overdue_tasks = models.IntegerField(default=0)
+    counted_on = models.DateField(default=timezone.localdate)  # Day the overdue count was taken
+
+    class Meta:
+        managed = True
+
+    def __str__(self):
+        return f"Counters for project {self.project_id}: {self.finalized_tasks}/{self.total_tasks} finalized"
+
+# Per-user calendar version (ETag of CalendarView and the .ics feed); see calendar_feed.bump_calendar_versions
+class UserCalendar(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='calendar')
+    version = models.BigIntegerField(default=0)  # time_ns of the last change, strictly increasing
+    feed_secret = models.CharField(max_length=64, blank=True)  # Signed into the .ics feed key; rotating it revokes old URLs
+
+    class Meta:
+        managed = True
+
+    def __str__(self):
+        return f"Calendar of {self.user_id} at version {self.version}"
+
+# Per-user membership version (the cached {project_id: role} maps are keyed by it); see membership.invalidate_memberships
+class UserMembershipVersion(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='membership_version')
+    version = models.BigIntegerField(default=0)  # time_ns of the last membership change, strictly increasing
+
+    class Meta:
+        managed = True
+
+    def __str__(self):
+        return f"Memberships of {self.user_id} at version {self.version}"
+
 class User_Task(models.Model):
     user_task_id = models.AutoField(primary_key=True)
     task_id = models.ForeignKey(Task, on_delete=models.CASCADE)
@@ -67,10 +131,31 @@ class User_Task(models.Model):
 
     class Meta:
         managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'task_id'], name='usertask_email_task_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.user_email} - {self.task_id}"
     
+def blob_upload_to(instance, filename):
+    # Content-addressed path: blobs/ab/cd/abcd...
+    return f'blobs/{instance.sha256[:2]}/{instance.sha256[2:4]}/{instance.sha256}'
+
+class DocumentBlob(models.Model):
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to=blob_upload_to, max_length=255)
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        managed = True
+
+    def __str__(self):
+        return self.sha256
+
+# Document files point into shared blobs; signals.release_document_blob deletes a blob with its last reference
+@cleanup.ignore
 class Document(models.Model):
     document_id = models.AutoField(primary_key=True)
     task_id = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True)
@@ -81,6 +166,7 @@ class Document(models.Model):
     date_time_last_modified = models.DateTimeField(auto_now=True)
     last_modified_by = models.ForeignKey(User, on_delete=models.CASCADE)
     file = models.FileField(upload_to='documents/')  # Added this to store the actual file
+    blob = models.ForeignKey(DocumentBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='documents')
 
     class Meta:
         managed = True
@@ -88,6 +174,94 @@ class Document(models.Model):
     def __str__(self):
         return self.document_title
 
+# Index of files stored under media/documents/<email>/ with their JSON sidecar metadata
+class UploadedDocument(models.Model):
+    SOURCE_CHOICES = [
+        ('upload', 'Upload'),  # upload_document, sidecar <timestamp>_<name>_metadata.json
+        ('task', 'Task'),  # upload_task_document, sidecar <filename>.json
+    ]
+
+    uploaded_document_id = models.AutoField(primary_key=True)
+    email = models.ForeignKey(User, on_delete=models.CASCADE)  # Owner of the documents/<email>/ directory
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    task_id = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True)
+    file_path = models.CharField(max_length=500, unique=True)  # Storage name, documents/<email>/<filename>
+    metadata_path = models.CharField(max_length=500, blank=True)
+    filename = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    file_size = models.BigIntegerField(default=0)
+    file_type = models.CharField(max_length=255, blank=True)
+    upload_date = models.CharField(max_length=64, blank=True)  # ISO timestamp as written to the sidecar
+    uploader = models.CharField(max_length=100, blank=True)
+    # Task uploads are hard links to a shared blob; this reference keeps the blob alive
+    blob = models.ForeignKey(DocumentBlob, on_delete=models.PROTECT, null=True, blank=True, db_index=False, related_name='uploads')
+
+    class Meta:
+        managed = True
+        indexes = [
+            models.Index(fields=['email', 'source'], name='uploadeddoc_email_source_idx'),
+            models.Index(fields=['task_id', 'email'], name='uploadeddoc_task_email_idx'),
+            models.Index(fields=['blob'], name='uploadeddoc_blob_idx'),
+        ]
+
+    def __str__(self):
+        return self.file_path
+
+class UploadSession(models.Model):
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+    ]
+
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    email = models.ForeignKey(User, on_delete=models.CASCADE)
+    task_id = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True)
+    document_title = models.CharField(max_length=200)
+    document_description = models.TextField(blank=True, null=True)
+    doc_type = models.CharField(max_length=500)
+    total_size = models.BigIntegerField()
+    received_size = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)  # Optional whole-file checksum checked on finalize
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    document = models.ForeignKey(Document, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+
+    def __str__(self):
+        return f"Upload {self.upload_id}: {self.received_size}/{self.total_size} bytes"
+
+# Background deletion of a project and everything under it (see project_deletion.py)
+class ProjectDeletionJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+        ('complete', 'Complete'),
+    ]
+
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project_id = models.IntegerField(db_index=True)  # Plain id: the job outlives the project row
+    project_name = models.CharField(max_length=100)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    stage = models.CharField(max_length=30, blank=True)  # Step currently being deleted
+    total_items = models.IntegerField(default=0)
+    deleted_items = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)  # Doubles as a heartbeat while running
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        managed = True
+
+    def __str__(self):
+        return f"Deletion of project {self.project_id}: {self.status} ({self.deleted_items}/{self.total_items})"
+
 class ActivityLog(models.Model):
     ACTION_TYPES = [
         ('project_created', 'Project Created'),
@@ -133,6 +307,10 @@ class ChatMessage(models.Model):
     
     class Meta:
         managed = True
+        indexes = [
+            # Keyset pagination of chat history
+            models.Index(fields=['sent_at', 'chat_message_id'], name='chatmsg_sent_at_id_idx'),
+        ]
 
     def __str__(self):
      return f"Message by {self.email} at {self.sent_at}"
@@ -144,6 +322,9 @@ class ProjectChat(models.Model):
     
     class Meta:
         managed = True
+        indexes = [
+            models.Index(fields=['project_id', 'chat_message'], name='projectchat_project_msg_idx'),
+        ]
 
     def __str__(self):
         return f"Chat in Project {self.project_id} - Message ID {self.chat_message_id}"
@@ -154,9 +335,18 @@ class Notification(models.Model):
     time_sent = models.DateTimeField()
     title = models.CharField(max_length=100)
     message = models.TextField()
+    dedupe_key = models.CharField(max_length=100, null=True, blank=True)  # Set by scheduled jobs, e.g. due:task:<id>:<date>
+    # Project the notification is about, if any; indexed below (built concurrently, see migration 0010)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, db_index=False, related_name='notifications')
 
     class Meta:
         managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['dedupe_key'], name='notification_dedupe_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['project'], name='notification_project_idx'),
+        ]
  
     def __str__(self):
         return f"{self.title} - {self.time_sent} - {self.message}"
@@ -166,9 +356,17 @@ class UserNotification(models.Model):
     user_notification_id = models.AutoField(primary_key=True)
     email = models.ForeignKey(User, on_delete=models.CASCADE)
     notif = models.ForeignKey(Notification, on_delete=models.CASCADE)
+    is_read = models.BooleanField(default=False)
 
     class Meta:
         managed = True
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'notif'], name='usernotification_email_notif_uniq'),
+        ]
+        indexes = [
+            # Only unread rows are indexed: serves the unread count and feed without growing with history
+            models.Index(fields=['email'], condition=models.Q(is_read=False), name='usernotif_unread_idx'),
+        ]
 
     def __str__(self):
         return f"Notification {self.notif_id} for {self.email} - Read: {self.is_read}"
@@ -193,6 +391,9 @@ class Meeting(models.Model):
     
     class Meta:
         managed = True
+        indexes = [
+            models.Index(fields=['project_id', 'date_time'], name='meeting_project_datetime_idx'),
+        ]
     
     def __str__(self):
         return f"Meeting {self.meeting_title} for Project {self.project_id.project_name} on {self.date_time}"
\ No newline at end of file
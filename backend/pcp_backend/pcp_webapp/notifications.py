@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import User, UserNotification
+
+# How long (seconds) a user's unread count stays cached; every write path invalidates it
+UNREAD_COUNT_CACHE_TIMEOUT = getattr(settings, 'UNREAD_COUNT_CACHE_TIMEOUT', 300)
+
+def _unread_key(email):
+    return f'notifications:unread:{email}'
+
+def split_recipients(emails):
+    """(valid, invalid) recipient emails, de-duplicated in request order, from a single query"""
+    requested = list(dict.fromkeys(emails))
+    known = set(User.objects.filter(email__in=requested).values_list('email', flat=True))
+    return [email for email in requested if email in known], [email for email in requested if email not in known]
+
+def fan_out(notification_id, emails):
+    """Link a notification to every recipient with batched multi-row INSERTs in one transaction"""
+    batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 1000)
+    links = [UserNotification(email_id=email, notif_id=notification_id) for email in emails]
+    with transaction.atomic():
+        created = UserNotification.objects.bulk_create(links, batch_size=batch_size)
+        invalidate_unread_counts(emails)
+    return [link.user_notification_id for link in created]
+
+def unread_count(user):
+    """Number of unread notifications for the user, counted on the partial unread index and cached"""
+    email = getattr(user, 'email', user)
+    count = cache.get(_unread_key(email))
+    if count is None:
+        count = UserNotification.objects.filter(email=email, is_read=False).count()
+        cache.set(_unread_key(email), count, UNREAD_COUNT_CACHE_TIMEOUT)
+    return count
+
+def invalidate_unread_counts(emails):
+    """
+    Drop cached unread counts now (for this request) and again after commit, so a concurrent
+    reader cannot keep a pre-commit count cached. bulk_create/update callers must call this;
+    single-row saves and deletes go through the UserNotification signals.
+    """
+    keys = [_unread_key(email) for email in emails]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+def mark_read(user, notif_ids=None):
+    """Mark the user's notifications (all of them when notif_ids is None) read; returns the rows changed"""
+    unread = UserNotification.objects.filter(email=user, is_read=False)
+    if notif_ids is not None:
+        unread = unread.filter(notif_id__in=notif_ids)
+    with transaction.atomic():
+        updated = unread.update(is_read=True)
+        if updated:
+            invalidate_unread_counts([user.email])
+    return updated
@@ -0,0 +1,77 @@
+"""
+Read-through cache of project detail payloads (project data, members, links, meetings).
+
+Entries are keyed by project, resource and Project.version, so any write that bumps the
+version (see project_versions) leaves the old entries unreachable until they expire. The
+backend is the PROJECT_CACHE_ALIAS entry of CACHES: the in-process LocMemCache by default,
+or a FileBasedCache / DatabaseCache entry to share entries between workers without a cache
+server.
+
+Hits and misses are counted per worker process (the entries may be shared, the counters are
+not). Each process logs its counts at most every PROJECT_CACHE_STATS_INTERVAL seconds.
+"""
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+_last_logged = time.monotonic()
+
+def project_cache():
+    return caches[getattr(settings, 'PROJECT_CACHE_ALIAS', 'default')]
+
+def _key(project_id, resource, version):
+    return f'project:{project_id}:{resource}:v{version}'
+
+def _record(resource, outcome):
+    global _last_logged
+    interval = getattr(settings, 'PROJECT_CACHE_STATS_INTERVAL', 300)
+    with _stats_lock:
+        _stats[resource, outcome] += 1
+        now = time.monotonic()
+        due = interval is not None and now - _last_logged >= interval
+        if due:
+            _last_logged = now
+    if due:
+        logger.info(f"Project cache stats for worker {os.getpid()}: {cache_stats()}")
+
+def cached_payload(project_id, version, resource, build):
+    """
+    (payload, hit) for a project resource at a version, calling build() on a miss.
+    A built payload is stored once the surrounding transaction commits: a rolled-back
+    write hands its version number out again, so its data must never be cached.
+    """
+    cache = project_cache()
+    key = _key(project_id, resource, version)
+    payload = cache.get(key)
+    if payload is not None:
+        _record(resource, 'hits')
+        return payload, True
+
+    _record(resource, 'misses')
+    payload = build()
+    timeout = getattr(settings, 'PROJECT_CACHE_TIMEOUT', 3600)
+    transaction.on_commit(lambda: cache.set(key, payload, timeout))
+    return payload, False
+
+def cache_stats():
+    """{resource: {'hits', 'misses', 'hit_rate'}} counted by this process since start or the last reset"""
+    with _stats_lock:
+        counts = dict(_stats)
+    stats = {}
+    for resource in sorted({resource for resource, _ in counts}):
+        hits, misses = counts.get((resource, 'hits'), 0), counts.get((resource, 'misses'), 0)
+        stats[resource] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 3)}
+    return stats
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
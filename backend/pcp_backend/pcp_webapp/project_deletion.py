@@ -0,0 +1,155 @@
+"""
+Background project deletion.
+
+DeleteProjectView only hides the project (Project.is_deleted) and records a
+ProjectDeletionJob; a background worker then deletes everything under the
+project in stages, each in batches of PROJECT_DELETION_BATCH_SIZE rows with one
+short transaction per batch, and finally the project row. Every stage deletes
+"whatever is left" for the project, so a job interrupted by a crash simply
+continues where it stopped when run again (see resume_deletions).
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import (
+    Project, UserProject, Task, User_Task, Document, UploadedDocument, UploadSession, ChatMessage,
+    ProjectChat, ProjectLinks, Meeting, Notification, ActivityLog, ProjectDeletionJob,
+)
+from .counters import counters_suspended
+from .project_versions import versions_suspended
+from .membership import invalidate_memberships
+from .upload_sessions import part_path, discard_part
+from . import background
+
+logger = logging.getLogger(__name__)
+
+def _delete_chat_messages(batch):
+    ChatMessage.objects.filter(chat_message_id__in=[chat.chat_message_id for chat in batch]).delete()
+
+def _discard_part_files(batch):
+    paths = [part_path(session) for session in batch]
+    transaction.on_commit(lambda: [discard_part(path) for path in paths])
+
+def _delete_indexed_files(batch):
+    # Task uploads under documents/<email>/ and their JSON sidecars
+    names = [name for doc in batch for name in (doc.file_path, doc.metadata_path) if name]
+    transaction.on_commit(lambda: [default_storage.delete(name) for name in names])
+
+def _stages(project_id):
+    """(stage, remaining rows, hook run on each batch after it is deleted) in deletion order"""
+    return [
+        ('chat', ProjectChat.objects.filter(project_id=project_id), _delete_chat_messages),
+        ('upload_sessions', UploadSession.objects.filter(task_id__project_id=project_id), _discard_part_files),
+        ('task_files', UploadedDocument.objects.filter(task_id__project_id=project_id), _delete_indexed_files),
+        # Document files are released by the post_delete signal once each batch commits
+        ('documents', Document.objects.filter(task_id__project_id=project_id), None),
+        ('assignments', User_Task.objects.filter(task_id__project_id=project_id), None),
+        ('tasks', Task.objects.filter(project_id=project_id), None),
+        ('links', ProjectLinks.objects.filter(project_id=project_id), None),
+        ('meetings', Meeting.objects.filter(project_id=project_id), None),
+        ('notifications', Notification.objects.filter(project_id=project_id), None),
+        ('activity', ActivityLog.objects.filter(project_id=project_id), None),
+        ('members', UserProject.objects.filter(project_id=project_id), None),
+    ]
+
+def count_items(project_id):
+    return sum(rows.count() for _, rows, _ in _stages(project_id))
+
+def _delete_in_batches(job_id, stage, rows, hook):
+    batch_size = getattr(settings, 'PROJECT_DELETION_BATCH_SIZE', 500)
+    model = rows.model
+    while True:
+        # Counters and the version go with the project, so skip updating them after every row
+        with transaction.atomic(), counters_suspended(), versions_suspended():
+            batch = list(rows.order_by('pk')[:batch_size]) if hook else list(rows.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return
+            model.objects.filter(pk__in=[row.pk for row in batch] if hook else batch).delete()
+            if hook:
+                hook(batch)
+            ProjectDeletionJob.objects.filter(job_id=job_id).update(
+                stage=stage, deleted_items=F('deleted_items') + len(batch), updated_at=timezone.now()
+            )
+
+def start_deletion(project, user):
+    """
+    Hide the project from its members at once and queue its deletion; returns the job.
+    A project that is already being deleted returns its existing job.
+    """
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(project_id=project.project_id)
+        job = ProjectDeletionJob.objects.filter(project_id=project.project_id).exclude(status='complete').first()
+        if job is not None:
+            return job
+
+        project.is_deleted = True
+        project.save(update_fields=['is_deleted'])
+        job = ProjectDeletionJob.objects.create(project_id=project.project_id, project_name=project.project_name, requested_by=user)
+
+        # Membership maps no longer list the project (get_memberships skips deleted projects)
+        invalidate_memberships(*UserProject.objects.filter(project_id=project).values_list('email_id', flat=True))
+        job_id = job.job_id
+        transaction.on_commit(lambda: background.submit(run_deletion, job_id))
+    return job
+
+def run_deletion(job_id):
+    """Delete the job's project stage by stage; safe to call again on a failed or interrupted job"""
+    job = ProjectDeletionJob.objects.get(job_id=job_id)
+    if job.status == 'complete':
+        return job
+
+    updates = {'status': 'running', 'error': '', 'updated_at': timezone.now()}
+    if not job.total_items:
+        updates['total_items'] = count_items(job.project_id)
+    ProjectDeletionJob.objects.filter(job_id=job_id).update(**updates)
+
+    try:
+        for stage, rows, hook in _stages(job.project_id):
+            _delete_in_batches(job_id, stage, rows, hook)
+        with transaction.atomic():
+            Project.objects.filter(project_id=job.project_id).delete()
+            ProjectDeletionJob.objects.filter(job_id=job_id).update(
+                status='complete', stage='', finished_at=timezone.now(), updated_at=timezone.now()
+            )
+        logger.info(f"Project {job.project_id} and all related data deleted (job {job_id})")
+    except Exception as e:
+        logger.error(f"Deletion of project {job.project_id} failed (job {job_id}): {str(e)}")
+        ProjectDeletionJob.objects.filter(job_id=job_id).update(status='failed', error=str(e), updated_at=timezone.now())
+    return ProjectDeletionJob.objects.get(job_id=job_id)
+
+def resume_deletions(stale_after=None):
+    """
+    Run again every unfinished job that has made no progress for stale_after (default
+    PROJECT_DELETION_STALE_MINUTES): queued or running when a worker died, or failed.
+    Returns the jobs after their run.
+    """
+    if stale_after is None:
+        stale_after = timedelta(minutes=getattr(settings, 'PROJECT_DELETION_STALE_MINUTES', 10))
+    stale = ProjectDeletionJob.objects.exclude(status='complete').filter(updated_at__lte=timezone.now() - stale_after)
+    return [run_deletion(job_id) for job_id in stale.order_by('created_at').values_list('job_id', flat=True)]
+
+def job_progress(job):
+    """Status payload for the progress endpoint"""
+    if job.status == 'complete':
+        percent = 100
+    elif job.total_items:
+        percent = min(99, job.deleted_items * 100 // job.total_items)
+    else:
+        percent = 0
+    return {
+        'job_id': str(job.job_id),
+        'project_id': job.project_id,
+        'project_name': job.project_name,
+        'status': job.status,
+        'stage': job.stage,
+        'deleted_items': job.deleted_items,
+        'total_items': job.total_items,
+        'percent': percent,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
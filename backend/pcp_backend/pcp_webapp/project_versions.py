@@ -0,0 +1,70 @@
+"""
+Per-project version stamps for conditional GETs.
+
+Project.version is incremented (an atomic UPDATE inside the writing transaction)
+by the signals on every write to the project, its tasks, assignments, members,
+links, meetings or documents. The project read endpoints derive their ETag from
+it, so a poll with a current If-None-Match is answered after a single version
+lookup instead of rebuilding the response.
+"""
+import threading
+from contextlib import contextmanager
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.http import quote_etag
+from .models import Project, Task, UserProject
+from .file_serving import not_modified
+
+_state = threading.local()
+
+@contextmanager
+def versions_suspended():
+    """Skip per-row version bumps, e.g. while a hidden project is being deleted"""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+def versions_are_suspended():
+    return getattr(_state, 'suspended', False)
+
+def bump_project_version(project_id=None, task_id=None, email=None):
+    """Increment the version of a project, the project of a task, or every project of a user"""
+    if versions_are_suspended():
+        return
+    if project_id is not None:
+        projects = Project.objects.filter(project_id=project_id)
+    elif task_id is not None:
+        projects = Project.objects.filter(project_id__in=Task.objects.filter(task_id=task_id).values('project_id'))
+    elif email is not None:
+        projects = Project.objects.filter(project_id__in=UserProject.objects.filter(email=email).values('project_id'))
+    else:
+        return
+    projects.update(version=F('version') + 1)
+
+def project_version(project_id):
+    """Current version of a project, or None when it does not exist"""
+    try:
+        return Project.objects.filter(project_id=project_id).values_list('version', flat=True).first()
+    except (TypeError, ValueError):
+        return None
+
+def project_etag(project_id, version, resource):
+    """ETag of one project resource (tasks, members, ...) at a version"""
+    return quote_etag(f'project-{project_id}-{resource}-v{version}')
+
+def not_modified_response(request, etag):
+    """304 response when the request's If-None-Match matches etag, otherwise None"""
+    if not not_modified(request, etag, None):
+        return None
+    response = HttpResponse(status=304)
+    response['ETag'] = etag
+    return response
+
+def tag_response(response, etag):
+    """Attach the ETag and let clients keep the body but revalidate it on every use"""
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,44 @@
+from django.db.models import Prefetch
+from .models import Task, User_Task
+
+def with_assignees(tasks):
+    """
+    Prefetch every task's User_Task rows, users joined in, as task.assignments:
+    one extra query for the whole queryset instead of one (or two) per task.
+    """
+    return tasks.prefetch_related(Prefetch(
+        'user_task_set',
+        queryset=User_Task.objects.select_related('email').order_by('user_task_id'),
+        to_attr='assignments',
+    ))
+
+def assignee_names(task):
+    """first_name/last_name/email of a prefetched task's assignees, one entry per user"""
+    names = {}
+    for assignment in task.assignments:
+        user = assignment.email
+        names.setdefault(user.email, {'first_name': user.first_name, 'last_name': user.last_name, 'email': user.email})
+    return list(names.values())
+
+def tasks_with_members(project, task_status):
+    """
+    Tasks of a project in one status with their assigned members, shaped as
+    GetCompletedTasksView and GetFinalizedTasksView return them: (tasks_list, members by task_id).
+    Two queries whatever the number of tasks and assignments.
+    """
+    tasks_list = []
+    members = {}
+    for task in with_assignees(Task.objects.filter(project_id=project, task_status=task_status)):
+        assigned = [{'fname': a.email.first_name, 'lname': a.email.last_name} for a in task.assignments]
+        if assigned:
+            members[task.task_id] = assigned
+        tasks_list.append({
+            'task_id': task.task_id,
+            'task_name': task.task_name,
+            'task_description': task.task_description,
+            'task_status': task.task_status,
+            'task_due_date': task.task_due_date.strftime('%d/%m/%Y') if task.task_due_date else 'No due date',
+            'task_priority': task.task_priority,
+            'assigned_members': assigned
+        })
+    return tasks_list, members
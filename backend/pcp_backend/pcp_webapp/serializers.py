@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.utils import timezone
 from datetime import timedelta
 from .models import User, Project, Task, Document, ActivityLog, UserProject, Notification
+from .counters import get_project_counters
 
 class UserSerializer(serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
@@ -29,10 +30,10 @@ class ProjectSerializer(serializers.ModelSerializer):
                   'task_count', 'completed_tasks', 'due_date', 'created_on']
 
     def get_task_count(self, obj):
-        return obj.task_set.count()
+        return get_project_counters(obj).total_tasks
 
     def get_completed_tasks(self, obj):
-        return obj.task_set.filter(task_status='Completed').count()
+        return get_project_counters(obj).completed_tasks
 
 class TaskSerializer(serializers.ModelSerializer):
     assignee = UserSerializer(read_only=True)
@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import (
+    User, Project, Task, User_Task, Document, UploadedDocument, UserProject, UserNotification, ProjectLinks, Meeting,
+)
+from .authentication import invalidate_user
+from .counters import refresh_project_counters, counters_are_suspended
+from .blob_store import release_blob
+from .membership import invalidate_memberships
+from .notifications import invalidate_unread_counts
+from .calendar_feed import bump_calendar_versions
+from .project_versions import bump_project_version
+
+# Drop cached token -> user resolutions whenever a user row changes (profile update, password reset...)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.email)
+
+# Keep the per-project task counters current
+@receiver(post_save, sender=Task)
+def refresh_counters_on_task_save(sender, instance, **kwargs):
+    if not counters_are_suspended():
+        refresh_project_counters(instance.project_id_id)
+
+@receiver(post_delete, sender=Task)
+def refresh_counters_on_task_delete(sender, instance, **kwargs):
+    # Never create a counter here: the project itself may be mid-way through a cascading delete
+    if not counters_are_suspended():
+        refresh_project_counters(instance.project_id_id, create=False)
+
+# Documents are excluded from django_cleanup: shared blobs go with their last reference,
+# files stored before blobs existed are removed as django_cleanup used to do
+@receiver(post_delete, sender=Document)
+def release_document_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        transaction.on_commit(lambda: release_blob(instance.blob_id))
+    elif instance.file:
+        storage, name = instance.file.storage, instance.file.name
+        transaction.on_commit(lambda: storage.delete(name))
+
+# Task uploads hold a reference to the blob their file is linked to
+@receiver(post_delete, sender=UploadedDocument)
+def release_uploaded_document_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        transaction.on_commit(lambda: release_blob(instance.blob_id))
+
+# Membership maps are cached per user and keyed by the user's membership version, which is
+# bumped in the same transaction as the change
+@receiver(post_save, sender=UserProject)
+@receiver(post_delete, sender=UserProject)
+def invalidate_cached_memberships(sender, instance, **kwargs):
+    invalidate_memberships(instance.email_id)
+
+# Single-row notification links (created, marked read or deleted) change the user's unread count
+@receiver(post_save, sender=UserNotification)
+@receiver(post_delete, sender=UserNotification)
+def invalidate_cached_unread_count(sender, instance, **kwargs):
+    invalidate_unread_counts([instance.email_id])
+
+# Calendar versions (ETags of CalendarView and the .ics feed) of every user whose events may have changed;
+# the version rows are updated in the writer's transaction, so readers see them together with the change
+@receiver(post_save, sender=UserProject)
+@receiver(post_delete, sender=UserProject)
+@receiver(post_save, sender=User_Task)
+@receiver(post_delete, sender=User_Task)
+def bump_calendar_on_membership_change(sender, instance, **kwargs):
+    bump_calendar_versions([instance.email_id])
+
+@receiver(post_save, sender=Project)
+def bump_calendar_on_project_save(sender, instance, **kwargs):
+    bump_calendar_versions(UserProject.objects.filter(project_id=instance).values_list('email_id', flat=True))
+
+# Deleting a task deletes its User_Task rows first, which bumps its assignees
+@receiver(post_save, sender=Task)
+def bump_calendar_on_task_save(sender, instance, **kwargs):
+    bump_calendar_versions(User_Task.objects.filter(task_id=instance).values_list('email_id', flat=True))
+
+# Project versions (ETags of the project read endpoints); the UPDATE runs in the writer's transaction
+@receiver(post_save, sender=Project)
+def bump_version_on_project_save(sender, instance, created, **kwargs):
+    if not created:
+        bump_project_version(project_id=instance.project_id)
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+@receiver(post_save, sender=UserProject)
+@receiver(post_delete, sender=UserProject)
+def bump_version_on_project_row_change(sender, instance, **kwargs):
+    bump_project_version(project_id=instance.project_id_id)
+
+@receiver(post_save, sender=ProjectLinks)
+@receiver(post_delete, sender=ProjectLinks)
+def bump_version_on_link_change(sender, instance, **kwargs):
+    bump_project_version(project_id=instance.project_id)
+
+@receiver(post_save, sender=User_Task)
+@receiver(post_delete, sender=User_Task)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+@receiver(post_save, sender=UploadedDocument)
+@receiver(post_delete, sender=UploadedDocument)
+def bump_version_on_task_row_change(sender, instance, **kwargs):
+    if instance.task_id_id:
+        bump_project_version(task_id=instance.task_id_id)
+
+# Member and assignee names are part of the members and tasks responses
+@receiver(post_save, sender=User)
+def bump_versions_on_user_save(sender, instance, created, **kwargs):
+    if not created:
+        bump_project_version(email=instance.email)
@@ -1,3 +1,1640 @@
-from django.test import TestCase
+import io
+import os
+import re
+import json
+import hashlib
+import time
+import shutil
+import threading
+import asyncio
+import tempfile
+import tracemalloc
+import importlib
+from io import StringIO
+from unittest import mock
+import bcrypt
+from datetime import date, timedelta
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, AsyncClient, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .models import User, Project, UserProject, Task, User_Task, Meeting, ProjectLinks, ProjectTaskCounter, ChatMessage, ProjectChat, Notification, UserNotification, Document, DocumentBlob, UploadSession, UploadedDocument, ProjectDeletionJob
+from . import hashing, project_deletion, project_cache, batch, upload_sessions
+from .chat_events import hub
+from .membership import get_memberships
+from .notifications import fan_out
+from .upload_views import view_document, get_user_tasks_with_documents, list_uploaded_documents, upload_task_document, delete_document, update_metadata
 
-# Create your tests here.
+
+def make_token(user):
+    """Build an access token the same way LoginView does"""
+    access = AccessToken()
+    access.payload['user_email'] = user.email
+    access.payload['fname'] = user.first_name
+    access.payload['lname'] = user.last_name
+    return str(access)
+
+
+class APITestBase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='student@example.com', first_name='Stu', last_name='Dent',
+            password='x', security_question='q', security_answer='a'
+        )
+        self.project = Project.objects.create(
+            project_name='Portal', project_description='desc',
+            due_date=date.today() + timedelta(days=30), created_on=date.today()
+        )
+        UserProject.objects.create(email=self.user, project_id=self.project, role='Group Leader')
+        self.token = make_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def use_temp_media_root(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return media_root
+
+    def count_queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, len(ctx.captured_queries)
+
+
+class TokenUserCacheTests(APITestBase):
+    def test_hot_endpoint_skips_user_lookup_once_cached(self):
+        Meeting.objects.create(project_id=self.project, meeting_title='Standup', date_time='2030-01-01T10:00:00Z')
+        url = f'/api/getprojectmeetings/?project_id={self.project.project_id}'
+
+        first, cold_queries = self.count_queries('get', url)
+        second, warm_queries = self.count_queries('get', url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        # Warm requests skip both the user lookup and the membership map load
+        self.assertEqual(warm_queries, cold_queries - 2)
+
+    def test_profile_update_invalidates_cached_user(self):
+        self.client.get('/api/dashboard/')
+        response = self.client.post('/api/updateprofile/', {'first_name': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.data['username'], 'Renamed Dent')
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get('/api/dashboard/').status_code, 401)
+        response = self.client.get(f'/api/getprojectmeetings/?project_id={self.project.project_id}')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(PASSWORD_HASHER_WORKERS=1, PASSWORD_HASHER_QUEUE_DEPTH=1, PASSWORD_HASH_ROUNDS=4)
+class HashingPoolTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        hashing.shutdown_pool()
+        self.user.password = bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode('utf-8')
+        self.user.save()
+        self.addCleanup(hashing.shutdown_pool)
+
+    def test_login_checks_password_in_pool(self):
+        response = self.client.post('/api/login/', {'email': self.user.email, 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/login/', {'email': self.user.email, 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(hashing.check_password('answer', hashing.hash_password('answer')))
+
+
+@override_settings(PASSWORD_HASHER_WORKERS=1, PASSWORD_HASHER_QUEUE_DEPTH=1)
+class LoginStormTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        hashing.shutdown_pool()
+        self.addCleanup(hashing.shutdown_pool)
+        # Real-cost hashes so a few concurrent logins keep the pool saturated
+        self.user = User.objects.create(
+            email='student@example.com', first_name='Stu', last_name='Dent',
+            password=bcrypt.hashpw(b'secret', bcrypt.gensalt(11)).decode('utf-8'),
+            security_question='q', security_answer='a'
+        )
+        self.project = Project.objects.create(project_name='Portal', due_date=date.today(), created_on=date.today())
+        UserProject.objects.create(email=self.user, project_id=self.project, role='Group Leader')
+        hashing.check_password('warm', self.user.password)  # Start the pool process before the storm
+
+    def log_in_until(self, stop, results):
+        client = APIClient()
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                response = client.post('/api/login/', {'email': self.user.email, 'password': 'secret'}, format='json')
+                results.append((response.status_code, time.perf_counter() - start, response.get('Retry-After')))
+        finally:
+            connection.close()
+
+    def test_login_storm_is_rejected_fast_while_other_endpoints_stay_responsive(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {make_token(self.user)}')
+        stop, results = threading.Event(), []
+        threads = [threading.Thread(target=self.log_in_until, args=(stop, results)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        try:
+            deadline = time.monotonic() + 10
+            while not any(code == 429 for code, _, _ in list(results)):
+                if time.monotonic() > deadline or not all(thread.is_alive() for thread in threads):
+                    self.fail('The login storm never filled the hashing pool')
+                time.sleep(0.01)
+            latencies = []
+            for _ in range(30):
+                start = time.perf_counter()
+                response = client.get(f'/api/getprojectchat/?project_id={self.project.project_id}')
+                latencies.append(time.perf_counter() - start)
+                self.assertEqual(response.status_code, 200)
+            storm_running = all(thread.is_alive() for thread in threads)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertTrue(storm_running)
+        self.assertEqual({code for code, _, _ in results} - {200, 429}, set())
+        hashed = sorted(elapsed for code, elapsed, _ in results if code == 200)
+        rejected = sorted(elapsed for code, elapsed, _ in results if code == 429)
+        self.assertTrue(hashed and rejected)
+        self.assertEqual({retry_after for code, _, retry_after in results if code == 429}, {'1'})
+        # Timings relative to an admitted login, so a slow runner slows both sides alike:
+        # rejections and the other endpoint never wait for a hash
+        login_time = hashed[len(hashed) // 2]
+        self.assertLess(rejected[len(rejected) // 2], login_time)
+        self.assertLess(sorted(latencies)[int(len(latencies) * 0.9)], login_time)
+
+
+class DashboardProgressTests(APITestBase):
+    def seed_projects(self, count, tasks_per_project):
+        for i in range(count):
+            project = Project.objects.create(
+                project_name=f'Project {i}', due_date=date.today(), created_on=date.today()
+            )
+            UserProject.objects.create(email=self.user, project_id=project, role='Supervisor')
+            Task.objects.bulk_create([
+                Task(task_name=f'Task {j}', task_due_date=date.today(), task_priority='Low', project_id=project,
+                     task_status='Finalized' if j % 4 == 0 else 'In Progress')
+                for j in range(tasks_per_project)
+            ])
+        # bulk_create skips the signals that maintain the counters
+        call_command('rebuild_task_counters', stdout=StringIO())
+
+    def test_progress_is_computed_in_the_database(self):
+        Task.objects.create(task_name='Done', task_due_date=date.today(), task_priority='Low',
+                            project_id=self.project, task_status='Finalized')
+        Task.objects.create(task_name='Open', task_due_date=date.today(), task_priority='Low',
+                            project_id=self.project, task_status='In Progress')
+        empty = Project.objects.create(project_name='Empty', due_date=date.today(), created_on=date.today())
+        UserProject.objects.create(email=self.user, project_id=empty, role='Student')
+
+        response = self.client.get('/api/dashboard/')
+        progress = {p['project_id']: p['progress'] for p in response.data['projects']}
+        self.assertEqual(progress, {self.project.project_id: 50, empty.project_id: 0})
+
+    def test_query_count_is_constant_for_large_supervisor_accounts(self):
+        self.client.get('/api/dashboard/')
+        _, small_queries = self.count_queries('get', '/api/dashboard/')
+
+        self.seed_projects(count=40, tasks_per_project=100)
+        response, large_queries = self.count_queries('get', '/api/dashboard/')
+
+        self.assertEqual(len(response.data['projects']), 41)
+        seeded = [p for p in response.data['projects'] if p['project_id'] != self.project.project_id]
+        self.assertTrue(all(p['progress'] == 25 for p in seeded))
+        self.assertEqual(large_queries, small_queries)
+        self.assertEqual(large_queries, 1)
+
+    def test_first_load_of_the_day_recounts_in_constant_queries(self):
+        yesterday = date.today() - timedelta(days=1)
+        self.client.get('/api/dashboard/')
+        ProjectTaskCounter.objects.update(counted_on=yesterday)
+        _, small_queries = self.count_queries('get', '/api/dashboard/')
+
+        self.seed_projects(count=40, tasks_per_project=10)
+        ProjectTaskCounter.objects.update(counted_on=yesterday)
+        response, large_queries = self.count_queries('get', '/api/dashboard/')
+
+        self.assertTrue(all(p['progress'] == 30 for p in response.data['projects'] if p['project_id'] != self.project.project_id))
+        # Memberships with counters, one grouped recount and one upsert
+        self.assertEqual((small_queries, large_queries), (3, 3))
+        self.assertFalse(ProjectTaskCounter.objects.filter(counted_on=yesterday).exists())
+        _, queries = self.count_queries('get', '/api/dashboard/')
+        self.assertEqual(queries, 1)
+
+
+class ProjectTaskCounterTests(APITestBase):
+    def make_task(self, status='In Progress', due=None):
+        return Task.objects.create(task_name='T', task_due_date=due or date.today(), task_priority='Low',
+                                   project_id=self.project, task_status=status)
+
+    def counters(self):
+        return ProjectTaskCounter.objects.get(project=self.project)
+
+    def test_signals_keep_counters_current(self):
+        task = self.make_task()
+        self.make_task(status='Completed')
+        self.make_task(due=date.today() - timedelta(days=3))
+        counters = self.counters()
+        self.assertEqual((counters.total_tasks, counters.completed_tasks, counters.finalized_tasks, counters.overdue_tasks), (3, 1, 0, 1))
+
+        task.task_status = 'Finalized'
+        task.save()
+        self.assertEqual(self.counters().finalized_tasks, 1)
+
+        task.delete()
+        self.assertEqual(self.counters().total_tasks, 2)
+
+    def test_finalized_view_reads_counters(self):
+        self.make_task(status='Finalized')
+        self.make_task(status='Completed')
+        url = f'/api/getfinalizedtasks/{self.project.project_id}/'
+        self.assertEqual(self.client.get(url).data, {'error': 'Not all tasks are finalized'})
+
+        Task.objects.filter(task_status='Completed').first().delete()
+        self.assertEqual(len(self.client.get(url).data['tasks']), 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.make_task(status='Finalized')
+        ProjectTaskCounter.objects.filter(project=self.project).update(total_tasks=99, finalized_tasks=0)
+        out = StringIO()
+        call_command('rebuild_task_counters', stdout=out)
+        self.assertIn('Rebuilt task counters for 1 projects', out.getvalue())
+        self.assertEqual((self.counters().total_tasks, self.counters().finalized_tasks), (1, 1))
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_project_delete_removes_counters(self):
+        for _ in range(3):
+            self.make_task()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/deleteproject/{self.project.project_id}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(ProjectTaskCounter.objects.exists())
+
+
+class ChatHistoryPaginationTests(APITestBase):
+    def send_messages(self, count):
+        messages = ChatMessage.objects.bulk_create([
+            ChatMessage(email=self.user, content=f'message {i} ' + 'x' * 80, Role='Group Leader') for i in range(count)
+        ])
+        # Some messages share a timestamp, so ordering must fall back to the id
+        ChatMessage.objects.filter(chat_message_id__in=[m.chat_message_id for m in messages[:10]]).update(
+            sent_at=messages[0].sent_at
+        )
+        ProjectChat.objects.bulk_create([ProjectChat(project_id=self.project, chat_message=m) for m in messages])
+        return [m.chat_message_id for m in ChatMessage.objects.order_by('sent_at', 'chat_message_id')]
+
+    def chat_url(self, **params):
+        query = '&'.join(f'{k}={v}' for k, v in params.items())
+        return f'/api/getprojectchat/?project_id={self.project.project_id}&{query}'
+
+    def test_cursors_walk_history_in_keyset_order(self):
+        ids = self.send_messages(25)
+
+        latest = self.client.get(self.chat_url(limit=10)).data
+        self.assertEqual([m['id'] for m in latest['messages']], ids[-10:])
+        self.assertTrue(latest['has_more'])
+
+        older = self.client.get(self.chat_url(before=latest['prev_cursor'], limit=10)).data
+        self.assertEqual([m['id'] for m in older['messages']], ids[5:15])
+
+        forward = self.client.get(self.chat_url(after=ids[3], limit=10)).data
+        self.assertEqual([m['id'] for m in forward['messages']], ids[4:14])
+        self.assertEqual(forward['next_cursor'], ids[13])
+
+        caught_up = self.client.get(self.chat_url(after=ids[-1])).data
+        self.assertEqual(caught_up, {'messages': [], 'has_more': False, 'next_cursor': ids[-1], 'prev_cursor': None})
+
+    def test_deleted_cursor_falls_back_to_id_order(self):
+        ids = self.send_messages(25)
+        ChatMessage.objects.filter(chat_message_id=ids[19]).delete()
+
+        response = self.client.get(self.chat_url(after=ids[19]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['id'] for m in response.data['messages']], ids[20:])
+        self.assertEqual(response.data['next_cursor'], ids[-1])
+        response = self.client.get(self.chat_url(before=ids[19], limit=5))
+        self.assertEqual([m['id'] for m in response.data['messages']], ids[14:19])
+
+    def fetch_counting_rows(self, url):
+        # Rows the chat query loads from the database, counted as ProjectChat instances built from them
+        with mock.patch.object(ProjectChat, 'from_db', wraps=ProjectChat.from_db) as from_db:
+            response, queries = self.count_queries('get', url)
+        return response, queries, from_db.call_count
+
+    def test_incremental_polling_benchmark(self):
+        ids = self.send_messages(2000)
+        self.client.get(self.chat_url())  # warm the token cache
+
+        full, full_queries, full_rows = self.fetch_counting_rows(self.chat_url())
+        incremental, incremental_queries, incremental_rows = self.fetch_counting_rows(self.chat_url(after=ids[-5]))
+
+        full_size = len(json.dumps(full.data))
+        incremental_size = len(json.dumps(incremental.data))
+        self.assertEqual(len(full.data['messages']), 2000)
+        self.assertEqual(len(incremental.data['messages']), 4)
+        self.assertEqual(incremental_queries, full_queries)
+        self.assertLess(incremental_size * 100, full_size)
+        self.assertGreaterEqual(full_rows, 2000)
+        self.assertLessEqual(incremental_rows, 5)  # The new messages plus at most the has_more probe
+
+
+@override_settings(CHAT_PUBSUB_BACKEND='memory', CHAT_STREAM_HEARTBEAT=0.05)
+class ChatStreamTests(APITestBase):
+    def stream_url(self, **params):
+        query = '&'.join(f'{k}={v}' for k, v in params.items())
+        return f'/api/projectchatstream/?project_id={self.project.project_id}&token={self.token}&{query}'
+
+    async def open_stream(self, client, **params):
+        response = await client.get(self.stream_url(**params))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return response, stream
+
+    async def close_stream(self, response, stream):
+        await stream.aclose()
+        await sync_to_async(response.close)()
+
+    async def next_event(self, stream):
+        # Skip heartbeats; give up after a few seconds
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            chunk = await asyncio.wait_for(anext(stream), timeout=5)
+            if not chunk.startswith(b':'):
+                return chunk.decode()
+        self.fail('No event received')
+
+    def send_message(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                '/api/sendchatmessage/', {'project_id': self.project.project_id, 'content': content}, format='json'
+            )
+
+    async def test_sent_message_is_pushed_to_subscribers(self):
+        response, stream = await self.open_stream(AsyncClient())
+        sent = await sync_to_async(self.send_message)('hello')
+        event = await self.next_event(stream)
+        self.assertIn(f"id: {sent.data['id']}\n", event)
+        self.assertIn('"content": "hello"', event)
+        await self.close_stream(response, stream)
+        self.assertEqual(hub.subscriber_count(self.project.project_id), 0)
+
+    async def test_reconnect_replays_missed_messages(self):
+        first = await sync_to_async(self.send_message)('one')
+        await sync_to_async(self.send_message)('two')
+        response, stream = await self.open_stream(AsyncClient(), after=first.data['id'])
+        self.assertIn('"content": "two"', await self.next_event(stream))
+        await self.close_stream(response, stream)
+
+    async def test_replay_pages_through_a_long_backlog(self):
+        first = await sync_to_async(self.send_message)('zero')
+        for i in range(1, 8):
+            await sync_to_async(self.send_message)(f'm{i}')
+        with mock.patch('pcp_webapp.views.CHAT_MAX_PAGE_SIZE', 3):
+            response, stream = await self.open_stream(AsyncClient(), after=first.data['id'])
+            events = [await self.next_event(stream) for _ in range(7)]
+        self.assertEqual([re.search(r'"content": "(m\d)"', event).group(1) for event in events], [f'm{i}' for i in range(1, 8)])
+        await self.close_stream(response, stream)
+        self.assertEqual(hub.subscriber_count(self.project.project_id), 0)
+
+    async def test_non_member_is_rejected(self):
+        await sync_to_async(UserProject.objects.filter(email=self.user).delete)()
+        response = await AsyncClient().get(self.stream_url())
+        self.assertEqual(response.status_code, 403)
+
+    async def test_thousand_idle_subscribers(self):
+        client = AsyncClient()
+        opened = [await self.open_stream(client) for _ in range(1000)]
+        streams = [stream for _, stream in opened]
+        self.assertEqual(hub.subscriber_count(self.project.project_id), 1000)
+
+        # Idle streams only get heartbeats and cost no queries
+        ctx = CaptureQueriesContext(connection)
+        await sync_to_async(ctx.__enter__)()
+        chunks = await asyncio.gather(*(anext(stream) for stream in streams))
+        await sync_to_async(ctx.__exit__)(None, None, None)
+        self.assertTrue(all(chunk == b': keep-alive\n\n' for chunk in chunks))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        await sync_to_async(self.send_message)('broadcast')
+        events = await asyncio.gather(*(self.next_event(stream) for stream in streams))
+        self.assertTrue(all('"content": "broadcast"' in event for event in events))
+
+        for response, stream in opened:
+            await self.close_stream(response, stream)
+        self.assertEqual(hub.subscriber_count(), 0)
+
+
+class DocumentDownloadTests(APITestBase):
+    size = 20 * 1024 * 1024
+
+    def setUp(self):
+        super().setUp()
+        media_root = self.use_temp_media_root()
+        os.makedirs(os.path.join(media_root, 'documents'))
+        with open(os.path.join(media_root, 'documents', 'report.pdf'), 'wb') as f:
+            for i in range(self.size // 1024):
+                f.write(bytes([i % 256]) * 1024)
+        self.document = Document.objects.create(
+            document_title='report.pdf', doc_type='application/pdf',
+            last_modified_by=self.user, file='documents/report.pdf'
+        )
+        self.url = f'/api/document-download/?document_id={self.document.document_id}'
+
+    def test_download_memory_stays_constant(self):
+        tracemalloc.start()
+        try:
+            response = self.client.get(self.url)
+            received = 0
+            for chunk in response.streaming_content:
+                received += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(received, self.size)
+        self.assertEqual(int(response['Content-Length']), self.size)
+        # A 20 MB file is served with well under 1 MB of Python allocations
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1024-2047')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 1024-2047/{self.size}')
+        self.assertEqual(b''.join(response.streaming_content), bytes([1]) * 1024)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(len(b''.join(response.streaming_content)), 10)
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={self.size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{self.size}')
+
+    def test_conditional_requests_use_document_timestamp(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        b''.join(response.streaming_content)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # A stale If-Range falls back to the full file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+        self.document.document_description = 'edited'
+        self.document.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        response.close()
+
+    @override_settings(DOCUMENT_DELIVERY_MODE='x-accel-redirect', DOCUMENT_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect_mode_hands_bytes_to_proxy(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/documents/report.pdf')
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+        self.assertIn('attachment; filename="report.pdf"', response['Content-Disposition'])
+
+    @override_settings(DOCUMENT_DELIVERY_MODE='x-sendfile')
+    def test_sendfile_mode_still_checks_project_access(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.document.file.path)
+
+        other = Project.objects.create(project_name='Other', due_date=date.today(), created_on=date.today())
+        self.document.task_id = Task.objects.create(
+            project_id=other, task_name='Secret', task_due_date=date.today(),
+            task_status='To Do', task_priority='Low'
+        )
+        self.document.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('X-Sendfile', response)
+
+    @override_settings(DOCUMENT_DELIVERY_MODE='x-accel-redirect')
+    def test_view_document_offloads_user_files(self):
+        user_dir = os.path.join(settings.MEDIA_ROOT, 'documents', self.user.email)
+        os.makedirs(user_dir)
+        with open(os.path.join(user_dir, 'notes.txt'), 'wb') as f:
+            f.write(b'notes')
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+        response = view_document(request, f'documents/{self.user.email}/notes.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/documents/student%40example.com/notes.txt')
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+
+
+class DocumentBlobTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = self.use_temp_media_root()
+
+    def upload(self, content, title='Marksheet.odt'):
+        response = self.client.post('/api/document-upload/', {
+            'title': title,
+            'file': SimpleUploadedFile('Marksheet.odt', content, content_type='application/vnd.oasis.opendocument.text'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return Document.objects.get(document_id=response.data['document_id'])
+
+    def blob_files(self):
+        return [os.path.join(root, name) for root, _, names in os.walk(os.path.join(self.media_root, 'blobs')) for name in names]
+
+    def delete(self, document):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/deletedocument/{document.document_id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(b'template' * 1000)
+        second = self.upload(b'template' * 1000, title='Marksheet copy')
+        other = self.upload(b'something else')
+
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.blob_id, other.blob_id)
+        self.assertEqual(DocumentBlob.objects.count(), 2)
+        self.assertEqual(len(self.blob_files()), 2)
+
+        response = self.client.get(f'/api/document-download/?document_id={second.document_id}')
+        self.assertEqual(b''.join(response.streaming_content), b'template' * 1000)
+
+    def test_blob_is_removed_with_its_last_reference(self):
+        first = self.upload(b'shared')
+        second = self.upload(b'shared')
+        path = first.file.path
+
+        self.delete(first)
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(DocumentBlob.objects.filter(sha256=second.blob_id).exists())
+
+        self.delete(second)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(DocumentBlob.objects.exists())
+
+    def test_task_uploads_keep_their_blob_alive(self):
+        task = Task.objects.create(project_id=self.project, task_name='Report', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        User_Task.objects.create(task_id=task, email=self.user)
+        document = self.upload(b'final report')
+        request = RequestFactory().post('/', {'task_id': task.task_id, 'file': SimpleUploadedFile('report.pdf', b'final report')},
+                                        HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(upload_task_document(request).status_code, 200)
+        upload = UploadedDocument.objects.get(source='task')
+        self.assertEqual(upload.blob_id, document.blob_id)
+
+        # The Document goes, the task upload still holds the content
+        self.delete(document)
+        self.assertTrue(DocumentBlob.objects.filter(sha256=upload.blob_id).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_documents', stdout=StringIO())
+        self.assertEqual(len(self.blob_files()), 1)
+
+        # Deleting the task file releases the blob with its last reference
+        request = RequestFactory().post('/', json.dumps({'file_path': upload.file_path}), content_type='application/json',
+                                        HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(delete_document(request).status_code, 200)
+        self.assertFalse(DocumentBlob.objects.exists())
+        self.assertEqual(self.blob_files(), [])
+
+    def test_dedupe_command_moves_legacy_copies_into_blobs(self):
+        os.makedirs(os.path.join(self.media_root, 'documents'))
+        for name in ['Marksheet.odt', 'Marksheet_1.odt']:
+            with open(os.path.join(self.media_root, 'documents', name), 'wb') as f:
+                f.write(b'same template')
+            Document.objects.create(document_title=name, doc_type='application/octet-stream', last_modified_by=self.user, file=f'documents/{name}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_documents', stdout=StringIO())
+
+        self.assertEqual(set(Document.objects.values_list('blob', flat=True)), {DocumentBlob.objects.get().sha256})
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'documents')), [])
+        self.assertEqual(len(self.blob_files()), 1)
+
+
+class ChunkedUploadTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = self.use_temp_media_root()
+        self.content = os.urandom(300 * 1024)
+
+    def create_session(self, **extra):
+        response = self.client.post('/api/uploadsessions/', {
+            'filename': 'thesis.pdf', 'size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(), **extra
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['upload_id']
+
+    def put_chunk(self, upload_id, offset, data, checksum=None):
+        return self.client.put(
+            f'/api/uploadsessions/{upload_id}/', data, content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset), HTTP_UPLOAD_CHECKSUM=checksum or hashlib.sha256(data).hexdigest()
+        )
+
+    @override_settings(UPLOAD_SESSION_CHUNK_SIZE=128 * 1024)
+    def test_interrupted_upload_resumes_and_finalizes(self):
+        upload_id = self.create_session()
+        chunk = 128 * 1024
+
+        self.assertEqual(self.put_chunk(upload_id, 0, self.content[:chunk]).status_code, 200)
+        # Corrupted chunk is discarded, wrong offset is refused with the offset to resume from
+        response = self.put_chunk(upload_id, chunk, self.content[chunk:2 * chunk], checksum='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        response = self.put_chunk(upload_id, 0, self.content[:chunk])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['received_size'], chunk)
+
+        # Too early to finalize
+        self.assertEqual(self.client.post(f'/api/uploadsessions/{upload_id}/finalize/').status_code, 409)
+
+        resume_at = self.client.get(f'/api/uploadsessions/{upload_id}/').data['received_size']
+        for offset in range(resume_at, len(self.content), chunk):
+            self.assertEqual(self.put_chunk(upload_id, offset, self.content[offset:offset + chunk]).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/uploadsessions/{upload_id}/finalize/')
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(document_id=response.data['document_id'])
+        self.assertEqual(document.blob_id, hashlib.sha256(self.content).hexdigest())
+        with document.file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'upload_sessions')), [])
+
+    def test_client_read_happens_outside_the_session_lock(self):
+        upload_id = self.create_session()
+        events = []
+        atomic = upload_sessions.transaction.atomic
+
+        class SlowClient(io.BytesIO):
+            def read(self, size=-1):
+                events.append('read')
+                return super().read(size)
+
+        def recording_atomic(*args, **kwargs):
+            events.append('lock')
+            return atomic(*args, **kwargs)
+
+        data = self.content[:64 * 1024]
+        with mock.patch.object(upload_sessions.transaction, 'atomic', side_effect=recording_atomic):
+            session = upload_sessions.write_chunk(upload_id, SlowClient(data), 0, len(data), hashlib.sha256(data).hexdigest())
+        self.assertEqual(session.received_size, len(data))
+        self.assertEqual(events[-1], 'lock')
+        self.assertEqual(events.count('lock'), 1)
+        # Only the part file is left behind, no temporary chunk files
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'upload_sessions')), [f'{upload_id}.part'])
+
+    def test_finalize_hashes_the_part_file_before_locking(self):
+        upload_id = self.create_session()
+        self.assertEqual(self.put_chunk(upload_id, 0, self.content).status_code, 200)
+        events = []
+        atomic, part_sha256 = upload_sessions.transaction.atomic, upload_sessions._part_sha256
+
+        def recording_atomic(*args, **kwargs):
+            events.append('lock')
+            return atomic(*args, **kwargs)
+
+        def recording_sha256(path):
+            events.append('hash')
+            return part_sha256(path)
+
+        with mock.patch.object(upload_sessions.transaction, 'atomic', side_effect=recording_atomic), \
+                mock.patch.object(upload_sessions, '_part_sha256', side_effect=recording_sha256), \
+                self.captureOnCommitCallbacks(execute=True):
+            session = upload_sessions.finalize(upload_id)
+        self.assertEqual(session.status, 'complete')
+        self.assertEqual(events[:2], ['hash', 'lock'])
+        self.assertEqual(events.count('hash'), 1)
+
+    def test_chunk_memory_is_bounded(self):
+        upload_id = self.create_session()
+        tracemalloc.start()
+        try:
+            response = self.put_chunk(upload_id, 0, self.content)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(response.status_code, 200)
+        # The test client holds the 300 KB body itself; the view only adds its read buffer
+        self.assertLess(peak, len(self.content) + 256 * 1024)
+
+    def test_sessions_are_private_and_task_scoped(self):
+        upload_id = self.create_session()
+        outsider = User.objects.create(email='other@example.com', first_name='O', last_name='T', password='x', security_question='q', security_answer='a')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {make_token(outsider)}')
+        self.assertEqual(self.client.get(f'/api/uploadsessions/{upload_id}/').status_code, 404)
+
+        task = Task.objects.create(project_id=self.project, task_name='T', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        response = self.client.post('/api/uploadsessions/', {'filename': 'a.pdf', 'size': 10, 'task_id': task.task_id}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(UploadSession.objects.count(), 1)
+
+
+class DocumentIndexTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = self.use_temp_media_root()
+        self.other = User.objects.create(email='other@example.com', first_name='O', last_name='T', password='x', security_question='q', security_answer='a')
+        UserProject.objects.create(email=self.other, project_id=self.project, role='Member')
+        self.own_task = self.make_task('Mine', self.user)
+        self.other_task = self.make_task('Theirs', self.other)
+
+        self.write(self.user, 'mine.pdf', {'title': 'Mine', 'task_id': self.own_task.task_id, 'size': 3})
+        self.write(self.other, 'theirs.pdf', {'title': 'Theirs', 'task_id': self.other_task.task_id, 'size': 3})
+        self.write(self.user, '20250101_120000_notes.txt', None)
+        self.write(self.user, '20250101_120000_notes_metadata.json', {
+            'title': 'Notes', 'file_size': 5, 'uploaded_by': self.user.email,
+            'upload_date': '2025-01-01T12:00:00', 'file_path': f'documents/{self.user.email}/20250101_120000_notes.txt'
+        }, sidecar=False)
+
+    def make_task(self, name, assignee):
+        task = Task.objects.create(project_id=self.project, task_name=name, task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        User_Task.objects.create(task_id=task, email=assignee)
+        return task
+
+    def write(self, user, filename, metadata, sidecar=True):
+        user_dir = os.path.join(self.media_root, 'documents', user.email)
+        os.makedirs(user_dir, exist_ok=True)
+        if metadata is None or sidecar:
+            with open(os.path.join(user_dir, filename), 'wb') as f:
+                f.write(b'abc')
+        if metadata is not None:
+            with open(os.path.join(user_dir, f'{filename}.json' if sidecar else filename), 'w') as f:
+                json.dump(metadata, f)
+
+    def get(self, view):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return json.loads(view(request).content)
+
+    def test_backfill_and_listing_without_directory_walks(self):
+        call_command('import_document_sidecars', stdout=StringIO())
+        self.assertEqual(UploadedDocument.objects.count(), 3)
+
+        with mock.patch('os.listdir', side_effect=AssertionError('directory walk')):
+            data = self.get(get_user_tasks_with_documents)
+            uploads = self.get(list_uploaded_documents)
+
+        tasks = {task['task_id']: task for task in data['tasks']}
+        self.assertEqual([d['filename'] for d in tasks[self.own_task.task_id]['documents']], ['mine.pdf'])
+        self.assertTrue(tasks[self.own_task.task_id]['documents'][0]['can_edit'])
+        theirs = tasks[self.other_task.task_id]
+        self.assertEqual(theirs['access_level'], 'read_only')
+        self.assertEqual(theirs['documents'][0]['file_path'], 'other@example.com/theirs.pdf')
+        self.assertFalse(theirs['documents'][0]['can_delete'])
+        self.assertEqual([d['title'] for d in uploads['documents']], ['Notes'])
+
+    def test_query_count_does_not_grow_with_tasks_and_assignees(self):
+        call_command('import_document_sidecars', stdout=StringIO())
+        self.get(get_user_tasks_with_documents)  # Warm the token -> user cache
+        with CaptureQueriesContext(connection) as before:
+            self.get(get_user_tasks_with_documents)
+
+        for i in range(20):
+            task = self.make_task(f'Extra {i}', self.other)
+            self.write(self.other, f'extra{i}.pdf', {'task_id': task.task_id})
+        call_command('import_document_sidecars', stdout=StringIO())
+        with CaptureQueriesContext(connection) as after:
+            data = self.get(get_user_tasks_with_documents)
+
+        self.assertEqual(data['total_tasks'], 22)
+        self.assertEqual(len(after.captured_queries), len(before.captured_queries))
+
+
+    def test_metadata_update_cannot_claim_another_users_file(self):
+        call_command('import_document_sidecars', stdout=StringIO())
+        theirs = f'documents/{self.other.email}/theirs.pdf'
+        for claimed in (theirs, f'documents/{self.user.email}/../{self.other.email}/theirs.pdf'):
+            request = RequestFactory().post('/', json.dumps({
+                'file_path': f'documents/{self.user.email}/claim_metadata.json',
+                'metadata': {'title': 'Mine now', 'file_path': claimed},
+            }), content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+            self.assertEqual(update_metadata(request).status_code, 403)
+
+        document = UploadedDocument.objects.get(file_path=theirs)
+        self.assertEqual((document.email_id, document.source), (self.other.email, 'task'))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'documents', self.user.email, 'claim_metadata.json')))
+
+class ProjectTasksQueryTests(APITestBase):
+    def test_query_count_is_constant_for_500_tasks(self):
+        members = [self.user] + [
+            User.objects.create(email=f'member{i}@example.com', first_name=f'M{i}', last_name='Ember', password='x', security_question='q', security_answer='a')
+            for i in range(5)
+        ]
+        tasks = Task.objects.bulk_create([
+            Task(project_id=self.project, task_name=f'Task {i}', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+            for i in range(500)
+        ])
+        User_Task.objects.bulk_create([
+            User_Task(task_id=task, email=members[(i + k) % len(members)])
+            for i, task in enumerate(tasks) for k in range(2)
+        ])
+        url = f'/api/getprojecttasks/?project_id={self.project.project_id}'
+        self.client.get(url)  # Warm the token -> user cache
+
+        # Membership version, project version, tasks, prefetched assignments with users
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data['tasks']), 500)
+        first = response.data['tasks'][0]
+        self.assertEqual(first['assignees'], [
+            {'first_name': 'Stu', 'last_name': 'Dent', 'email': 'student@example.com'},
+            {'first_name': 'M0', 'last_name': 'Ember', 'email': 'member0@example.com'},
+        ])
+
+
+class TaskMembersLoaderTests(APITestBase):
+    def seed(self, task_status):
+        members = [
+            User.objects.create(email=f'member{i}@example.com', first_name=f'M{i}', last_name='Ember', password='x', security_question='q', security_answer='a')
+            for i in range(8)
+        ]
+        tasks = Task.objects.bulk_create([
+            Task(project_id=self.project, task_name=f'Task {i}', task_due_date=date(2030, 1, 2), task_status=task_status, task_priority='Low')
+            for i in range(250)
+        ])
+        # 1k task assignments
+        User_Task.objects.bulk_create([
+            User_Task(task_id=task, email=members[(i + k) % len(members)])
+            for i, task in enumerate(tasks) for k in range(4)
+        ])
+        call_command('rebuild_task_counters', stdout=StringIO())
+        return tasks
+
+    def test_completed_tasks_benchmark(self):
+        tasks = self.seed('Completed')
+        # Project, tasks, prefetched assignments with users
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/getcompletedtasks/?project_id={self.project.project_id}')
+
+        self.assertEqual(len(response.data['tasks']), 250)
+        first = response.data['tasks'][0]
+        self.assertEqual(first['task_due_date'], '02/01/2030')
+        self.assertEqual(first['assigned_members'], [{'fname': f'M{k}', 'lname': 'Ember'} for k in range(4)])
+        self.assertEqual(response.data['members'][tasks[1].task_id][0], {'fname': 'M1', 'lname': 'Ember'})
+
+    def test_finalized_tasks_benchmark(self):
+        self.seed('Finalized')
+        url = f'/api/getfinalizedtasks/{self.project.project_id}/'
+        self.client.get(url)  # Warm the token -> user cache
+
+        # Project, counters, tasks, prefetched assignments with users
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data['tasks']), 250)
+        self.assertEqual(sum(len(m) for m in response.data['members'].values()), 1000)
+
+
+class HotPathIndexTests(APITestBase):
+    """EXPLAIN harness: the planner must answer the hot lookups from a composite index"""
+
+    def assertIndexLookup(self, queryset, *columns):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Test tables are tiny; without this the planner always prefers a sequential scan
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertNotRegex(plan, r'\bSCAN\b|Seq Scan', plan)
+        index_lines = [line for line in plan.splitlines() if re.search(r'INDEX|Index Cond', line, re.IGNORECASE)]
+        for column in columns:
+            self.assertTrue(any(column in line for line in index_lines), f'{column} not used as index key:\n{plan}')
+
+    def test_hot_lookups_use_composite_indexes(self):
+        task = Task.objects.create(project_id=self.project, task_name='T', task_due_date=date.today(), task_status='Completed', task_priority='Low')
+        User_Task.objects.create(task_id=task, email=self.user)
+
+        self.assertIndexLookup(UserProject.objects.filter(email=self.user, project_id=self.project), 'email_id', 'project_id_id')
+        self.assertIndexLookup(User_Task.objects.filter(email=self.user, task_id=task), 'email_id', 'task_id_id')
+        self.assertIndexLookup(Task.objects.filter(project_id=self.project, task_status='Completed'), 'project_id_id', 'task_status')
+        self.assertIndexLookup(
+            Meeting.objects.filter(project_id=self.project, date_time__gte='2030-01-01T00:00:00Z').order_by('date_time'),
+            'project_id_id', 'date_time'
+        )
+
+    def test_membership_rows_are_unique(self):
+        response = self.client.post('/api/addprojectmember/', {'project_id': self.project.project_id, 'email': self.user.email, 'role': 'Student'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UserProject.objects.filter(email=self.user, project_id=self.project).count(), 1)
+
+        task = Task.objects.create(project_id=self.project, task_name='T', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        for _ in range(2):
+            response = self.client.post('/api/addtaskmember/', {'taskId': task.task_id, 'email': self.user.email}, format='json')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(User_Task.objects.filter(task_id=task).count(), 1)
+
+
+class MembershipServiceTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create(email='other@example.com', first_name='O', last_name='T', password='x', security_question='q', security_answer='a')
+        self.second = Project.objects.create(project_name='Second', due_date=date.today(), created_on=date.today())
+        UserProject.objects.create(email=self.other, project_id=self.second, role='Supervisor')
+        UserProject.objects.create(email=self.other, project_id=self.project, role='Supervisor')
+        leader = User.objects.create(email='leader@example.com', first_name='L', last_name='D', password='x', security_question='q', security_answer='a')
+        UserProject.objects.create(email=leader, project_id=self.second, role='Group Leader')
+
+    def test_membership_map_is_loaded_once(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(get_memberships(self.user), {self.project.project_id: 'Group Leader'})
+        with self.assertNumQueries(1):  # The stored version only
+            get_memberships(self.user)
+
+        url = f'/api/getprojectmeetings/?project_id={self.project.project_id}'
+        self.client.get(url)
+        # Membership version, project and meetings; no membership query
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = self.client.get(f'/api/getprojectmeetings/?project_id={self.second.project_id}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_membership_changes_invalidate_the_map(self):
+        url = f'/api/getprojectmeetings/?project_id={self.second.project_id}'
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/addprojectmember/', {'project_id': self.second.project_id, 'email': self.user.email, 'role': 'Student'}, format='json')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/changerole/', {'project_id': self.second.project_id, 'email': self.user.email, 'new_role': 'Supervisor'}, format='json')
+        self.assertEqual(get_memberships(self.user)[self.second.project_id], 'Supervisor')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/deleteprojectmember/', {'project_id': self.second.project_id, 'email': self.user.email}, format='json')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+    def test_removal_made_by_another_worker_is_not_served_from_this_workers_map(self):
+        self.assertIn(self.project.project_id, get_memberships(self.other))
+        key = f'membership:projects:{self.other.email}'
+        stale = cache.get(key)
+
+        UserProject.objects.filter(email=self.other, project_id=self.project).delete()
+        cache.set(key, stale)  # This worker's cache never heard of the removal
+
+        self.assertNotIn(self.project.project_id, get_memberships(self.other))
+
+class NotificationFanOutTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        User.objects.bulk_create([
+            User(email=f'student{i}@example.com', first_name='S', last_name=str(i), password='x', security_question='q', security_answer='a')
+            for i in range(5000)
+        ])
+        self.emails = [f'student{i}@example.com' for i in range(5000)] + ['nobody@example.com']
+
+    def broadcast(self):
+        return self.client.post('/api/createnotification/', {'emails': self.emails, 'title': 'Exam', 'message': 'Room 4'}, format='json')
+
+    @override_settings(NOTIFICATION_ASYNC_THRESHOLD=10000, NOTIFICATION_BATCH_SIZE=1000)
+    def test_inline_broadcast_to_5000_recipients(self):
+        self.client.get('/api/dashboard/')  # Warm the token -> user cache
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = self.broadcast()
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created_links']), 5000)
+        self.assertEqual(response.data['invalid_emails'], ['nobody@example.com'])
+        # Batches of 1000, or fewer where the backend caps query parameters (sqlite)
+        fields = [field for field in UserNotification._meta.concrete_fields if not field.primary_key]
+        batch = min(1000, connection.ops.bulk_batch_size(fields, self.emails))
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "pcp_webapp_usernotification"')]
+        self.assertEqual(len(inserts), -(-5000 // batch))
+        # Recipient lookup, notification insert and four savepoint statements besides the batches
+        self.assertEqual(len(ctx.captured_queries), len(inserts) + 6)
+        self.assertLess(elapsed, 5)
+
+    @override_settings(NOTIFICATION_ASYNC_THRESHOLD=500, BACKGROUND_TASKS_EAGER=True)
+    def test_large_broadcast_is_handed_to_background_worker(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.broadcast()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['recipients'], 5000)
+        notification = Notification.objects.get(notif_id=response.data['notification_id'])
+        self.assertFalse(UserNotification.objects.filter(notif=notification).exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(UserNotification.objects.filter(notif=notification).count(), 5000)
+
+
+
+class NotificationFeedTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        sent = timezone.now() - timedelta(days=1)
+        # 45 notifications, sent in pairs so the keyset has to break time_sent ties on notif_id
+        notifications = Notification.objects.bulk_create([
+            Notification(title=f'N{i}', message='m', time_sent=sent + timedelta(minutes=i // 2))
+            for i in range(45)
+        ])
+        self.ids = [n.notif_id for n in notifications]
+        UserNotification.objects.bulk_create([UserNotification(email=self.user, notif_id=notif_id) for notif_id in self.ids])
+
+    def test_feed_is_keyset_paginated_newest_first(self):
+        seen = []
+        url = '/api/getusernotifications/'
+        while True:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(response.data['count'], 20)
+            seen.extend(n['id'] for n in response.data['notifications'])
+            if not response.data['has_more']:
+                break
+            url = f"/api/getusernotifications/?before={response.data['next_cursor']}"
+        self.assertEqual(seen, sorted(self.ids, reverse=True))
+        self.assertEqual(response.data['unread_count'], 45)
+
+        response = self.client.get('/api/getusernotifications/?limit=5&unread=true')
+        self.assertEqual(len(response.data['notifications']), 5)
+        self.assertTrue(response.data['has_more'])
+
+    def test_paging_continues_after_the_cursor_is_deleted(self):
+        first = self.client.get('/api/getusernotifications/').data
+        cursor = first['next_cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/deletenotification/{cursor}/')
+        self.assertFalse(Notification.objects.filter(notif_id=cursor).exists())
+
+        response = self.client.get(f'/api/getusernotifications/?before={cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([n['id'] for n in response.data['notifications']], sorted(self.ids, reverse=True)[20:40])
+
+    def test_unread_count_is_cached_and_invalidated(self):
+        url = '/api/unreadnotificationcount/'
+        self.client.get(url)  # Warm the token -> user cache and the counter
+        response, queries = self.count_queries('get', url)
+        self.assertEqual(response.data['unread_count'], 45)
+        self.assertEqual(queries, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/marknotificationsread/', {'notif_ids': self.ids[:10]}, format='json')
+        self.assertEqual(response.data['updated'], 10)
+        self.assertEqual(self.client.get(url).data['unread_count'], 35)
+        response = self.client.get('/api/getusernotifications/?unread=true&limit=100')
+        self.assertEqual(len(response.data['notifications']), 35)
+
+        extra = Notification.objects.create(title='New', message='m', time_sent=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            fan_out(extra.notif_id, [self.user.email])
+        self.assertEqual(self.client.get(url).data['unread_count'], 36)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/deletenotification/{extra.notif_id}/')
+            self.client.post('/api/marknotificationsread/', {}, format='json')
+        self.assertEqual(self.client.get(url).data['unread_count'], 0)
+
+    def test_unread_lookup_uses_partial_index(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = UserNotification.objects.filter(email=self.user, is_read=False).explain()
+        self.assertIn('usernotif_unread_idx', plan)
+
+
+class NotificationProjectLinkTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        # Same name prefix: the old message__icontains cleanup deleted both projects' notifications
+        self.other = Project.objects.create(project_name='Portal 2', due_date=date.today(), created_on=date.today())
+        UserProject.objects.create(email=self.user, project_id=self.other, role='Group Leader')
+
+    def notify(self, project, message):
+        return self.client.post('/api/createnotification/', {
+            'emails': [self.user.email], 'title': 'Update', 'message': message, 'project_id': project.project_id
+        }, format='json')
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_project_deletion_removes_only_its_notifications(self):
+        self.assertEqual(self.notify(self.project, 'You were added to project "Portal".').status_code, 201)
+        self.assertEqual(self.notify(self.other, 'You were added to project "Portal 2".').status_code, 201)
+        self.assertEqual(Notification.objects.filter(project=self.project).count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/deleteproject/{self.project.project_id}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(list(Notification.objects.values_list('project', flat=True)), [self.other.project_id])
+        self.assertEqual(UserNotification.objects.filter(email=self.user).count(), 1)
+
+    def test_notification_project_must_be_one_of_the_senders(self):
+        outsider = Project.objects.create(project_name='Elsewhere', due_date=date.today(), created_on=date.today())
+        self.assertEqual(self.notify(outsider, 'Hello').status_code, 403)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_backfill_links_unambiguous_project_names(self):
+        task = Task.objects.create(project_id=self.other, task_name='T', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        Project.objects.create(project_name='Twin', due_date=date.today(), created_on=date.today())
+        Project.objects.create(project_name='Twin', due_date=date.today(), created_on=date.today())
+        sent = timezone.now()
+        portal, portal2, due_task, twin, unrelated = Notification.objects.bulk_create([
+            Notification(title='A', message='x added you to project "Portal".', time_sent=sent),
+            Notification(title='B', message="The task 'T' in project 'Portal 2' is due soon.", time_sent=sent),
+            Notification(title='C', message='Due soon', dedupe_key=f'due:task:{task.task_id}:2026-01-01', time_sent=sent),
+            Notification(title='D', message='x added you to project "Twin".', time_sent=sent),
+            Notification(title='E', message='Password changed', time_sent=sent),
+        ])
+
+        migration = importlib.import_module('pcp_webapp.migrations.0010_notification_project')
+        migration.backfill_notification_projects(django_apps, connection.schema_editor())
+
+        links = dict(Notification.objects.values_list('notif_id', 'project'))
+        self.assertEqual(links[portal.notif_id], self.project.project_id)
+        self.assertEqual(links[portal2.notif_id], self.other.project_id)
+        self.assertEqual(links[due_task.notif_id], self.other.project_id)
+        self.assertIsNone(links[twin.notif_id])
+        self.assertIsNone(links[unrelated.notif_id])
+
+
+class DueDateNotificationTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        self.project.due_date = self.today + timedelta(days=1)
+        self.project.save()
+        # 100k tasks due over the next ten days, one assignee each; every hundredth is already completed
+        Task.objects.bulk_create([
+            Task(task_name=f'Task {i}', task_due_date=self.today + timedelta(days=i % 10),
+                 task_status='Completed' if i % 100 == 0 else 'In Progress', task_priority='Low', project_id=self.project)
+            for i in range(100000)
+        ], batch_size=5000)
+        User_Task.objects.bulk_create(
+            [User_Task(task_id_id=task_id, email=self.user) for task_id in Task.objects.values_list('task_id', flat=True)],
+            batch_size=5000,
+        )
+        # Tasks due today .. today + 2 that are still open, plus the project
+        self.expected = Task.objects.filter(
+            task_due_date__lte=self.today + timedelta(days=2)
+        ).exclude(task_status='Completed').count() + 1
+
+    def test_due_soon_job_on_100k_tasks(self):
+        started = time.perf_counter()
+        out = StringIO()
+        call_command('notify_due_dates', stdout=out)
+        elapsed = time.perf_counter() - started
+
+        self.assertIn(f'Created {self.expected} due date notifications for {self.expected} recipients', out.getvalue())
+        self.assertEqual(Notification.objects.count(), self.expected)
+        self.assertEqual(UserNotification.objects.filter(email=self.user).count(), self.expected)
+        self.assertTrue(Notification.objects.filter(title='Project Deadline Approaching: Portal').exists())
+        self.assertLess(elapsed, 10)
+
+    def test_rerun_on_the_same_day_creates_nothing(self):
+        call_command('notify_due_dates', stdout=StringIO())
+        out = StringIO()
+        call_command('notify_due_dates', stdout=out)
+        self.assertIn('Created 0 due date notifications for 0 recipients', out.getvalue())
+        self.assertEqual(Notification.objects.count(), self.expected)
+        self.assertEqual(UserNotification.objects.count(), self.expected)
+
+
+    def test_projects_being_deleted_get_no_reminders(self):
+        Project.objects.filter(project_id=self.project.project_id).update(is_deleted=True)
+        out = StringIO()
+        call_command('notify_due_dates', stdout=out)
+        self.assertIn('Created 0 due date notifications for 0 recipients', out.getvalue())
+        self.assertFalse(Notification.objects.exists())
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, PROJECT_DELETION_BATCH_SIZE=7)
+class ProjectDeletionJobTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.use_temp_media_root()
+        self.tasks = Task.objects.bulk_create([
+            Task(task_name=f'T{i}', task_due_date=date.today(), task_status='To Do', task_priority='Low', project_id=self.project)
+            for i in range(20)
+        ])
+        User_Task.objects.bulk_create([User_Task(task_id=task, email=self.user) for task in self.tasks])
+        messages = ChatMessage.objects.bulk_create([ChatMessage(email=self.user, content=f'm{i}', Role='Group Leader') for i in range(15)])
+        ProjectChat.objects.bulk_create([ProjectChat(project_id=self.project, chat_message=m) for m in messages])
+        Meeting.objects.create(project_id=self.project, meeting_title='Standup', date_time='2030-01-01T10:00:00Z')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/uploaddocument/', {
+                'file': SimpleUploadedFile('notes.txt', b'project notes'), 'task_id': self.tasks[0].task_id,
+                'title': 'Notes', 'description': '', 'project_id': self.project.project_id,
+            })
+        self.assertEqual(response.status_code, 201)
+        self.blob = DocumentBlob.objects.get()
+
+    def delete_project(self):
+        return self.client.delete(f'/api/deleteproject/{self.project.project_id}/')
+
+    def test_project_is_hidden_then_deleted_in_background(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.delete_project()
+        self.assertEqual(response.status_code, 202)
+        # Hidden before the job has run
+        self.assertEqual(self.client.get('/api/dashboard/').data['projects'], [])
+        self.assertEqual(self.client.get(f'/api/getprojectmeetings/?project_id={self.project.project_id}').status_code, 403)
+        self.assertEqual(self.delete_project().status_code, 404)
+        status_url = response.data['status_url']
+        self.assertEqual(self.client.get(status_url).data['status'], 'pending')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+
+        progress = self.client.get(status_url).data
+        self.assertEqual((progress['status'], progress['percent']), ('complete', 100))
+        self.assertEqual(progress['deleted_items'], progress['total_items'])
+        self.assertFalse(Project.objects.filter(project_id=self.project.project_id).exists())
+        for model in (Task, User_Task, ChatMessage, ProjectChat, Meeting, Document, DocumentBlob, UserProject):
+            self.assertFalse(model.objects.exists(), model.__name__)
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, self.blob.file.name)))
+
+    def test_interrupted_job_resumes_where_it_stopped(self):
+        real_delete_in_batches = project_deletion._delete_in_batches
+        def dies_during_tasks(job_id, stage, rows, hook):
+            if stage == 'tasks':
+                raise RuntimeError('worker died')
+            return real_delete_in_batches(job_id, stage, rows, hook)
+
+        with mock.patch('pcp_webapp.project_deletion._delete_in_batches', side_effect=dies_during_tasks):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.delete_project()
+        job = ProjectDeletionJob.objects.get(job_id=response.data['job_id'])
+        self.assertEqual((job.status, job.error), ('failed', 'worker died'))
+        # Stages before the crash are done, the rest is still there
+        self.assertFalse(ProjectChat.objects.exists())
+        self.assertFalse(User_Task.objects.exists())
+        self.assertEqual(Task.objects.count(), 20)
+        self.assertTrue(Project.objects.filter(project_id=self.project.project_id).exists())
+
+        # Jobs that made progress recently are left to their worker
+        out = StringIO()
+        call_command('resume_project_deletions', stdout=out)
+        self.assertIn('Resumed 0 project deletions', out.getvalue())
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('resume_project_deletions', '--stale-minutes', '0', stdout=out)
+        self.assertIn('Resumed 1 project deletions (0 failed)', out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'complete')
+        self.assertEqual(job.deleted_items, job.total_items)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(Project.objects.filter(project_id=self.project.project_id).exists())
+
+
+class UserTasksQueryTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.mates = User.objects.bulk_create([
+            User(email=f'mate{i}@example.com', first_name='Mate', last_name=str(i), password='x', security_question='q', security_answer='a')
+            for i in range(3)
+        ])
+        # Another project's task the user is assigned to but no longer a member of
+        self.former = Project.objects.create(project_name='Former', due_date=date.today(), created_on=date.today())
+        former_task = Task.objects.create(project_id=self.former, task_name='Old', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        User_Task.objects.create(task_id=former_task, email=self.user)
+
+    def add_tasks(self, count):
+        tasks = Task.objects.bulk_create([
+            Task(project_id=self.project, task_name=f'T{i}', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+            for i in range(count)
+        ])
+        User_Task.objects.bulk_create(
+            [User_Task(task_id=task, email=user) for task in tasks for user in [self.user, *self.mates]]
+        )
+        return tasks
+
+    def test_query_count_is_independent_of_task_count(self):
+        self.add_tasks(10)
+        self.client.get('/api/getusertasks/')  # Warm the token -> user cache and the membership map
+        response, small = self.count_queries('get', '/api/getusertasks/')
+        self.assertEqual(len(response.data['tasks']), 10)
+
+        self.add_tasks(140)
+        response, large = self.count_queries('get', '/api/getusertasks/')
+        self.assertEqual(len(response.data['tasks']), 150)
+        # Membership version, tasks with their projects, then every assignment with its user
+        self.assertEqual((small, large), (3, 3))
+
+    def test_fellow_assignees_exclude_the_user(self):
+        task = self.add_tasks(1)[0]
+        response = self.client.get('/api/getusertasks/')
+        self.assertEqual([t['task_id'] for t in response.data['tasks']], [task.task_id])
+        self.assertEqual(response.data['tasks'][0]['fellow_assignees'], [
+            {'first_name': 'Mate', 'last_name': str(i), 'email': f'mate{i}@example.com'} for i in range(3)
+        ])
+
+
+class CalendarFeedTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        for offset in (-200, -5, 3, 40):
+            task = Task.objects.create(project_id=self.project, task_name=f'Due {offset}', task_description='Bring notes; slides',
+                                       task_due_date=self.today + timedelta(days=offset), task_status='To Do', task_priority='Low')
+            User_Task.objects.create(task_id=task, email=self.user)
+
+    def test_window_filters_events_by_due_date(self):
+        start, end = self.today - timedelta(days=10), self.today + timedelta(days=10)
+        response = self.client.get(f'/api/calendar/?start={start}&end={end}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(e['name'] for e in response.data['events']), ['Due -5', 'Due 3'])
+
+        # The project (due in 30 days) and all four tasks without a window
+        self.assertEqual(len(self.client.get('/api/calendar/').data['events']), 5)
+        self.assertEqual(self.client.get('/api/calendar/?start=2025-02-30').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/calendar/?start={end}&end={start}').status_code, 400)
+
+    def test_unchanged_calendar_returns_304_until_a_task_changes(self):
+        url = f'/api/calendar/?start={self.today}&end={self.today + timedelta(days=31)}'
+        etag = self.client.get(url)['ETag']
+        response, queries = self.count_queries('get', url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, 1)  # The version lookup only
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.get(task_name='Due 3')
+            task.task_due_date = self.today + timedelta(days=4)
+            task.save()
+        # The version is in the database: a worker whose local cache never saw the write still sees it
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Another user's change leaves this calendar's ETag alone
+        etag = response['ETag']
+        other = User.objects.create(email='other@example.com', first_name='O', last_name='T', password='x', security_question='q', security_answer='a')
+        elsewhere = Project.objects.create(project_name='Elsewhere', due_date=self.today, created_on=self.today)
+        UserProject.objects.create(email=other, project_id=elsewhere, role='Student')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_ics_feed_with_conditional_get(self):
+        url = self.client.get('/api/calendar/feedurl/').data['url']
+        self.client.credentials()  # Calendar apps only have the feed URL
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 4)  # The task 200 days ago is outside the feed window
+        self.assertIn(f"DTSTART;VALUE=DATE:{(self.today + timedelta(days=3)).strftime('%Y%m%d')}", body)
+        self.assertIn(r'DESCRIPTION:Bring notes\; slides', body)
+
+        response, queries = self.count_queries('get', url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        # The user's calendar row (feed secret and version) with the user
+        self.assertEqual(queries, 1)
+        self.assertEqual(self.client.get('/api/calendar/feed.ics?key=forged').status_code, 403)
+
+    def test_feed_url_can_be_revoked(self):
+        old_url = self.client.get('/api/calendar/feedurl/').data['url']
+        self.assertEqual(self.client.get('/api/calendar/feedurl/').data['url'], old_url)
+
+        new_url = self.client.post('/api/calendar/feedurl/').data['url']
+        self.assertNotEqual(new_url, old_url)
+        self.assertEqual(self.client.get(old_url).status_code, 403)
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+        # A password reset revokes the feed as well
+        self.client.post('/api/resetpassword/', {'email': self.user.email, 'password': 'n3w-passw0rd'}, format='json')
+        self.assertEqual(self.client.get(new_url).status_code, 403)
+
+
+class ProjectVersionETagTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(project_id=self.project, task_name='Draft', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        User_Task.objects.create(task_id=self.task, email=self.user)
+        Meeting.objects.create(project_id=self.project, meeting_title='Kickoff', date_time=timezone.now())
+        ProjectLinks.objects.create(project=self.project, link_url='https://example.com', link_name='Repo')
+        pid = self.project.project_id
+        self.urls = [
+            f'/api/getprojecttasks/?project_id={pid}',
+            f'/api/getprojectdata/?project_id={pid}',
+            f'/api/getprojectmeetings/?project_id={pid}',
+            f'/api/getmembers/?projectId={pid}',
+            f'/api/getprojectlinks/?projectId={pid}',
+        ]
+
+    def etags(self):
+        return [self.client.get(url)['ETag'] for url in self.urls]
+
+    def test_matching_etag_returns_304_after_the_version_lookup(self):
+        # The project version, plus the membership version where the endpoint checks access first
+        expected = [2, 1, 2, 1, 1]
+        for url, etag, count in zip(self.urls, self.etags(), expected):
+            response, queries = self.count_queries('get', url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(queries, count, url)
+
+        # The POST endpoints still answer the existing frontend calls
+        response = self.client.post('/api/getmembers/', {'projectId': self.project.project_id}, format='json')
+        self.assertEqual([m['email'] for m in response.data['members']], ['student@example.com'])
+
+    def test_writes_to_the_project_change_every_etag(self):
+        newcomer = User.objects.create(email='new@example.com', first_name='N', last_name='U', password='x', security_question='q', security_answer='a')
+        before = self.etags()
+        writes = [
+            lambda: Meeting.objects.create(project_id=self.project, meeting_title='Review', date_time=timezone.now()),
+            lambda: ProjectLinks.objects.filter(project=self.project).first().delete(),
+            lambda: User_Task.objects.filter(task_id=self.task).delete(),
+            lambda: self.client.post('/api/addprojectmember/', {'project_id': self.project.project_id, 'email': newcomer.email, 'role': 'Student'}, format='json'),
+        ]
+        for write in writes:
+            write()
+            after = self.etags()
+            self.assertTrue(all(old != new for old, new in zip(before, after)))
+            before = after
+
+        # Writes to another project leave these ETags alone
+        other = Project.objects.create(project_name='Other', due_date=date.today(), created_on=date.today())
+        Task.objects.create(project_id=other, task_name='Elsewhere', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        self.assertEqual(self.etags(), before)
+
+    def test_stale_instance_save_keeps_the_version(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        Task.objects.create(project_id=self.project, task_name='New', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        bumped = Project.objects.get(pk=self.project.pk).version
+
+        stale.grade = 75
+        stale.save()
+        # The save itself bumps once more instead of writing the stale version back
+        self.assertEqual(Project.objects.get(pk=self.project.pk).version, bumped + 1)
+
+
+class ProjectCacheTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        project_cache.reset_cache_stats()
+        pid = self.project.project_id
+        self.members_url = f'/api/getmembers/?projectId={pid}'
+        self.links_url = f'/api/getprojectlinks/?projectId={pid}'
+        self.meetings_url = f'/api/getprojectmeetings/?project_id={pid}'
+
+    def read(self, url):
+        # Entries are stored on commit; TestCase keeps every request inside one transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(url)
+
+    def test_second_read_is_served_from_the_cache(self):
+        self.assertEqual(self.read(self.members_url)['X-Cache'], 'MISS')
+        response, queries = self.count_queries('get', self.members_url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(queries, 1)  # The version lookup only
+        self.assertEqual(response.data['members'][0]['first_name'], 'Stu')
+        self.assertEqual(project_cache.cache_stats()['members'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    @override_settings(PROJECT_CACHE_STATS_INTERVAL=0)
+    def test_stats_are_logged_by_the_serving_process(self):
+        with self.assertLogs('pcp_webapp.project_cache', level='INFO') as logs:
+            self.read(self.links_url)
+        self.assertIn(f'worker {os.getpid()}', logs.output[-1])
+        self.assertIn("'links': {'hits': 0, 'misses': 1, 'hit_rate': 0.0}", logs.output[-1])
+
+    def test_writes_invalidate_cached_payloads(self):
+        for url in (self.members_url, self.links_url, self.meetings_url):
+            self.read(url)
+
+        pid = self.project.project_id
+        with self.captureOnCommitCallbacks(execute=True):
+            membership = UserProject.objects.get(email=self.user, project_id=self.project)
+            membership.role = 'Supervisor'
+            membership.save()
+            self.client.post('/api/addprojectlink/', {'project_id': pid, 'link': 'https://example.com/repo', 'link_name': 'Repo'}, format='json')
+            Meeting.objects.create(project_id=self.project, meeting_title='Standup', date_time=timezone.now())
+
+        response = self.read(self.members_url)
+        self.assertEqual((response['X-Cache'], response.data['members'][0]['role']), ('MISS', 'Supervisor'))
+        response = self.read(self.links_url)
+        self.assertEqual([link['link_name'] for link in response.data['links']], ['Repo'])
+        response = self.read(self.meetings_url)
+        self.assertEqual([m['meeting_title'] for m in response.data['meetings']], ['Standup'])
+
+        # A renamed member shows up in the members payload at once
+        self.user.first_name = 'Stella'
+        self.user.save()
+        self.assertEqual(self.read(self.members_url).data['members'][0]['first_name'], 'Stella')
+
+    def test_rolled_back_build_is_not_cached(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            project_cache.cached_payload(self.project.project_id, 0, 'links', lambda: ['uncommitted'])
+            raise RuntimeError
+        payload, hit = project_cache.cached_payload(self.project.project_id, 0, 'links', lambda: [])
+        self.assertEqual((payload, hit), ([], False))
+
+    def test_file_based_backend(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        caches_setting = {**settings.CACHES, 'files': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+        with override_settings(CACHES=caches_setting, PROJECT_CACHE_ALIAS='files'):
+            self.assertEqual(self.read(self.links_url)['X-Cache'], 'MISS')
+            self.assertEqual(self.read(self.links_url)['X-Cache'], 'HIT')
+            self.assertTrue(os.listdir(location))
+
+
+@override_settings(BATCH_WORKERS=1)  # Worker threads have their own connections and cannot see TestCase data
+class BatchRequestTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        Task.objects.create(project_id=self.project, task_name='Draft', task_due_date=date.today(), task_status='To Do', task_priority='Low')
+        self.pid = self.project.project_id
+
+    def batch(self, requests):
+        return self.client.post('/api/batch/', {'requests': requests}, format='json')
+
+    def test_project_page_loads_in_one_round_trip(self):
+        requests = [
+            {'id': 'data', 'url': f'/api/getprojectdata/?project_id={self.pid}'},
+            {'id': 'tasks', 'url': f'/api/getprojecttasks/?project_id={self.pid}'},
+            {'id': 'meetings', 'url': f'/api/getprojectmeetings/?project_id={self.pid}'},
+            {'id': 'members', 'method': 'POST', 'url': '/api/getmembers/', 'body': {'projectId': self.pid}},
+            {'id': 'missing', 'url': '/api/nosuchroute/'},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.batch(requests)
+        self.assertEqual(response.status_code, 200)
+        results = {result['id']: result for result in response.data['responses']}
+        self.assertEqual([result['id'] for result in response.data['responses']], ['data', 'tasks', 'meetings', 'members', 'missing'])
+        self.assertEqual(results['data']['body']['project_data']['project_name'], 'Portal')
+        self.assertEqual([task['task_name'] for task in results['tasks']['body']['tasks']], ['Draft'])
+        self.assertEqual(results['members']['body']['members'][0]['email'], 'student@example.com')
+        self.assertEqual(results['missing']['status'], 404)
+        # The token is resolved and the membership map loaded once for the whole batch
+        sql = [query['sql'] for query in ctx.captured_queries]
+        self.assertEqual(sum(q.startswith('SELECT "pcp_webapp_user"."email"') and 'LIMIT 21' in q for q in sql), 1)
+        self.assertEqual(sum('"pcp_webapp_userproject"."email_id" =' in q for q in sql), 1)
+
+        # Sub-requests can revalidate with their own If-None-Match
+        etag = results['tasks']['headers']['ETag']
+        response = self.batch([{'url': f'/api/getprojecttasks/?project_id={self.pid}', 'headers': {'If-None-Match': etag}}])
+        self.assertEqual((response.data['responses'][0]['status'], response.data['responses'][0]['body']), (304, None))
+
+    def test_authentication_and_validation(self):
+        other = Project.objects.create(project_name='Other', due_date=date.today(), created_on=date.today())
+        response = self.batch([{'url': f'/api/getprojecttasks/?project_id={other.project_id}'}])
+        self.assertEqual(response.data['responses'][0]['status'], 403)
+
+        self.assertEqual(self.batch([{'url': '/api/batch/'}]).status_code, 400)
+        self.assertEqual(self.batch([{'url': 'https://example.com/api/getmembers/'}]).status_code, 400)
+        self.assertEqual(self.batch([{'url': '/api/getmembers/', 'method': 'TRACE'}]).status_code, 400)
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.client.credentials()
+        self.assertEqual(self.batch([{'url': f'/api/getprojectdata/?project_id={self.pid}'}]).status_code, 401)
+
+    def test_writes_run_in_order_between_reads(self):
+        response = self.batch([
+            {'id': 'before', 'url': f'/api/getprojectlinks/?projectId={self.pid}'},
+            {'id': 'add', 'method': 'POST', 'url': '/api/addprojectlink/', 'body': {'project_id': self.pid, 'link': 'https://example.com', 'link_name': 'Repo'}},
+            {'id': 'after', 'url': f'/api/getprojectlinks/?projectId={self.pid}'},
+        ])
+        before, add, after = response.data['responses']
+        self.assertEqual(before['body']['links'], [])
+        self.assertEqual(add['status'], 201)
+        self.assertEqual([link['link_name'] for link in after['body']['links']], ['Repo'])
+
+
+class ConcurrentBatchTests(TransactionTestCase):
+    def test_reads_run_concurrently_on_worker_threads(self):
+        cache.clear()
+        user = User.objects.create(email='student@example.com', first_name='Stu', last_name='Dent', password='x', security_question='q', security_answer='a')
+        project = Project.objects.create(project_name='Portal', due_date=date.today(), created_on=date.today())
+        UserProject.objects.create(email=user, project_id=project, role='Group Leader')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {make_token(user)}')
+
+        threads = set()
+        dispatch = batch._dispatch
+        def recording_dispatch(*args):
+            threads.add(threading.current_thread().name)
+            return dispatch(*args)
+
+        urls = [f'/api/getprojectdata/?project_id={project.project_id}', f'/api/getmembers/?projectId={project.project_id}'] * 3
+        with mock.patch.object(batch, '_dispatch', side_effect=recording_dispatch):
+            response = client.post('/api/batch/', {'requests': [{'url': url} for url in urls]}, format='json')
+        self.assertEqual([result['status'] for result in response.data['responses']], [200] * 6)
+        self.assertEqual(response.data['responses'][1]['body']['members'][0]['email'], 'student@example.com')
+        self.assertTrue(threads and all(name.startswith('pcp-batch') for name in threads))
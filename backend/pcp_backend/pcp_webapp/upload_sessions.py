@@ -0,0 +1,176 @@
+"""
+Resumable chunked uploads.
+
+A client creates an UploadSession, PUTs the file in chunks (each with its byte
+offset and SHA-256) and finalizes it. Each chunk is streamed to a temporary file
+and verified, then appended to a part file on disk, so memory per upload is
+bounded by the read buffer; after a dropped connection the client asks for
+received_size and continues from there.
+Finalizing moves the part file into the content-addressed blob store and
+creates the Document in one transaction.
+"""
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from .models import UploadSession
+from .blob_store import create_document
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the request body at a time while writing a chunk
+READ_BUFFER_SIZE = 64 * 1024
+
+class UploadError(Exception):
+    """Rejected chunk or finalize; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+class PartFile(File):
+    """Finished part file; exposing its path lets FileSystemStorage move it instead of copying"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+def part_path(session):
+    directory = getattr(settings, 'UPLOAD_SESSION_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'upload_sessions')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{session.upload_id}.part')
+
+def _check_chunk(session, offset, length):
+    if session.status != 'active':
+        raise UploadError('Upload is already finalized', 409)
+    if offset != session.received_size:
+        raise UploadError(f'Expected offset {session.received_size}', 409)
+    if offset + length > session.total_size:
+        raise UploadError('Chunk extends past the declared file size', 400)
+
+def _receive_chunk(stream, length, checksum, directory):
+    """
+    Read `length` bytes from the client into a temporary file next to the part files, without
+    any database transaction open; returns its path once the size and SHA-256 match.
+    """
+    hasher = hashlib.sha256()
+    written = 0
+    fd, path = tempfile.mkstemp(suffix='.chunk', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as chunk:
+            while written < length:
+                data = stream.read(min(READ_BUFFER_SIZE, length - written))
+                if not data:
+                    break
+                chunk.write(data)
+                hasher.update(data)
+                written += len(data)
+        if written != length or hasher.hexdigest() != checksum.lower():
+            raise UploadError('Chunk checksum mismatch or incomplete chunk', 400)
+    except BaseException:
+        discard_part(path)
+        raise
+    return path
+
+def write_chunk(session_id, stream, offset, length, checksum):
+    """
+    Append `length` bytes read from `stream` at `offset` and return the session.
+    The offset must equal the bytes already received; a chunk whose SHA-256 differs
+    from `checksum` is discarded so the client can resend it.
+    The chunk is received and verified before the session row is locked, so a slow
+    client never holds a transaction open; the lock only covers the offset check and
+    the local copy into the part file.
+    """
+    session = UploadSession.objects.get(upload_id=session_id)
+    _check_chunk(session, offset, length)
+
+    path = part_path(session)
+    chunk_path = _receive_chunk(stream, length, checksum, os.path.dirname(path))
+    try:
+        with transaction.atomic():
+            # Row lock serialises appends for the same session; re-check what another PUT may have changed
+            session = UploadSession.objects.select_for_update().get(upload_id=session_id)
+            _check_chunk(session, offset, length)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as part, open(chunk_path, 'rb') as chunk:
+                part.seek(offset)
+                shutil.copyfileobj(chunk, part, READ_BUFFER_SIZE)
+                part.truncate(offset + length)
+
+            session.received_size = offset + length
+            session.save(update_fields=['received_size', 'updated_at'])
+            return session
+    finally:
+        discard_part(chunk_path)
+
+def _check_complete(session):
+    if session.received_size != session.total_size:
+        raise UploadError(f'Upload incomplete: {session.received_size} of {session.total_size} bytes received', 409)
+
+def _part_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for data in iter(lambda: part.read(READ_BUFFER_SIZE), b''):
+            hasher.update(data)
+    return hasher.hexdigest()
+
+def finalize(session_id):
+    """
+    Create the Document for a fully received upload (idempotent for finished sessions).
+    Once every byte is received write_chunk accepts nothing that changes the part file,
+    so it is hashed before the session row is locked; the lock only covers the re-check
+    and creating the Document.
+    """
+    session = UploadSession.objects.get(upload_id=session_id)
+    if session.status == 'complete':
+        return session
+    _check_complete(session)
+
+    path = part_path(session)
+    digest = _part_sha256(path)
+    if session.sha256 and session.sha256.lower() != digest:
+        raise UploadError('File checksum mismatch', 400)
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(upload_id=session_id)
+        if session.status == 'complete':
+            return session
+        _check_complete(session)
+
+        with PartFile(open(path, 'rb'), name=session.document_title) as part:
+            part.sha256 = digest
+            session.document = create_document(
+                part,
+                task_id=session.task_id,
+                document_title=session.document_title,
+                document_description=session.document_description,
+                doc_type=session.doc_type,
+                last_modified_by=session.email,
+            )
+        session.status = 'complete'
+        session.save(update_fields=['document', 'status', 'updated_at'])
+        # Removed only once the Document is committed (already gone if the storage moved it)
+        transaction.on_commit(lambda: discard_part(path))
+        return session
+
+def discard_part(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def prune_sessions(max_age=None):
+    """Delete unfinished sessions (and their part files) idle for longer than max_age"""
+    if max_age is None:
+        max_age = timedelta(hours=getattr(settings, 'UPLOAD_SESSION_TTL_HOURS', 24))
+    stale = UploadSession.objects.filter(status='active', updated_at__lt=timezone.now() - max_age)
+    count = 0
+    for session in stale.iterator():
+        discard_part(part_path(session))
+        session.delete()
+        count += 1
+    return count
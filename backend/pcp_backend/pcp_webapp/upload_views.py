@@ -1,7 +1,7 @@
 import os
+import posixpath
 import json
 import logging
-import jwt
 import mimetypes
 from datetime import datetime
 from django.http import JsonResponse, HttpResponse, Http404, HttpResponseBadRequest
@@ -10,35 +10,21 @@ from django.views.decorators.http import require_http_methods
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from .models import User, Task, User_Task, Project, UserProject
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from collections import defaultdict
+from .models import Task, User_Task, Project, UploadedDocument
+from . import authentication
+from .file_serving import stream_file
+from .blob_store import store_blob, link_blob
+from .membership import member_project_ids
+from .document_index import index_upload, index_task_upload
 
 logger = logging.getLogger(__name__)
 
 def get_user_from_token(request):
     """Extract user from JWT token in request headers or query parameters"""
-    try:
-        # First check Authorization header
-        token = None
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-        # If not in header, check URL parameters
-        elif 'token' in request.GET:
-            token = request.GET.get('token')
-            
-        if not token:
-            return None
-            
-        # Decode the token
-        payload = jwt.decode(token, options={"verify_signature": False})
-        user_email = payload.get('user_email')
-        
-        if user_email:
-            return User.objects.get(email=user_email)
-        return None
-    except Exception as e:
-        logger.error(f"Token validation error: {str(e)}")
-        return None
+    return authentication.get_user_from_token(request, allow_query_param=True)
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -97,6 +83,7 @@ def upload_document(request):
             f'{user_dir}/{metadata_filename}',
             ContentFile(json.dumps(metadata, indent=2))
         )
+        index_upload(user, metadata, metadata_path)
         
         logger.info(f"File uploaded successfully: {file_path} by {user.email}")
         
@@ -130,7 +117,7 @@ def upload_document(request):
 def list_uploaded_documents(request):
     """
     List all uploaded documents for the authenticated user.
-    Reads from file system instead of database.
+    Reads from the UploadedDocument index (backfilled from the sidecars by import_document_sidecars).
     """
     try:
         # Authenticate user
@@ -138,39 +125,21 @@ def list_uploaded_documents(request):
         if not user:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
-        user_dir = f'documents/{user.email}'
-        documents = []
-        
-        # Check if user directory exists
-        if default_storage.exists(user_dir):
-            # List all files in user directory
-            try:
-                dirs, files = default_storage.listdir(user_dir)
-                
-                # Process metadata files to get document info
-                for file in files:
-                    if file.endswith('_metadata.json'):
-                        try:
-                            metadata_path = f'{user_dir}/{file}'
-                            with default_storage.open(metadata_path, 'r') as f:
-                                metadata = json.load(f)
-                                documents.append({
-                                    'id': metadata.get('upload_date', '').replace(':', '').replace('-', ''),
-                                    'title': metadata.get('title', ''),
-                                    'name': metadata.get('title', ''),
-                                    'description': metadata.get('description', ''),
-                                    'file_size': metadata.get('file_size', 0),
-                                    'file_type': metadata.get('file_type', ''),
-                                    'upload_date': metadata.get('upload_date', ''),
-                                    'uploaded_by': metadata.get('uploaded_by', ''),
-                                    'file_path': metadata.get('file_path', '')
-                                })
-                        except Exception as e:
-                            logger.warning(f"Error reading metadata file {file}: {str(e)}")
-                            continue
-                            
-            except Exception as e:
-                logger.warning(f"Error listing directory {user_dir}: {str(e)}")
+        # Read the metadata index instead of opening every sidecar
+        documents = [
+            {
+                'id': doc.upload_date.replace(':', '').replace('-', ''),
+                'title': doc.title,
+                'name': doc.title,
+                'description': doc.description,
+                'file_size': doc.file_size,
+                'file_type': doc.file_type,
+                'upload_date': doc.upload_date,
+                'uploaded_by': doc.uploader,
+                'file_path': doc.file_path
+            }
+            for doc in UploadedDocument.objects.filter(email=user, source='upload').order_by('uploaded_document_id')
+        ]
         
         return JsonResponse({'documents': documents}, status=200)
         
@@ -207,29 +176,31 @@ def view_document(request, file_path):
         if not default_storage.exists(decoded_path):
             return JsonResponse({'error': 'File not found'}, status=404)
         
-        # Open and serve the file
+        # Stream the file (supports Range requests and conditional GETs)
         try:
             file_obj = default_storage.open(decoded_path, 'rb')
             
             # Get file content type
-            import mimetypes
             content_type, _ = mimetypes.guess_type(decoded_path)
             if not content_type:
                 content_type = 'application/octet-stream'
             
-            # Create HTTP response with file content
-            from django.http import HttpResponse
-            response = HttpResponse(file_obj.read(), content_type=content_type)
-            
             # Get filename for Content-Disposition header
             filename = decoded_path.split('/')[-1]
             
-            # Set headers for inline viewing (not download)
-            response['Content-Disposition'] = f'inline; filename="{filename}"'
-            response['Content-Length'] = default_storage.size(decoded_path)
+            last_modified = default_storage.get_modified_time(decoded_path)
             
-            file_obj.close()
-            return response
+            # Serve inline for viewing (not download)
+            return stream_file(
+                request,
+                file_obj,
+                content_type,
+                filename,
+                disposition='inline',
+                last_modified=last_modified,
+                etag=f"{int(last_modified.timestamp() * 1000000)}-{file_obj.size}",
+                name=decoded_path,
+            )
             
         except Exception as e:
             logger.error(f"Error serving document: {str(e)}")
@@ -255,57 +226,52 @@ def get_user_tasks_with_documents(request):
         if not auth_header.startswith('Bearer '):
             return JsonResponse({'error': 'Invalid authorization header'}, status=401)
         
-        token = auth_header.split(' ')[1]
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            user_email = payload.get('email')
-            user = User.objects.get(email=user_email)
-        except (jwt.InvalidTokenError, User.DoesNotExist):
+        user = get_user_from_token(request)
+        if not user:
             return JsonResponse({'error': 'Invalid token or user not found'}, status=401)
 
         # Get all tasks assigned to the user
-        user_tasks = User_Task.objects.filter(email=user).select_related('task_id', 'task_id__project_id')
+        user_tasks = User_Task.objects.filter(email=user, task_id__project_id__is_deleted=False).select_related('task_id', 'task_id__project_id')
         
         # Get all projects the user is part of to determine read-only access
-        user_projects = UserProject.objects.filter(email=user).select_related('project_id')
-        user_project_ids = [up.project_id.project_id for up in user_projects]
+        user_project_ids = member_project_ids(user)
+        
+        own_task_ids = [ut.task_id.task_id for ut in user_tasks]
+        
+        # Get read-only access to other team members' tasks in shared projects
+        other_tasks = Task.objects.filter(
+            project_id__project_id__in=user_project_ids
+        ).exclude(
+            task_id__in=own_task_ids
+        ).select_related('project_id')
+        
+        # One indexed query for every document: the user's own files on their tasks,
+        # and files uploaded by the assignees of the other tasks
+        assignee_upload = User_Task.objects.filter(task_id=OuterRef('task_id'), email=OuterRef('email'))
+        documents_by_task = defaultdict(list)
+        indexed = UploadedDocument.objects.filter(source='task').filter(
+            Q(email=user, task_id__in=own_task_ids) |
+            Q(Exists(assignee_upload), task_id__in=other_tasks.values('task_id'))
+        ).order_by('uploaded_document_id')
+        for doc in indexed:
+            own = doc.email_id == user.email
+            documents_by_task[doc.task_id_id].append({
+                'filename': doc.filename,
+                'title': doc.title,
+                'description': doc.description,
+                'size': doc.file_size,
+                'type': doc.file_type,
+                'upload_date': doc.upload_date,
+                'uploader': doc.uploader,
+                'file_path': f"{doc.email_id}/{doc.filename}",
+                'can_edit': own,  # Users can edit their own documents, others' are read-only
+                'can_delete': own
+            })
         
         tasks_data = []
         
         for user_task in user_tasks:
             task = user_task.task_id
-            
-            # Get documents for this task (from user's directory)
-            user_doc_dir = os.path.join(settings.MEDIA_ROOT, 'documents', user.email)
-            task_documents = []
-            
-            if os.path.exists(user_doc_dir):
-                for filename in os.listdir(user_doc_dir):
-                    if filename.endswith('.json'):
-                        continue
-                    
-                    metadata_file = os.path.join(user_doc_dir, f"{filename}.json")
-                    if os.path.exists(metadata_file):
-                        try:
-                            with open(metadata_file, 'r') as f:
-                                metadata = json.load(f)
-                                # Check if document is associated with this task
-                                if metadata.get('task_id') == task.task_id:
-                                    task_documents.append({
-                                        'filename': filename,
-                                        'title': metadata.get('title', filename),
-                                        'description': metadata.get('description', ''),
-                                        'size': metadata.get('size', 0),
-                                        'type': metadata.get('type', ''),
-                                        'upload_date': metadata.get('upload_date', ''),
-                                        'uploader': metadata.get('uploader', ''),
-                                        'file_path': f"{user.email}/{filename}",
-                                        'can_edit': True,  # User can edit their own documents
-                                        'can_delete': True
-                                    })
-                        except json.JSONDecodeError:
-                            continue
-            
             tasks_data.append({
                 'task_id': task.task_id,
                 'task_name': task.task_name,
@@ -315,52 +281,13 @@ def get_user_tasks_with_documents(request):
                 'task_priority': task.task_priority,
                 'project_id': task.project_id.project_id,
                 'project_name': task.project_id.project_name,
-                'documents': task_documents,
+                'documents': documents_by_task.get(task.task_id, []),
                 'can_upload': True,  # User can upload to their assigned tasks
                 'access_level': 'full'  # Full CRUD access to assigned tasks
             })
         
-        # Get read-only access to other team members' tasks in shared projects
-        other_tasks = Task.objects.filter(
-            project_id__project_id__in=user_project_ids
-        ).exclude(
-            task_id__in=[ut.task_id.task_id for ut in user_tasks]
-        ).select_related('project_id')
-        
         for task in other_tasks:
-            # Get task assignee documents (read-only)
-            task_assignees = User_Task.objects.filter(task_id=task).select_related('email')
-            task_documents = []
-            
-            for assignee in task_assignees:
-                assignee_doc_dir = os.path.join(settings.MEDIA_ROOT, 'documents', assignee.email.email)
-                
-                if os.path.exists(assignee_doc_dir):
-                    for filename in os.listdir(assignee_doc_dir):
-                        if filename.endswith('.json'):
-                            continue
-                        
-                        metadata_file = os.path.join(assignee_doc_dir, f"{filename}.json")
-                        if os.path.exists(metadata_file):
-                            try:
-                                with open(metadata_file, 'r') as f:
-                                    metadata = json.load(f)
-                                    if metadata.get('task_id') == task.task_id:
-                                        task_documents.append({
-                                            'filename': filename,
-                                            'title': metadata.get('title', filename),
-                                            'description': metadata.get('description', ''),
-                                            'size': metadata.get('size', 0),
-                                            'type': metadata.get('type', ''),
-                                            'upload_date': metadata.get('upload_date', ''),
-                                            'uploader': metadata.get('uploader', ''),
-                                            'file_path': f"{assignee.email.email}/{filename}",
-                                            'can_edit': False,  # Read-only access
-                                            'can_delete': False
-                                        })
-                            except json.JSONDecodeError:
-                                continue
-            
+            task_documents = documents_by_task.get(task.task_id)
             if task_documents:  # Only include tasks that have documents
                 tasks_data.append({
                     'task_id': task.task_id,
@@ -397,12 +324,8 @@ def upload_task_document(request):
         if not auth_header.startswith('Bearer '):
             return JsonResponse({'error': 'Invalid authorization header'}, status=401)
         
-        token = auth_header.split(' ')[1]
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            user_email = payload.get('email')
-            user = User.objects.get(email=user_email)
-        except (jwt.InvalidTokenError, User.DoesNotExist):
+        user = get_user_from_token(request)
+        if not user:
             return JsonResponse({'error': 'Invalid token or user not found'}, status=401)
 
         # Get form data
@@ -430,11 +353,8 @@ def upload_task_document(request):
         user_dir = os.path.join(settings.MEDIA_ROOT, 'documents', user.email)
         os.makedirs(user_dir, exist_ok=True)
         
-        # Save file
+        # Store the content once (content-addressed) and link it into the user directory
         file_path = os.path.join(user_dir, uploaded_file.name)
-        with open(file_path, 'wb+') as destination:
-            for chunk in uploaded_file.chunks():
-                destination.write(chunk)
         
         # Create metadata with task association
         metadata = {
@@ -450,10 +370,15 @@ def upload_task_document(request):
             'project_name': task.project_id.project_name
         }
         
-        # Save metadata
+        # Save metadata; the index row references the blob in the same transaction that
+        # locked it, so a concurrent release cannot delete the blob in between
         metadata_path = os.path.join(user_dir, f"{uploaded_file.name}.json")
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        with transaction.atomic():
+            blob = store_blob(uploaded_file)
+            link_blob(blob, file_path)
+            with open(metadata_path, 'w') as f:
+                json.dump(metadata, f, indent=2)
+            index_task_upload(user, uploaded_file.name, metadata, f'documents/{user.email}/{uploaded_file.name}.json', blob=blob)
         
         logger.info(f"Task document uploaded successfully: {uploaded_file.name} for task {task_id} by {user.email}")
         
@@ -470,6 +395,12 @@ def upload_task_document(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _within(path, directory):
+    """Whether a storage path stays inside directory (which ends with '/')"""
+    if not isinstance(path, str):
+        return False
+    return posixpath.normpath(path).startswith(directory) and '..' not in path.split('/')
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def update_metadata(request):
@@ -502,13 +433,21 @@ def update_metadata(request):
             )
         
         # Security check: Ensure the file is within the user's directory
-        user_dir = f'documents/{user.email}'
-        if not file_path.startswith(user_dir):
+        user_dir = f'documents/{user.email}/'
+        if not _within(file_path, user_dir):
             return JsonResponse(
                 {'error': 'Unauthorized to update this file'}, 
                 status=403
             )
         
+        # The sidecar may only describe a file in the same directory: index_upload would
+        # otherwise hand another user's indexed file to this user
+        if metadata.get('file_path') and not _within(metadata['file_path'], user_dir):
+            return JsonResponse(
+                {'error': 'Unauthorized to update this file'},
+                status=403
+            )
+
         # Ensure we're only updating metadata files
         if not file_path.endswith('_metadata.json'):
             return JsonResponse(
@@ -520,6 +459,13 @@ def update_metadata(request):
         try:
             with default_storage.open(file_path, 'w') as f:
                 json.dump(metadata, f, indent=2)
+            
+            # Keep the metadata index in step with the sidecar
+            indexed = UploadedDocument.objects.filter(metadata_path=file_path).first()
+            if indexed is not None:
+                index_upload(user, {**metadata, 'file_path': indexed.file_path}, file_path)
+            elif metadata.get('file_path'):
+                index_upload(user, metadata, file_path)
                 
             logger.info(f"Updated metadata file: {file_path}")
             return JsonResponse({
@@ -566,8 +512,8 @@ def delete_document(request):
             return JsonResponse({'error': 'Invalid JSON payload'}, status=400)
         
         # Security check: Ensure the file is within the user's directory
-        user_dir = f'documents/{user.email}'
-        if not file_path.startswith(user_dir):
+        user_dir = f'documents/{user.email}/'
+        if not _within(file_path, user_dir):
             return JsonResponse(
                 {'error': 'Unauthorized to delete this file'}, 
                 status=403
@@ -598,6 +544,7 @@ def delete_document(request):
         
         # Delete the main file
         default_storage.delete(file_path)
+        UploadedDocument.objects.filter(file_path=file_path).delete()
         logger.info(f"Deleted file: {file_path}")
         
         # Delete the metadata file if found
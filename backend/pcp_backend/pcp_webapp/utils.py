@@ -1,65 +1,98 @@
+from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
-from pcp_webapp.models import Notification, User_Task, Project, UserProject, Task
+from pcp_webapp.models import Notification, UserNotification, User_Task, UserProject
+from pcp_webapp.notifications import invalidate_unread_counts
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_notification(project, user, title, message, notification_type, task=None, grades=None, due_date=None, requested_by=None):
-    """Helper function to create a notification."""
-    try:
-        with transaction.atomic():
-            notification = Notification.objects.create(
-                project_id=project,
-                project=project,
-                task=task,
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                time_sent=timezone.now(),
-                grades=grades,
-                due_date=due_date,
-                requested_by=requested_by
-            )
-            logger.info(f"Notification created: {notification_type} for user {user.email} on project {project.project_name}")
-    except Exception as e:
-        logger.error(f"Failed to create notification {notification_type} for user {user.email}: {str(e)}")
+# Tasks in these states no longer need a deadline reminder
+DONE_STATUSES = ['Completed', 'Finalized']
 
-def notify_due_dates():
-    """Check and send notifications for projects and tasks with approaching due dates."""
-    threshold_date = timezone.now().date() + timezone.timedelta(days=2)  # Notify for due dates within 2 days
-    # Project due dates
-    projects = Project.objects.filter(due_date__lte=threshold_date, due_date__gte=timezone.now().date())
-    for project in projects:
-        members = UserProject.objects.filter(project_id=project)
-        for member in members:
-            user = member.email
-            title = f"Project Deadline Approaching: {project.project_name}"
-            message = f"The project '{project.project_name}' is due on {project.due_date}. Please ensure all tasks are completed."
-            create_notification(
-                project=project,
-                user=user,
-                title=title,
-                message=message,
-                notification_type='deadline_approaching',
-                due_date=project.due_date
-            )
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
-    # Task due dates
-    tasks = Task.objects.filter(task_due_date__lte=threshold_date, task_due_date__gte=timezone.now().date())
-    for task in tasks:
-        project = task.project_id
-        members = User_Task.objects.filter(task_id=task)
-        for member in members:
-            user = member.email
-            title = f"Task Deadline Approaching: {task.task_name}"
-            message = f"The task '{task.task_name}' in project '{project.project_name}' is due on {task.task_due_date}."
-            create_notification(
-                project=project,
-                user=user,
-                title=title,
-                message=message,
-                notification_type='deadline_approaching',
-                task=task,
-                due_date=task.task_due_date
-            )
\ No newline at end of file
+def due_soon_notifications(today, threshold_date):
+    """
+    {dedupe_key: (project_id, title, message, recipient emails)} for every project and unfinished task
+    due between today and threshold_date, built from one joined query for each.
+    """
+    pending = {}
+
+    # Projects being deleted in the background are hidden from their members, so no reminders either
+    projects = UserProject.objects.filter(
+        project_id__due_date__gte=today, project_id__due_date__lte=threshold_date, project_id__is_deleted=False
+    ).values_list('project_id', 'project_id__project_name', 'project_id__due_date', 'email_id')
+    for project_id, project_name, due_date, email in projects.iterator():
+        key = f'due:project:{project_id}:{today.isoformat()}'
+        if key not in pending:
+            title = f"Project Deadline Approaching: {project_name}"
+            message = f"The project '{project_name}' is due on {due_date}. Please ensure all tasks are completed."
+            pending[key] = (project_id, title[:100], message, [])
+        pending[key][3].append(email)
+
+    tasks = User_Task.objects.filter(
+        task_id__task_due_date__gte=today, task_id__task_due_date__lte=threshold_date, task_id__project_id__is_deleted=False
+    ).exclude(task_id__task_status__in=DONE_STATUSES).values_list(
+        'task_id', 'task_id__task_name', 'task_id__task_due_date', 'task_id__project_id', 'task_id__project_id__project_name', 'email_id'
+    )
+    for task_id, task_name, due_date, project_id, project_name, email in tasks.iterator():
+        key = f'due:task:{task_id}:{today.isoformat()}'
+        if key not in pending:
+            title = f"Task Deadline Approaching: {task_name}"
+            message = f"The task '{task_name}' in project '{project_name}' is due on {due_date}."
+            pending[key] = (project_id, title[:100], message, [])
+        pending[key][3].append(email)
+
+    return pending
+
+def notify_due_dates(today=None, days_ahead=2):
+    """
+    Send one notification per project and task due within `days_ahead` days to its members.
+    Notifications carry a per-day dedupe_key and links are unique per user, so running the job
+    again on the same day inserts nothing. Returns (notifications created, links created).
+    """
+    today = today or timezone.localdate()
+    threshold_date = today + timedelta(days=days_ahead)
+    batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 1000)
+
+    pending = due_soon_notifications(today, threshold_date)
+    if not pending:
+        return 0, 0
+
+    keys = list(pending)
+    time_sent = timezone.now()
+    with transaction.atomic():
+        existing = set()
+        for chunk in _chunks(keys, batch_size):
+            existing.update(Notification.objects.filter(dedupe_key__in=chunk).values_list('dedupe_key', flat=True))
+        new_notifications = [
+            Notification(time_sent=time_sent, title=title, message=message, dedupe_key=key, project_id=project_id)
+            for key, (project_id, title, message, _) in pending.items() if key not in existing
+        ]
+        # ignore_conflicts covers a concurrent run inserting the same keys
+        Notification.objects.bulk_create(new_notifications, batch_size=batch_size, ignore_conflicts=True)
+
+        notif_ids = {}
+        for chunk in _chunks(keys, batch_size):
+            notif_ids.update(Notification.objects.filter(dedupe_key__in=chunk).values_list('dedupe_key', 'notif_id'))
+
+        # Only notifications from an earlier run can already have links
+        linked = set()
+        existing_ids = [notif_ids[key] for key in existing]
+        for chunk in _chunks(existing_ids, batch_size):
+            linked.update(UserNotification.objects.filter(notif_id__in=chunk).values_list('email_id', 'notif_id'))
+        links = [
+            UserNotification(email_id=email, notif_id=notif_ids[key])
+            for key, (_, _, _, emails) in pending.items()
+            for email in dict.fromkeys(emails)
+            if (email, notif_ids[key]) not in linked
+        ]
+        UserNotification.objects.bulk_create(links, batch_size=batch_size, ignore_conflicts=True)
+        invalidate_unread_counts({link.email_id for link in links})
+
+    logger.info(f"Due date notifications for {today}: {len(new_notifications)} created, {len(links)} recipients linked")
+    return len(new_notifications), len(links)
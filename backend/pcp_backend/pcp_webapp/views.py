@@ -2,14 +2,18 @@ import os
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import UntypedToken, AccessToken 
+from rest_framework_simplejwt.tokens import AccessToken 
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from datetime import datetime, timedelta
-from .models import User, Project, UserProject, Task, User_Task, Document,ChatMessage, ProjectChat, ProjectLinks, Meeting, Notification, UserNotification
+from .models import User, Project, UserProject, Task, User_Task, Document,ChatMessage, ProjectChat, ProjectLinks, Meeting, Notification, UserNotification, UploadSession, ProjectDeletionJob
 from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import UploadedFile
 from django.core.files.base import ContentFile
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+from django.conf import settings
+from asgiref.sync import sync_to_async
+import asyncio
 from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated
 from .serializers import (
@@ -17,33 +21,40 @@ from .serializers import (
 )
 from rest_framework.decorators import api_view
 from rest_framework import status, permissions
-import bcrypt
 import logging
 import mimetypes
 from django.utils import timezone
-from django.db.models import Count
+from django.db.models import Count, F, Q, Subquery
 from zoneinfo import ZoneInfo
+from django.utils.dateparse import parse_date
 from django.db import transaction
-from collections import defaultdict
+from .authentication import get_user_from_token, resolve_user
+from .hashing import hash_password, check_password, HashingPoolBusy, busy_response
+from .counters import get_project_counters, refresh_stale_counters
+from .file_serving import stream_file, not_modified
+from .calendar_feed import calendar_etag, calendar_events, calendar_version, feed_key, rotate_feed_key, feed_calendar, feed_window, render_ics
+from .blob_store import create_document
+from .membership import is_member, get_role, member_project_ids
+from .notifications import split_recipients, fan_out, unread_count, mark_read
+from . import background
+from .queries import with_assignees, assignee_names, tasks_with_members
+from .upload_sessions import write_chunk, finalize, UploadError
+from .project_deletion import start_deletion, job_progress
+from .project_versions import project_version, project_etag, not_modified_response, tag_response
+from .project_cache import cached_payload
+from .batch import parse_batch, run_batch, BatchError
+from .chat_events import hub, get_backend, serialize_chat_message, publish_chat_message, format_event
 
 logger = logging.getLogger(__name__)
 
-# Helper function to extract user from JWT token
-def get_user_from_token(request):
-    """Helper function to extract user from JWT token"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return None
-    
-    token = auth_header.split(' ')[1]
-    try:
-        payload = UntypedToken(token).payload
-        user_email = payload.get('user_email')
-        return User.objects.get(email=user_email)
-    except (InvalidToken, User.DoesNotExist) as e:
-        logger.warning(f"Token validation failed: {e}")
-        return None
-    
+# Chat history pagination (messages per page when a cursor or limit is given)
+CHAT_PAGE_SIZE = 50
+CHAT_MAX_PAGE_SIZE = 200
+
+# Notification feed pagination
+NOTIFICATION_PAGE_SIZE = 20
+NOTIFICATION_MAX_PAGE_SIZE = 100
+
 #View that handles user login
 class LoginView(APIView):
     def post(self, request):
@@ -53,7 +64,7 @@ class LoginView(APIView):
             user = User.objects.get(email=email)
             
             try:
-                if not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
+                if not check_password(password, user.password):
                     return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
             except ValueError as e:
                 return Response({'error': f'Invalid password hash in database: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -72,6 +83,8 @@ class LoginView(APIView):
             })
         except User.DoesNotExist:
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+        except HashingPoolBusy:
+            return busy_response('Too many login attempts in progress, please try again')
         except Exception as e:
             return Response({'error': f'Login error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -84,38 +97,26 @@ class DashboardView(APIView):
         
         token = auth_header.split(' ')[1]
         try:
-            # Validate token
-            UntypedToken(token)
-            payload = UntypedToken(token).payload
-            user_email = payload.get('user_email')
-            user = User.objects.get(email=user_email)
-            user_projects = UserProject.objects.filter(email=user).select_related('project_id')
-            project_ids = [up.project_id.project_id for up in user_projects]  # Extract the actual project_id (integer)
-            tasks = Task.objects.filter(project_id__in=project_ids).values('project_id', 'task_status')
-
-            progress_by_project = {}
-            for project_id in project_ids:
-                project_tasks = [t for t in tasks if t['project_id'] == project_id]
-                total_tasks = len(project_tasks)
-                if total_tasks > 0:
-                    completed_tasks = sum(1 for t in project_tasks if t['task_status'] == 'Finalized')
-                    progress_by_project[project_id] = int((completed_tasks / total_tasks) * 100)
-                else:
-                    progress_by_project[project_id] = 0
-
-            projects = [
-                {
+            # Validate token and resolve the user (cached per token id)
+            user = resolve_user(token)
+            # One query: memberships joined to their projects and materialized task counters
+            user_projects = list(UserProject.objects.filter(email=user, project_id__is_deleted=False).select_related('project_id', 'project_id__task_counter'))
+            # Counters from an earlier day are recounted together, not one aggregate per project
+            refresh_stale_counters([user_project.project_id for user_project in user_projects])
+
+            projects = []
+            for user_project in user_projects:
+                counters = get_project_counters(user_project.project_id)
+                projects.append({
                     'project_id': user_project.project_id.project_id,
                     'project_name': user_project.project_id.project_name,
                     'project_description': user_project.project_id.project_description,
                     'feedback': user_project.project_id.feedback,
                     'grade': user_project.project_id.grade,
-                    'progress': progress_by_project.get(user_project.project_id.project_id, 0),
+                    'progress': int((counters.finalized_tasks / counters.total_tasks) * 100) if counters.total_tasks else 0,
                     'dueDate': user_project.project_id.due_date.strftime('%d/%m/%Y'),
                     'role': user_project.role
-                }
-                for user_project in user_projects
-            ]
+                })
                         
             return Response({
                 'email': user.email,
@@ -146,12 +147,12 @@ class AddUserView(APIView):
                 return Response({'error': 'All fields (email address, first name, last name, password, security question and answer) are required'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Hash password and convert to string for storage
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            hashed_security_answer = bcrypt.hashpw(security_answer.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
             # Check if user already exists
             if User.objects.filter(email=user_email).exists():
                 return Response({'error': 'User with this email already exists'}, status=status.HTTP_400_BAD_REQUEST)
+
+            hashed_password = hash_password(password)
+            hashed_security_answer = hash_password(security_answer)
             
             # Create new user using ORM
             user = User.objects.create(
@@ -163,6 +164,8 @@ class AddUserView(APIView):
                 security_answer=hashed_security_answer
             )
             return Response({'message': 'User added successfully', 'id': user.email}, status=status.HTTP_201_CREATED)
+        except HashingPoolBusy:
+            return busy_response()
         except Exception as e:
             return Response({'error': f'Failed to add user: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -196,10 +199,10 @@ class AddProjectView(APIView):
                 if index == 1:
                     group_leader_email = member_email
                 user = User.objects.get(email=member_email)
-                UserProject.objects.create(
+                UserProject.objects.get_or_create(
                     email=user,
                     project_id=project,
-                    role=role
+                    defaults={'role': role}
                 )
 
             # Auto-create "Final Submission" task if there's a Group Leader
@@ -218,7 +221,7 @@ class AddProjectView(APIView):
                     email=group_leader
                 )
 
-            return Response({'message': 'Project added successfully'}, status=status.HTTP_201_CREATED)
+            return Response({'message': 'Project added successfully', 'project_id': project.project_id}, status=status.HTTP_201_CREATED)
         except User.DoesNotExist:
             return Response({'error': 'One or more users not found'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -243,11 +246,11 @@ class UploadDocumentView(APIView):
             if not User_Task.objects.filter(email=user, task_id=task).exists():
                 return Response({'error': 'You are not assigned to this task'}, status=status.HTTP_403_FORBIDDEN)
 
-            document = Document.objects.create(
+            document = create_document(
+                file,
                 task_id=task,
                 document_title=title or file.name,
                 last_modified_by=user,
-                file=file,
                 doc_type=file.content_type or 'application/octet-stream'
             )
 
@@ -262,32 +265,53 @@ class UploadDocumentView(APIView):
             return Response({'error': f'Failed to upload document: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 #View that returns members of a project
+# GET (?projectId=) lets browsers revalidate with If-None-Match; POST is kept for existing callers
 class GetMembersView(APIView):
+    def get(self, request):
+        return self.members_response(request, request.query_params.get('projectId') or request.query_params.get('project_id'))
+
     def post(self, request):
+        return self.members_response(request, request.data.get('projectId'))
+
+    def members_list(self, project_id):
+        members = UserProject.objects.filter(project_id=project_id).values('email', 'role')
+        emails = [member['email'] for member in members]
+        first_names = User.objects.filter(email__in=emails).values('email', 'first_name', 'last_name')
+        first_name_map = {item['email']: item['first_name'] for item in first_names}
+        last_name_map = {item['email']: item['last_name'] for item in first_names}
+        return [
+            {
+                'email': member['email'],
+                'first_name': first_name_map.get(member['email'], 'Unknown'),  # Default to 'Unknown' if no first_name
+                'last_name': last_name_map.get(member['email'], 'Unknown'),   # Default to 'Unknown' if no last_name
+                'role': member['role']
+            }
+            for member in members
+        ]
+
+    def members_response(self, request, project_id):
             try:
-                # Extract projectId from the request body
-                project_id = request.data.get('projectId')
                 if not project_id:
                     return Response(
                         {'error': 'projectId is required'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
+
+                # Answer a current If-None-Match from the project version alone
+                version = project_version(project_id)
+                etag = project_etag(project_id, version, 'members') if version is not None else None
+                if etag:
+                    cached = not_modified_response(request, etag)
+                    if cached:
+                        return cached
  
-                members = UserProject.objects.filter(project_id=project_id).values('email', 'role')
-                emails = [member['email'] for member in members]
-                first_names = User.objects.filter(email__in=emails).values('email', 'first_name', 'last_name')
-                first_name_map = {item['email']: item['first_name'] for item in first_names}
-                last_name_map = {item['email']: item['last_name'] for item in first_names}
-                members_list = [
-                    {
-                        'email': member['email'],
-                        'first_name': first_name_map.get(member['email'], 'Unknown'),  # Default to 'Unknown' if no first_name
-                        'last_name': last_name_map.get(member['email'], 'Unknown'),   # Default to 'Unknown' if no last_name
-                        'role': member['role']
-                    }
-                    for member in members
-                ]
-                return Response({'members': members_list}, status=status.HTTP_200_OK)
+                if etag is None:
+                    return Response({'members': self.members_list(project_id)}, status=status.HTTP_200_OK)
+
+                members_list, hit = cached_payload(project_id, version, 'members', lambda: self.members_list(project_id))
+                response = tag_response(Response({'members': members_list}, status=status.HTTP_200_OK), etag)
+                response['X-Cache'] = 'HIT' if hit else 'MISS'
+                return response
             except Exception as e:
                 return Response(
                     {'error': f'Failed to fetch members: {str(e)}'},
@@ -318,7 +342,7 @@ class AddTaskView(APIView):
 
             for member_email in task_members:
                 user = User.objects.get(email=member_email)
-                User_Task.objects.create(
+                User_Task.objects.get_or_create(
                     email=user,
                     task_id=task,
                 )
@@ -339,69 +363,49 @@ class AddTaskView(APIView):
         except Project.DoesNotExist:
            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
 
-#View for calendar data        
+#View for calendar data
+# Query params (optional): start=YYYY-MM-DD, end=YYYY-MM-DD -> only events due in that window (inclusive)
+# Responses carry an ETag from the user's calendar version; a matching If-None-Match gets a 304.
 class CalendarView(APIView):
     def get(self, request):
         auth_header = request.headers.get('Authorization')
         if not auth_header or not auth_header.startswith('Bearer '):
             return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        
+
+        try:
+            start = parse_date(request.GET['start']) if request.GET.get('start') else None
+            end = parse_date(request.GET['end']) if request.GET.get('end') else None
+            if (request.GET.get('start') and start is None) or (request.GET.get('end') and end is None):
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if start and end and start > end:
+            return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+
         token = auth_header.split(' ')[1]
         try:
-            # Validate token
-            payload = UntypedToken(token).payload
-            user_email = payload.get('user_email')
-            
-            # Fetch user
-            user = User.objects.get(email=user_email)
-            
-            # Fetch user projects
-            user_projects = UserProject.objects.filter(email=user).select_related('project_id')
-            project_events = [
-                {
-                    'title': f"Project: {user_project.project_id.project_name}",
-                    'start': user_project.project_id.due_date.strftime('%Y-%m-%d'),
-                    'type': 'project',
-                    'id': user_project.project_id.project_id,
-                    'name': user_project.project_id.project_name,
-                    'description': user_project.project_id.project_description or '',
-                    'grade': user_project.project_id.grade,
-                    'role': user_project.role
-                }
-                for user_project in user_projects
-            ]
-            
-            # Fetch user tasks with project information
-            user_tasks = User_Task.objects.filter(email=user).select_related('task_id', 'task_id__project_id')
-            task_events = [
-                {
-                    'title': f"Task: {user_task.task_id.task_name}",
-                    'start': user_task.task_id.task_due_date.strftime('%Y-%m-%d'),
-                    'type': 'task',
-                    'id': user_task.task_id.task_id,
-                    'name': user_task.task_id.task_name,
-                    'description': user_task.task_id.task_description or '',
-                    'status': user_task.task_id.task_status,
-                    'priority': user_task.task_id.task_priority,
-                    'project': {
-                        'id': user_task.task_id.project_id.project_id,
-                        'name': user_task.task_id.project_id.project_name
-                    } if user_task.task_id.project_id else None
-                }
-                for user_task in user_tasks
-            ]
-            
-            # Combine project and task events
-            events = project_events + task_events
-            
+            # Validate token and fetch user
+            user = resolve_user(token)
+
+            etag = calendar_etag(user.email, calendar_version(user.email), 'json', start, end)
+            if not_modified(request, etag, None):
+                response = HttpResponse(status=304)
+                response['ETag'] = etag
+                return response
+
+            events = calendar_events(user, start, end)
+
             # Get current server time
             current_time = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            return Response({
+
+            response = Response({
                 'events': events,
                 'current_time': current_time
             })
-            
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+
         except InvalidToken:
             return Response({'error': 'Invalid token'}, status=status.HTTP_401_UNAUTHORIZED)
         except User.DoesNotExist:
@@ -409,6 +413,48 @@ class CalendarView(APIView):
         except Exception as e:
             return Response({'error': f'Database error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+#View that returns the URL of the user's iCalendar feed, for subscribing from external calendar apps
+class CalendarFeedUrlView(APIView):
+    def get(self, request):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        url = request.build_absolute_uri(f'/api/calendar/feed.ics?key={feed_key(user)}')
+        return Response({'url': url}, status=status.HTTP_200_OK)
+
+    # Revoke the current feed URL (e.g. after it leaked) and return a new one
+    def post(self, request):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        rotate_feed_key(user)
+        url = request.build_absolute_uri(f'/api/calendar/feed.ics?key={feed_key(user)}')
+        return Response({'url': url}, status=status.HTTP_200_OK)
+
+# iCalendar (.ics) feed of the user's project and task due dates from CALENDAR_FEED_PAST_DAYS ago onwards.
+# Calendar apps cannot send the Bearer header, so the user is identified by the signed ?key= from CalendarFeedUrlView.
+# Polls with a current If-None-Match get a 304 without any event query.
+@require_http_methods(["GET"])
+def calendar_feed(request):
+    calendar = feed_calendar(request.GET.get('key', ''))
+    if calendar is None:
+        return JsonResponse({'error': 'Invalid calendar key'}, status=403)
+
+    user, version = calendar.user, calendar.version
+    today = timezone.localdate()
+    etag = calendar_etag(user.email, version, 'ics', today)
+    if not_modified(request, etag, None):
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    events = calendar_events(user, start=feed_window(today))
+    response = HttpResponse(render_ics(events, version), content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = 'inline; filename="calendar.ics"'
+    return response
+
 #View that returns tasks for a user
 class GetUserTasksView(APIView):
     def get(self, request):
@@ -423,50 +469,22 @@ class GetUserTasksView(APIView):
         
         token = auth_header.split(' ')[1]
         try:
-            # Validate token
-            payload = UntypedToken(token).payload
-            user_email = payload.get('user_email')
-            user = User.objects.get(email=user_email)
-
-            # Fetch user's tasks
-            user_tasks = User_Task.objects.filter(email=user).select_related('task_id', 'task_id__project_id')
-
-            # Early exit if no tasks
-            if not user_tasks.exists():
-                return Response({'tasks': []}, status=status.HTTP_200_OK)
-
-            # Get unique task IDs for prefetching assignees
-            task_ids = [ut.task_id.task_id for ut in user_tasks]
-
-            # Prefetch all assignees for these tasks
-            all_assignees = User_Task.objects.filter(
-                task_id__in=task_ids
-            ).select_related('email')
-
-            # Group assignees by task_id
-            assignees_by_task = defaultdict(list)
-            for assignee in all_assignees:
-                assignees_by_task[assignee.task_id.task_id].append(assignee.email)
+            # Validate token and fetch user
+            user = resolve_user(token)
+
+            # The user's tasks in projects they belong to (memberships come from the cached map),
+            # with every task's assignees and their users prefetched: two queries in all
+            user_tasks = with_assignees(
+                Task.objects.filter(user_task__email=user, project_id__in=member_project_ids(user))
+                .select_related('project_id')
+                .order_by('user_task__user_task_id')
+            )
 
             # Build the tasks list with fellow assignees (exclude current user, include names)
             tasks_list = []
-            for user_task in user_tasks:
-                task = user_task.task_id
+            for task in user_tasks:
                 project_id = task.project_id.project_id  # Assuming custom PK
-
-                # Verify project access (per guideline)
-                if not UserProject.objects.filter(email=user, project_id=project_id).exists():
-                    continue  # Skip if no access (or raise 403 if strict)
-
-                # Get fellow assignees' details (exclude self)
-                fellow_users = [
-                    fellow for fellow in assignees_by_task[user_task.task_id.task_id]
-                    if fellow.email != user.email
-                ]
-                fellow_assignees = list(
-                    User.objects.filter(email__in=[f.email for f in fellow_users])
-                    .values('first_name', 'last_name', 'email')
-                )
+                fellow_assignees = [assignee for assignee in assignee_names(task) if assignee['email'] != user.email]
 
                 tasks_list.append({
                     'task_id': task.task_id,
@@ -578,7 +596,7 @@ class DocumentListView(APIView):
                 # If no project_id provided, try to get or create a default project for the user
                 try:
                     # First, try to find any project for the user
-                    user_projects = UserProject.objects.filter(email=user)
+                    user_projects = UserProject.objects.filter(email=user, project_id__is_deleted=False)
                     if user_projects.exists():
                         project = user_projects.first().project_id
                     else:
@@ -660,16 +678,18 @@ class GetProjectTasksView(APIView):
 
         try:
             # Get user's projects to verify access
-            user_projects = UserProject.objects.filter(email=user, project_id=project_id).exists()
-            if not user_projects:
+            if not is_member(user, project_id):
                 return Response({'error': 'Access denied to this project'}, status=status.HTTP_403_FORBIDDEN)
 
-            tasks = Task.objects.filter(project_id=project_id).select_related('project_id')
+            etag = project_etag(project_id, project_version(project_id), 'tasks')
+            cached = not_modified_response(request, etag)
+            if cached:
+                return cached
+
+            # Assignees and their names come from a single prefetch query
+            tasks = with_assignees(Task.objects.filter(project_id=project_id))
             tasks_data = []
             for task in tasks:
-                assignees = User_Task.objects.filter(task_id=task).select_related('email')
-                assignee_emails = [ut.email.email for ut in assignees]
-                assignee_names = User.objects.filter(email__in=assignee_emails).values('first_name', 'last_name', 'email')
                 tasks_data.append({
                     'task_id': task.task_id,
                     'task_name': task.task_name,
@@ -677,9 +697,9 @@ class GetProjectTasksView(APIView):
                     'task_due_date': task.task_due_date.strftime('%Y-%m-%d'),
                     'task_status': task.task_status,
                     'task_priority': task.task_priority,
-                    'assignees': list(assignee_names)
+                    'assignees': assignee_names(task)
                 })
-            return Response({'tasks': tasks_data}, status=status.HTTP_200_OK)
+            return tag_response(Response({'tasks': tasks_data}, status=status.HTTP_200_OK), etag)
         except Exception as e:
             return Response({'error': f'Failed to fetch tasks: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -734,11 +754,13 @@ class AddProjectUserView(APIView):
             
             project = Project.objects.get(project_id=project_id)
             user = User.objects.get(email=email)
-            project_user = UserProject.objects.create(
+            project_user, created = UserProject.objects.get_or_create(
                 project_id=project,
                 email=user,
-                role=role
+                defaults={'role': role}
             )
+            if not created:
+                return Response({'error': 'User is already a member of this project'}, status=status.HTTP_400_BAD_REQUEST)
             return Response({'message': 'User added to project successfully'}, status=status.HTTP_201_CREATED)
         except Project.DoesNotExist:
             return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -772,6 +794,10 @@ class GetProjectDataView(APIView):
                 return Response({'error': 'Project ID is required'}, status=status.HTTP_400_BAD_REQUEST)
            
             project = Project.objects.get(project_id=project_id)
+            etag = project_etag(project.project_id, project.version, 'data')
+            cached = not_modified_response(request, etag)
+            if cached:
+                return cached
  
             project_data = {
                 'project_name': project.project_name,
@@ -782,7 +808,7 @@ class GetProjectDataView(APIView):
                 'grade': project.grade or ''
             }
  
-            return Response({'project_data': project_data}, status=status.HTTP_200_OK)
+            return tag_response(Response({'project_data': project_data}, status=status.HTTP_200_OK), etag)
         except Project.DoesNotExist:
             return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -875,15 +901,15 @@ class DocumentUploadView(APIView):
             
             logger.info(f"Final title: {final_title}, MIME type: {mime_type}")
 
-            document = Document(
+            # Identical content is stored once and shared between documents
+            document = create_document(
+                file,
                 task_id=task,
                 document_title=final_title,
                 document_description=description,
                 doc_type=mime_type,
-                last_modified_by=user,
-                file=file
+                last_modified_by=user
             )
-            document.save()
             
             logger.info(f"Document saved: document_id={document.document_id}, doc_type={document.doc_type}")
             serializer = DocumentSerializer(document)
@@ -969,7 +995,7 @@ class DownloadDocumentView(APIView):
             # Verify user has access to the project associated with the document's task
             if document.task_id:
                 project_id = document.task_id.project_id
-                if not UserProject.objects.filter(email=user, project_id=project_id).exists():
+                if not is_member(user, project_id):
                     logger.error(f"User {user.email} does not have access to project {project_id.project_id}")
                     return Response({'error': 'Access denied to this document'}, status=status.HTTP_403_FORBIDDEN)
 
@@ -990,28 +1016,24 @@ class DownloadDocumentView(APIView):
             
             logger.info(f"Downloading: {safe_filename}, MIME: {mime_type}")
 
-            # Read and serve the file
+            # Stream the file (supports Range requests and conditional GETs)
             try:
-                file_content = document.file.open('rb')
-                file_data = file_content.read()
-                file_content.close()
-                
-                response = HttpResponse(
-                    content=file_data,
-                    content_type=mime_type
+                last_modified = document.date_time_last_modified
+                response = stream_file(
+                    request,
+                    document.file,
+                    mime_type,
+                    safe_filename,
+                    last_modified=last_modified,
+                    etag=f"{document.document_id}-{int(last_modified.timestamp() * 1000000)}",
                 )
-                
-                # Set proper headers for download
-                # Use both filename and filename* for better browser compatibility
-                response['Content-Disposition'] = f'attachment; filename="{safe_filename}"; filename*=UTF-8\'\'{safe_filename}'
-                response['Content-Length'] = len(file_data)
-                response['Content-Type'] = mime_type
-                
+
                 # Additional headers to help with file association
                 response['X-Content-Type-Options'] = 'nosniff'
-                response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-                
-                logger.info(f"Serving file: {safe_filename} ({len(file_data)} bytes) with MIME: {mime_type}")
+                # Let browsers keep a copy but revalidate it with the ETag on every use
+                response['Cache-Control'] = 'private, no-cache'
+
+                logger.info(f"Serving file: {safe_filename} (status {response.status_code}) with MIME: {mime_type}")
                 return response
                 
             except Exception as file_error:
@@ -1055,6 +1077,120 @@ class DeleteProjectUserView(APIView):
         except Exception as e:
             return Response({'error': f'Failed to delete member: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def upload_session_data(session):
+    return {
+        'upload_id': str(session.upload_id),
+        'status': session.status,
+        'received_size': session.received_size,
+        'total_size': session.total_size,
+        'chunk_size': settings.UPLOAD_SESSION_CHUNK_SIZE,
+        'document_id': session.document_id,
+    }
+
+#View that starts a resumable chunked upload
+class UploadSessionView(APIView):
+    def post(self, request):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        filename = request.data.get('filename')
+        title = request.data.get('title') or filename
+        task_id = request.data.get('task_id')
+        try:
+            total_size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            total_size = 0
+
+        if not filename or total_size <= 0:
+            return Response({'error': 'filename and size are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if total_size > settings.UPLOAD_SESSION_MAX_SIZE:
+            return Response({'error': 'File is too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            task = None
+            if task_id:
+                task = Task.objects.get(task_id=task_id)
+                if not is_member(user, task.project_id_id):
+                    return Response({'error': 'Access denied to this task'}, status=status.HTTP_403_FORBIDDEN)
+
+            session = UploadSession.objects.create(
+                email=user,
+                task_id=task,
+                document_title=title,
+                document_description=request.data.get('description'),
+                doc_type=request.data.get('content_type') or mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                total_size=total_size,
+                sha256=request.data.get('sha256') or '',
+            )
+            return Response(upload_session_data(session), status=status.HTTP_201_CREATED)
+        except (Task.DoesNotExist, ValueError):
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.error(f"Error creating upload session: {str(e)}")
+            return Response({'error': f'Failed to create upload session: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+#View that reports (GET) and appends to (PUT) a chunked upload
+class UploadSessionDetailView(APIView):
+    def get(self, request, upload_id):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        session = UploadSession.objects.filter(upload_id=upload_id, email=user).first()
+        if session is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(upload_session_data(session), status=status.HTTP_200_OK)
+
+    def put(self, request, upload_id):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        if not UploadSession.objects.filter(upload_id=upload_id, email=user).exists():
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Chunk bytes are the raw request body; offset and SHA-256 travel in headers
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Upload-Offset header is required'}, status=status.HTTP_400_BAD_REQUEST)
+        checksum = request.headers.get('Upload-Checksum', '')
+        if length <= 0 or not checksum:
+            return Response({'error': 'A non-empty chunk and Upload-Checksum header are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.UPLOAD_SESSION_CHUNK_SIZE:
+            return Response({'error': f'Chunks may not exceed {settings.UPLOAD_SESSION_CHUNK_SIZE} bytes'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            session = write_chunk(upload_id, request.stream, offset, length, checksum)
+            return Response(upload_session_data(session), status=status.HTTP_200_OK)
+        except UploadError as e:
+            session = UploadSession.objects.get(upload_id=upload_id)
+            return Response({'error': str(e), **upload_session_data(session)}, status=e.status_code)
+        except Exception as e:
+            logger.error(f"Error writing upload chunk: {str(e)}")
+            return Response({'error': f'Failed to write chunk: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+#View that turns a fully received chunked upload into a Document
+class FinalizeUploadSessionView(APIView):
+    def post(self, request, upload_id):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        if not UploadSession.objects.filter(upload_id=upload_id, email=user).exists():
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            session = finalize(upload_id)
+            serializer = DocumentSerializer(session.document)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except UploadError as e:
+            session = UploadSession.objects.get(upload_id=upload_id)
+            return Response({'error': str(e), **upload_session_data(session)}, status=e.status_code)
+        except Exception as e:
+            logger.error(f"Error finalizing upload: {str(e)}")
+            return Response({'error': f'Failed to finalize upload: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 #View that deletes documents
 class DeleteDocumentView(APIView):
     def delete(self, request, document_id):
@@ -1070,7 +1206,7 @@ class DeleteDocumentView(APIView):
             # Verify user has access if document is associated with a task/project
             if document.task_id:
                 project = document.task_id.project_id
-                if not UserProject.objects.filter(email=user, project_id=project).exists():
+                if not is_member(user, project):
                     logger.error(f"User {user.email} does not have access to project {project.project_id}")
                     return Response({'error': 'Access denied to this document'}, status=status.HTTP_403_FORBIDDEN)
 
@@ -1095,38 +1231,7 @@ class GetCompletedTasksView(APIView):
             if not requested_project_id:
                 return Response({'error': 'Project ID is required'}, status=status.HTTP_400_BAD_REQUEST)
             project = Project.objects.get(project_id=requested_project_id)
-            tasks = Task.objects.filter(project_id=project, task_status='Completed')
-            task_members = User_Task.objects.filter(task_id__in=tasks).select_related('email', 'task_id')
-            task_members_dict = {}
-            for task_member in task_members:
-                task_id = task_member.task_id.task_id
-                try:
-                    user = User.objects.get(email=task_member.email.email)
-                    # Initialize list for task_id if it doesn't exist
-                    if task_id not in task_members_dict:
-                        task_members_dict[task_id] = []
-                    # Append user details to the list for this task_id
-                    task_members_dict[task_id].append({
-                        'fname': user.first_name,
-                        'lname': user.last_name
-                    })
-                except User.DoesNotExist:
-                    # Handle case where user is not found (optional)
-                    if task_id not in task_members_dict:
-                        task_members_dict[task_id] = []
-                    task_members_dict[task_id].append({'fname': 'Unknown', 'lname': 'Unknown'})
-            tasks_list = [
-                {
-                    'task_id': task.task_id,
-                    'task_name': task.task_name,
-                    'task_description': task.task_description,
-                    'task_status': task.task_status,
-                    'task_due_date': task.task_due_date.strftime('%d/%m/%Y') if task.task_due_date else 'No due date',
-                    'task_priority': task.task_priority,
-                    'assigned_members': task_members_dict.get(task.task_id, [])
-                }
-                for task in tasks
-            ]
+            tasks_list, task_members_dict = tasks_with_members(project, 'Completed')
             return Response({'tasks': tasks_list, 'members': task_members_dict}, status=status.HTTP_200_OK)
         except Project.DoesNotExist:
             return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -1144,47 +1249,15 @@ class GetFinalizedTasksView(APIView):
             # Fetch the project
             project = Project.objects.get(project_id=requested_project_id)
             
-            # Get all tasks for the project
-            all_tasks = Task.objects.filter(project_id=project)
-            # Get only finalized tasks
-            finalized_tasks = all_tasks.filter(task_status='Finalized')
-            
-            # Check if all tasks are finalized
-            if all_tasks.count() != finalized_tasks.count():
+            # Check if all tasks are finalized (from the materialized counters)
+            counters = get_project_counters(project)
+            if counters.total_tasks != counters.finalized_tasks:
                 return Response(
                     {'error': 'Not all tasks are finalized'},
                 )
             
             # If all tasks are finalized, proceed with the original logic
-            task_members = User_Task.objects.filter(task_id__in=finalized_tasks).select_related('email', 'task_id')
-            task_members_dict = {}
-            for task_member in task_members:
-                task_id = task_member.task_id.task_id
-                try:
-                    user = User.objects.get(email=task_member.email.email)
-                    if task_id not in task_members_dict:
-                        task_members_dict[task_id] = []
-                    task_members_dict[task_id].append({
-                        'fname': user.first_name,
-                        'lname': user.last_name
-                    })
-                except User.DoesNotExist:
-                    if task_id not in task_members_dict:
-                        task_members_dict[task_id] = []
-                    task_members_dict[task_id].append({'fname': 'Unknown', 'lname': 'Unknown'})
-            
-            tasks_list = [
-                {
-                    'task_id': task.task_id,
-                    'task_name': task.task_name,
-                    'task_description': task.task_description,
-                    'task_status': task.task_status,
-                    'task_due_date': task.task_due_date.strftime('%d/%m/%Y') if task.task_due_date else 'No due date',
-                    'task_priority': task.task_priority,
-                    'assigned_members': task_members_dict.get(task.task_id, [])
-                }
-                for task in finalized_tasks
-            ]
+            tasks_list, task_members_dict = tasks_with_members(project, 'Finalized')
             
             return Response(
                 {'tasks': tasks_list, 'members': task_members_dict},
@@ -1198,7 +1271,12 @@ class GetFinalizedTasksView(APIView):
         
 # API endpoint to fetch chat history for a specific project.
 # Requires authentication via JWT token.
-# Query param: project_id (required)
+# Query params: project_id (required)
+#   after=<message id>  -> only messages newer than that message (incremental polling)
+#   before=<message id> -> the page of messages just older than that message
+#   limit=<n>           -> page size; with no cursor returns the latest n messages
+# Without after/before/limit the full history is returned.
+# Pages are keyset-paginated on (sent_at, chat_message_id) and always ordered oldest first.
 # Returns: List of messages with sender details, content, and timestamp.
 class GetProjectChatView(APIView):
 
@@ -1207,6 +1285,19 @@ class GetProjectChatView(APIView):
         project_id = request.GET.get('project_id')
         if not project_id:
             return Response({'error': 'Project ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        after = request.GET.get('after')
+        before = request.GET.get('before')
+        limit = request.GET.get('limit')
+        try:
+            after = int(after) if after else None
+            before = int(before) if before else None
+            limit = int(limit) if limit else None
+        except ValueError:
+            return Response({'error': 'after, before and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        paginated = after is not None or before is not None or limit is not None
+        if paginated:
+            limit = max(1, min(limit or CHAT_PAGE_SIZE, CHAT_MAX_PAGE_SIZE))
         
         # Authenticate user from token
         user = get_user_from_token(request)
@@ -1218,30 +1309,58 @@ class GetProjectChatView(APIView):
             project = Project.objects.get(project_id=project_id)
             
             # Check if user has access to the project
-            if not UserProject.objects.filter(email=user, project_id=project).exists():
+            if not is_member(user, project):
                 logger.error(f"User {user.email} does not have access to project {project_id}")
                 return Response({'error': 'Access denied to this project'}, status=status.HTTP_403_FORBIDDEN)
             
-            # Fetch project chats, ordered by message sent_at
-            project_chats = ProjectChat.objects.filter(project_id=project).order_by('chat_message__sent_at').select_related('chat_message', 'chat_message__email')
-            
-            # Extract messages from project chats
-            messages = [pc.chat_message for pc in project_chats]
-            
-            # Serialize messages with sender name and time
-            serialized_messages = [
-                {
-                    'id': msg.chat_message_id,
-                    'sender_email': msg.email.email,
-                    'sender_name': f"{msg.email.first_name} {msg.email.last_name}",
-                    'content': msg.content,
-                    'sent_at': msg.sent_at.astimezone(ZoneInfo('Africa/Johannesburg')).strftime('%Y-%m-%d %H:%M:%S'),  # Converted to SAST
-                    'role': msg.Role  # Include the Role field from the updated model
-                }
-                for msg in messages
-            ]
+            project_chats = ProjectChat.objects.filter(project_id=project).select_related('chat_message', 'chat_message__email')
+
+            # Keyset filters: the cursor's sent_at is looked up inside the same query. A cursor
+            # message that was deleted meanwhile falls back to the id order, so polling never stalls
+            if after is not None:
+                project_chats = project_chats.alias(
+                    after_sent_at=Subquery(ChatMessage.objects.filter(chat_message_id=after).values('sent_at')[:1])
+                ).filter(
+                    Q(chat_message__sent_at__gt=F('after_sent_at')) |
+                    Q(chat_message__sent_at=F('after_sent_at'), chat_message_id__gt=after) |
+                    Q(after_sent_at__isnull=True, chat_message_id__gt=after)
+                )
+            if before is not None:
+                project_chats = project_chats.alias(
+                    before_sent_at=Subquery(ChatMessage.objects.filter(chat_message_id=before).values('sent_at')[:1])
+                ).filter(
+                    Q(chat_message__sent_at__lt=F('before_sent_at')) |
+                    Q(chat_message__sent_at=F('before_sent_at'), chat_message_id__lt=before) |
+                    Q(before_sent_at__isnull=True, chat_message_id__lt=before)
+                )
+
+            has_more = False
+            if not paginated:
+                messages = [pc.chat_message for pc in project_chats.order_by('chat_message__sent_at', 'chat_message_id')]
+            elif after is not None:
+                # Oldest messages after the cursor first, so clients can keep polling forward
+                page = list(project_chats.order_by('chat_message__sent_at', 'chat_message_id')[:limit + 1])
+                has_more = len(page) > limit
+                messages = [pc.chat_message for pc in page[:limit]]
+            else:
+                # Latest messages (before the cursor, if any), returned oldest first
+                page = list(project_chats.order_by('-chat_message__sent_at', '-chat_message_id')[:limit + 1])
+                has_more = len(page) > limit
+                messages = [pc.chat_message for pc in reversed(page[:limit])]
+            
+            # Serialize messages with sender name and time (SAST)
+            serialized_messages = [serialize_chat_message(msg) for msg in messages]
+
+            response_data = {'messages': serialized_messages}
+            if paginated:
+                response_data.update({
+                    'has_more': has_more,
+                    # Poll with ?after=<next_cursor> for new messages, page back with ?before=<prev_cursor>
+                    'next_cursor': serialized_messages[-1]['id'] if serialized_messages else after,
+                    'prev_cursor': serialized_messages[0]['id'] if serialized_messages else before,
+                })
             
-            return Response({'messages': serialized_messages}, status=status.HTTP_200_OK)
+            return Response(response_data, status=status.HTTP_200_OK)
         
         except Project.DoesNotExist:
             logger.error(f"Project not found: project_id={project_id}")
@@ -1276,9 +1395,8 @@ class SendChatMessageView(APIView):
             project = Project.objects.get(project_id=project_id)
             
             # Check if user has access to the project and get role
-            try:
-                user_project = UserProject.objects.get(email=user, project_id=project)
-            except UserProject.DoesNotExist:
+            role = get_role(user, project)
+            if role is None:
                 logger.error(f"User {user.email} does not have access to project {project_id}")
                 return Response({'error': 'Access denied to this project'}, status=status.HTTP_403_FORBIDDEN)
             
@@ -1287,7 +1405,7 @@ class SendChatMessageView(APIView):
                 email=user,
                 sent_at=timezone.now(),
                 content=content,
-                Role=user_project.role
+                Role=role
             )
             
             # Create ProjectChat entry to associate with project
@@ -1295,6 +1413,9 @@ class SendChatMessageView(APIView):
                 project_id=project,
                 chat_message=message
             )
+
+            # Push to open chat streams once the message is committed
+            transaction.on_commit(lambda: publish_chat_message(project.project_id, message))
             
             logger.info(f"Message sent by {user.email} to project {project_id}")
             return Response({'message': 'Chat message sent successfully', 'id': message.chat_message_id}, status=status.HTTP_201_CREATED)
@@ -1307,6 +1428,86 @@ class SendChatMessageView(APIView):
             logger.error(f"Error sending chat message: {str(e)}")
             return Response({'error': f'Failed to send chat message: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)   
 
+def _missed_chat_messages(project_id, last_id):
+    """One page of the messages a reconnecting stream missed after last_id, oldest first"""
+    project_chats = (
+        ProjectChat.objects.filter(project_id=project_id, chat_message_id__gt=last_id)
+        .select_related('chat_message', 'chat_message__email')
+        .order_by('chat_message_id')[:CHAT_MAX_PAGE_SIZE]
+    )
+    return [serialize_chat_message(pc.chat_message) for pc in project_chats]
+
+class ChatStreamResponse(StreamingHttpResponse):
+    """Event stream that also drops its hub subscription when the server closes the response"""
+    def __init__(self, *args, on_close=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    def close(self):
+        super().close()
+        if self.on_close:
+            self.on_close()
+
+# Server-Sent Events stream of new chat messages for a project (serve through pcp_backend.asgi).
+# EventSource cannot send headers, so the JWT may also be passed as ?token=.
+# Query params: project_id (required), after=<message id> (optional, Last-Event-ID header takes precedence)
+# Missed messages are replayed first, then new ones are pushed as they are sent.
+# Idle streams only receive heartbeat comments and never touch the database.
+@require_http_methods(["GET"])
+async def project_chat_stream(request):
+    project_id = request.GET.get('project_id')
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    try:
+        project_id = int(project_id)
+        last_id = int(last_id) if last_id else None
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'A numeric project_id is required'}, status=400)
+
+    user = await sync_to_async(get_user_from_token)(request, allow_query_param=True)
+    if not user:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    if not await sync_to_async(is_member)(user, project_id):
+        return JsonResponse({'error': 'Access denied to this project'}, status=403)
+
+    get_backend().ensure_listening()
+    # Subscribe before replaying so nothing sent in between is lost
+    subscription = hub.subscribe(project_id)
+    heartbeat = getattr(settings, 'CHAT_STREAM_HEARTBEAT', 15)
+
+    async def event_stream():
+        try:
+            yield 'retry: 3000\n\n'
+            last_sent = last_id
+            if last_id is not None:
+                # Page through the whole backlog; the live loop only starts after the newest missed message
+                while True:
+                    page = await sync_to_async(_missed_chat_messages)(project_id, last_sent)
+                    for payload in page:
+                        last_sent = payload['id']
+                        yield format_event(payload)
+                    if len(page) < CHAT_MAX_PAGE_SIZE:
+                        break
+            while True:
+                try:
+                    payload = await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if payload is None:
+                    break  # Fell too far behind; the client reconnects and catches up
+                if last_sent is not None and payload['id'] <= last_sent:
+                    continue
+                last_sent = payload['id']
+                yield format_event(payload)
+        finally:
+            hub.unsubscribe(subscription)
+
+    # Also drop the subscription when the server closes the response (client went away)
+    response = ChatStreamResponse(event_stream(), content_type='text/event-stream', on_close=lambda: hub.unsubscribe(subscription))
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 #View that update project name,description and due date
 class UpdateProjectDetailsView(APIView):
     def post(self, request):
@@ -1330,14 +1531,13 @@ class UpdateProjectDetailsView(APIView):
             project = Project.objects.get(project_id=project_id)
             
             # Check if user has access and is Supervisor
-            try:
-                user_project = UserProject.objects.get(email=user, project_id=project)
-                if user_project.role != 'Supervisor':
-                    logger.error(f"User {user.email} is not a supervisor for project {project_id}")
-                    return Response({'error': 'Only supervisors can update project details'}, status=status.HTTP_403_FORBIDDEN)
-            except UserProject.DoesNotExist:
+            role = get_role(user, project)
+            if role is None:
                 logger.error(f"User {user.email} does not have access to project {project_id}")
                 return Response({'error': 'Access denied to this project'}, status=status.HTTP_403_FORBIDDEN)
+            if role != 'Supervisor':
+                logger.error(f"User {user.email} is not a supervisor for project {project_id}")
+                return Response({'error': 'Only supervisors can update project details'}, status=status.HTTP_403_FORBIDDEN)
 
             if name:
                 project.project_name = name
@@ -1424,16 +1624,18 @@ class UpdateProfileView(APIView):
             if security_question:
                 user.security_question = security_question
             if security_answer:
-                hashed_security_answer = bcrypt.hashpw(security_answer.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                user.security_answer = hashed_security_answer
+                user.security_answer = hash_password(security_answer)
             if password:
-                hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                user.password = hashed_password
+                user.password = hash_password(password)
 
             user.save()
+            if password:
+                rotate_feed_key(user)  # Calendar feed URLs must not outlive the old password
             logger.info(f"Profile updated successfully for user {user.email}")
             return Response({'message': 'Profile updated successfully'}, status=status.HTTP_200_OK)
 
+        except HashingPoolBusy:
+            return busy_response()
         except Exception as e:
             logger.error(f"Error updating profile for {user.email}: {str(e)}")
             return Response({'error': f'Failed to update profile: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1448,35 +1650,53 @@ class CreateNotificationView(APIView):
         emails = request.data.get('emails', [])
         title = request.data.get('title', '')
         message = request.data.get('message', '')
+        project_id = request.data.get('project_id')  # Optional: the project the notification is about
 
         if not emails or not title or not message:
             return Response({'error': 'emails, title, and message are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if project_id is not None:
+            try:
+                project_id = int(project_id)
+            except (TypeError, ValueError):
+                return Response({'error': 'project_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            if not is_member(user, project_id):
+                return Response({'error': 'Access denied to this project'}, status=status.HTTP_403_FORBIDDEN)
 
         try:
             sast = ZoneInfo('Africa/Johannesburg')
             current_time = timezone.now().astimezone(sast)
             
-            notification = Notification.objects.create(
-                title=title,
-                message=message,
-                time_sent=current_time
-            )
+            # Valid and invalid recipients come from the same query
+            recipients, invalid_emails = split_recipients(emails)
+            broadcast = len(recipients) > settings.NOTIFICATION_ASYNC_THRESHOLD
 
-            valid_users = User.objects.filter(email__in=emails)
-            created_links = []
-            for valid_user in valid_users:
-                user_notif = UserNotification.objects.create(
-                    email=valid_user,
-                    notif=notification
+            with transaction.atomic():
+                notification = Notification.objects.create(
+                    title=title,
+                    message=message,
+                    time_sent=current_time,
+                    project_id=project_id
                 )
-                created_links.append(user_notif.user_notification_id)
+                notif_id = notification.notif_id
+                if broadcast:
+                    # Large broadcasts are linked by a background worker once the notification is committed
+                    transaction.on_commit(lambda: background.submit(fan_out, notif_id, recipients))
+                else:
+                    created_links = fan_out(notif_id, recipients)
+
+            if broadcast:
+                return Response({
+                    'message': 'Notification queued for delivery',
+                    'notification_id': notif_id,
+                    'recipients': len(recipients),
+                    'invalid_emails': invalid_emails
+                }, status=status.HTTP_202_ACCEPTED)
 
-            invalid_emails = set(emails) - set(valid_users.values_list('email', flat=True))
             if invalid_emails:
                 return Response({
                     'message': 'Notification created, but some emails were invalid',
                     'created_links': created_links,
-                    'invalid_emails': list(invalid_emails)
+                    'invalid_emails': invalid_emails
                 }, status=status.HTTP_201_CREATED)
 
             return Response({
@@ -1524,34 +1744,101 @@ class DeleteNotificationView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-#View that fetches all notifications for a user        
+#View that fetches a page of the user's notifications, newest first
+# Query params:
+#   before=<notif id> -> the page of notifications just older than that one
+#   limit=<n>         -> page size (default NOTIFICATION_PAGE_SIZE)
+#   unread=true       -> only unread notifications
+# Pages are keyset-paginated on (time_sent, notif_id); follow next_cursor while has_more is true.
 class GetUserNotificationsView(APIView):
     def get(self, request):
         user = get_user_from_token(request)
         if not user:
             return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        
+
+        try:
+            before = int(request.GET['before']) if request.GET.get('before') else None
+            limit = int(request.GET['limit']) if request.GET.get('limit') else NOTIFICATION_PAGE_SIZE
+        except ValueError:
+            return Response({'error': 'before and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, NOTIFICATION_MAX_PAGE_SIZE))
+        unread_only = request.GET.get('unread', '').lower() in ('1', 'true')
+
         try:
-            # Fetch all notifications for the user
             user_notifications = UserNotification.objects.filter(email=user).select_related('notif')
+            if unread_only:
+                user_notifications = user_notifications.filter(is_read=False)
+            if before is not None:
+                # Keyset filter: the cursor's time_sent is looked up inside the same query. A cursor
+                # that was deleted meanwhile falls back to the id order instead of ending the paging
+                user_notifications = user_notifications.alias(
+                    cursor_time_sent=Subquery(Notification.objects.filter(notif_id=before).values('time_sent')[:1])
+                ).filter(
+                    Q(notif__time_sent__lt=F('cursor_time_sent')) |
+                    Q(notif__time_sent=F('cursor_time_sent'), notif_id__lt=before) |
+                    Q(cursor_time_sent__isnull=True, notif_id__lt=before)
+                )
+            page = list(user_notifications.order_by('-notif__time_sent', '-notif_id')[:limit + 1])
+            has_more = len(page) > limit
+
+            sast = ZoneInfo('Africa/Johannesburg')
             notifications = [
                 {
                     'id': un.notif.notif_id,
                     'title': un.notif.title,
                     'message': un.notif.message,
-                    'time_sent': un.notif.time_sent.astimezone(ZoneInfo('Africa/Johannesburg')).strftime('%Y-%m-%d %H:%M:%S')
-                } for un in user_notifications
+                    'time_sent': un.notif.time_sent.astimezone(sast).strftime('%Y-%m-%d %H:%M:%S'),
+                    'is_read': un.is_read
+                } for un in page[:limit]
             ]
-            
+
             return Response({
                 'notifications': notifications,
-                'count': len(notifications)
+                'count': len(notifications),
+                'unread_count': unread_count(user),
+                'has_more': has_more,
+                'next_cursor': notifications[-1]['id'] if has_more else None
             }, status=status.HTTP_200_OK)
-        
+
         except Exception as e:
             logger.error(f"Error fetching notifications: {str(e)}")
             return Response({'error': f'Failed to fetch notifications: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+#View that returns the number of unread notifications (for the notification bell)
+class GetUnreadNotificationCountView(APIView):
+    def get(self, request):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response({'unread_count': unread_count(user)}, status=status.HTTP_200_OK)
+
+#View that marks notifications as read: the given notif_ids, or all of them when none are given
+class MarkNotificationsReadView(APIView):
+    def post(self, request):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        notif_ids = request.data.get('notif_ids')
+        if notif_ids is not None:
+            if not isinstance(notif_ids, list):
+                return Response({'error': 'notif_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                notif_ids = [int(notif_id) for notif_id in notif_ids]
+            except (TypeError, ValueError):
+                return Response({'error': 'notif_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            updated = mark_read(user, notif_ids)
+            return Response({
+                'message': 'Notifications marked as read',
+                'updated': updated,
+                'unread_count': unread_count(user)
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f"Error marking notifications read for {user.email}: {str(e)}")
+            return Response({'error': f'Failed to mark notifications as read: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 #View that marks a task as completed
 class CompleteTaskView(APIView):
     def post(self, request):
@@ -1617,7 +1904,7 @@ class GetTaskMembersView(APIView):
             task = Task.objects.get(task_id=task_id)
             
             # Verify user has access to the project
-            if not UserProject.objects.filter(email=user, project_id=task.project_id).exists():
+            if not is_member(user, task.project_id_id):
                 return Response({'error': 'Access denied to this project'}, status=status.HTTP_403_FORBIDDEN)
             
             task_members = User_Task.objects.filter(task_id=task).select_related('email')
@@ -1667,11 +1954,12 @@ class AddTaskMemberView(APIView):
         task = Task.objects.get(task_id=task_id)
         user = User.objects.get(email=email)
 
-        job = User_Task.objects.create(task_id=task, email=user)
-        job.save()
+        User_Task.objects.get_or_create(task_id=task, email=user)
         return Response({'message': 'Task member added successfully'}, status=status.HTTP_200_OK)
 
 #View that deletes a project and all related data
+# The project is hidden at once and deleted by a background job (see project_deletion.py);
+# poll the returned status_url for progress.
 class DeleteProjectView(APIView):
     def delete(self, request, project_id):
         user = get_user_from_token(request)
@@ -1680,52 +1968,20 @@ class DeleteProjectView(APIView):
 
         try:
             # Fetch project
-            project = Project.objects.get(project_id=project_id)
+            project = Project.objects.get(project_id=project_id, is_deleted=False)
 
             # Verify user has access (only supervisors or group leaders can delete)
-            if not UserProject.objects.filter(email=user, project_id=project).exists():
+            if not is_member(user, project):
                 return Response({'error': 'Access denied to this project'}, status=status.HTTP_403_FORBIDDEN)
 
-            with transaction.atomic():
-                #STEP 1: Delete related project chats ---
-                project_chats = ProjectChat.objects.filter(project_id=project)
-                chat_message_ids = list(project_chats.values_list('chat_message_id', flat=True))
-                
-                # Delete project chat mapping first
-                deleted_chats_count, _ = project_chats.delete()
-                
-                # Then delete related chat messages
-                deleted_messages_count, _ = ChatMessage.objects.filter(
-                    chat_message_id__in=chat_message_ids
-                ).delete()
-
-                #Delete related tasks and documents ---
-                task_ids = list(Task.objects.filter(project_id=project).values_list('task_id', flat=True))
-                Document.objects.filter(task_id__in=task_ids).delete()
-                User_Task.objects.filter(task_id__in=task_ids).delete()
-                Task.objects.filter(project_id=project).delete()
-
-                #Delete related project links, meetings, and user-project links ---
-                ProjectLinks.objects.filter(project=project).delete()
-                Meeting.objects.filter(project_id=project).delete()
-                UserProject.objects.filter(project_id=project).delete()
-
-                #Delete related notifications (if any) ---
-                notif_ids = list(Notification.objects.filter(message__icontains=project.project_name).values_list('notif_id', flat=True))
-                UserNotification.objects.filter(notif_id__in=notif_ids).delete()
-                Notification.objects.filter(notif_id__in=notif_ids).delete()
-
-                #Delete the project itself ---
-                project.delete()
-
-            logger.info(
-                f"Project {project_id} and all related data deleted "
-                f"(Chats: {deleted_chats_count}, Messages: {deleted_messages_count}) by {user.email}"
-            )
+            job = start_deletion(project, user)
+            logger.info(f"Deletion of project {project_id} queued as job {job.job_id} by {user.email}")
 
             return Response({
-                'message': f'Project {project.project_name} and all related data deleted successfully.'
-            }, status=status.HTTP_200_OK)
+                'message': f'Project {project.project_name} is being deleted.',
+                'job_id': str(job.job_id),
+                'status_url': f'/api/projectdeletion/{job.job_id}/'
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Project.DoesNotExist:
             return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -1734,6 +1990,18 @@ class DeleteProjectView(APIView):
             logger.error(f"Error deleting project {project_id}: {str(e)}")
             return Response({'error': f'Failed to delete project: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+#View that reports the progress of a background project deletion to the user who requested it
+class ProjectDeletionStatusView(APIView):
+    def get(self, request, job_id):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        job = ProjectDeletionJob.objects.filter(job_id=job_id, requested_by=user).first()
+        if job is None:
+            return Response({'error': 'Deletion job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job_progress(job), status=status.HTTP_200_OK)
+
 #View that changes role of a user in a project
 class ChangeRoleView(APIView):
     def post(self, request):
@@ -1783,7 +2051,7 @@ class ChangeRoleView(APIView):
             if (new_role == 'Group Leader'):
                 get_member = User.objects.get(email=member_email)
                 get_final_submission = Task.objects.get(task_name='Final Submission', project_id=project_id)
-                assign_task = User_Task.objects.create(task_id=get_final_submission, email=get_member)
+                User_Task.objects.get_or_create(task_id=get_final_submission, email=get_member)
 
             logger.info(f"Role changed for {member_email} in project {project_id} to {new_role} by {requester.email}")
             return Response({'message': 'Role changed successfully'}, status=status.HTTP_200_OK)
@@ -1964,7 +2232,7 @@ class VerifySecurityAnswerView(APIView):
 
         try:
             user = User.objects.get(email=email)
-            if not bcrypt.checkpw(security_answer.encode('utf-8'), user.security_answer.encode('utf-8')):
+            if not check_password(security_answer, user.security_answer):
                 logger.warning(f"Invalid security answer provided for user {email}")
                 return Response({'error': 'Invalid security answer'}, status=status.HTTP_401_UNAUTHORIZED)
             else:
@@ -1975,6 +2243,9 @@ class VerifySecurityAnswerView(APIView):
             logger.warning(f"Security answer verification attempted for non-existent email: {email}")
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         
+        except HashingPoolBusy:
+            return busy_response()
+        
         except Exception as e:
             logger.error(f"Error verifying security answer: {str(e)}")
             return Response({'error': f'Failed to verify security answer: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1994,9 +2265,9 @@ class ResetPasswordView(APIView):
             user = User.objects.get(email=email)
             
             # Hash the new password
-            hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            user.password = hashed_password
+            user.password = hash_password(new_password)
             user.save()
+            rotate_feed_key(user)  # Calendar feed URLs must not outlive the old password
             
             logger.info(f"Password reset successfully for user {email}")
             return Response({'message': 'Password reset successfully'}, status=status.HTTP_200_OK)
@@ -2005,6 +2276,9 @@ class ResetPasswordView(APIView):
             logger.warning(f"Password reset attempted for non-existent email: {email}")
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         
+        except HashingPoolBusy:
+            return busy_response()
+        
         except Exception as e:
             logger.error(f"Error resetting password: {str(e)}")
             return Response({'error': f'Failed to reset password: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)        
@@ -2018,8 +2292,8 @@ class GetContributionsView(APIView):
         
         token = auth_header.split(' ')[1]
         try:
-            # Validate token (assuming UntypedToken from your JWT setup)
-            payload = UntypedToken(token).payload
+            # Validate token (cached per token id)
+            resolve_user(token)
         except Exception:
             return Response({'error': 'Invalid token'}, status=status.HTTP_401_UNAUTHORIZED)
 
@@ -2079,18 +2353,14 @@ class GetUserMeetingsView(APIView):
         
         token = auth_header.split(' ')[1]
         try:
-            # Validate token
-            payload = UntypedToken(token).payload
-            user_email = payload.get('user_email')
-            
-            # Fetch user
+            # Validate token and fetch user
             try:
-                user = User.objects.get(email=user_email)
+                user = resolve_user(token)
             except User.DoesNotExist:
                 return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
             
             # Get user's projects
-            user_projects = UserProject.objects.filter(email=user).values_list('project_id__project_id', flat=True)
+            user_projects = member_project_ids(user)
             
             # Get meetings for those projects
             meetings = Meeting.objects.filter(project_id__in=user_projects).select_related('project_id').order_by('date_time')
@@ -2114,6 +2384,15 @@ class GetUserMeetingsView(APIView):
             return Response({'error': f'Failed to fetch meetings: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class GetProjectMeetingsView(APIView):
+    def meetings_list(self, project):
+        meetings_list = list(Meeting.objects.filter(project_id=project).order_by('date_time').values(
+            'meeting_id', 'meeting_title', 'date_time'
+        ))
+        for meeting in meetings_list:
+            meeting['date'] = meeting['date_time'].strftime('%Y-%m-%d')
+            meeting['time'] = meeting['date_time'].strftime('%H:%M')
+        return meetings_list
+
     def get(self, request):
         project_id = request.GET.get('project_id')
         if not project_id:
@@ -2126,19 +2405,18 @@ class GetProjectMeetingsView(APIView):
         try:
             project = Project.objects.get(project_id=project_id)
             
-            if not UserProject.objects.filter(email=user, project_id=project).exists():
+            if not is_member(user, project):
                 return Response({'error': 'Access denied to this project'}, status=status.HTTP_403_FORBIDDEN)
+
+            etag = project_etag(project.project_id, project.version, 'meetings')
+            cached = not_modified_response(request, etag)
+            if cached:
+                return cached
             
-            meetings = Meeting.objects.filter(project_id=project).order_by('date_time').values(
-                'meeting_id', 'meeting_title', 'date_time'
-            )
-            
-            meetings_list = list(meetings)
-            for meeting in meetings_list:
-                meeting['date'] = meeting['date_time'].strftime('%Y-%m-%d')
-                meeting['time'] = meeting['date_time'].strftime('%H:%M')
-            
-            return Response({'meetings': meetings_list}, status=status.HTTP_200_OK)
+            meetings_list, hit = cached_payload(project.project_id, project.version, 'meetings', lambda: self.meetings_list(project))
+            response = tag_response(Response({'meetings': meetings_list}, status=status.HTTP_200_OK), etag)
+            response['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
         
         except Project.DoesNotExist:
             return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -2147,19 +2425,47 @@ class GetProjectMeetingsView(APIView):
             logger.error(f"Error fetching project meetings: {str(e)}")
             return Response({'error': f'Failed to fetch meetings: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# GET (?projectId=) lets browsers revalidate with If-None-Match; POST is kept for existing callers
 class GetProjectLinksView(APIView):
+    def get(self, request):
+        return self.links_response(request, request.query_params.get('projectId') or request.query_params.get('project_id'))
+
     def post(self, request):
-        project_id = request.data.get('projectId')
+        return self.links_response(request, request.data.get('projectId'))
+
+    def links_response(self, request, project_id):
         if not project_id:
             return Response({'error': 'Project ID is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
             project = Project.objects.get(project_id=project_id)
-            links = ProjectLinks.objects.filter(project=project)
-            link_list = [{'link_id': l.link_id, 'project_id': project_id, 'link_url': l.link_url, 'link_name': l.link_name} for l in links]
-
-            return Response({'links': link_list}, status=status.HTTP_200_OK)
+            etag = project_etag(project.project_id, project.version, 'links')
+            cached = not_modified_response(request, etag)
+            if cached:
+                return cached
+
+            link_list, hit = cached_payload(project.project_id, project.version, 'links', lambda: [
+                {'link_id': l.link_id, 'project_id': project.project_id, 'link_url': l.link_url, 'link_name': l.link_name}
+                for l in ProjectLinks.objects.filter(project=project)
+            ])
+            response = tag_response(Response({'links': link_list}, status=status.HTTP_200_OK), etag)
+            response['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
         except Project.DoesNotExist:
             return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Runs several API calls in one round trip, e.g. everything the project page loads on open
+class BatchView(APIView):
+    def post(self, request):
+        user = get_user_from_token(request)
+        if not user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            items = parse_batch(request.data)
+        except BatchError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'responses': run_batch(request._request, user, items)}, status=status.HTTP_200_OK)
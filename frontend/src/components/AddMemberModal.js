@@ -76,6 +76,7 @@ const AddMembermodal = ({ isOpen, onClose, projectId, projectName }) => {
                 `${API_BASE_URL}/api/createnotification/`,
                 {
                     emails: [email], // Send only to the added member
+                    project_id: projectId,
                     title: 'Added to Project',
                     message: `${loggedInEmail} added you to project "${projectName}" as a ${role}.`,
                 },
@@ -55,9 +55,8 @@ const AddTaskModal = ({ isOpen, onClose, projectId, projectName, onSuccess }) =>
         return;
       }
 
-      const response = await axios.post(
-        `${API_BASE_URL}/api/getmembers/`,
-        { projectId },
+      const response = await axios.get(
+        `${API_BASE_URL}/api/getmembers/?projectId=${projectId}`,
         { headers: { Authorization: `Bearer ${token}` } }
       );
       setProjectMembers(response.data.members);
@@ -137,6 +136,7 @@ const AddTaskModal = ({ isOpen, onClose, projectId, projectName, onSuccess }) =>
               `${API_BASE_URL}/api/createnotification/`,
               {
                 emails: taskMembers,
+                project_id: projectId,
                 title: 'Task Assignment',
                 message: `${loggedInEmail} added you to "${taskName}" in project "${projectName}".`,
               },
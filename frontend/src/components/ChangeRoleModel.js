@@ -63,6 +63,7 @@ const ChangeRoleModel = ({ isOpen, onClose, projectId, memberEmail, onUpdate, in
           `${API_BASE_URL}/api/createnotification/`,
           {
             emails: [memberEmail],
+            project_id: projectId,
             title: 'Role Updated',
             message: `${loggedInEmail} changed your role to ${role} in project "${projectName}".`,
           },
@@ -49,11 +49,11 @@ const Dashboard = () => {
         ? "http://127.0.0.1:8000"
         : "https://pcp-backend-f4a2.onrender.com";
 
-    const res = await axios.get(`${API_BASE_URL}/api/getusernotifications/`, {
+    const res = await axios.get(`${API_BASE_URL}/api/unreadnotificationcount/`, {
       headers: { Authorization: `Bearer ${token}` },
     });
 
-    setNotificationCount(res.data.count || (res.data.notifications?.length ?? 0));
+    setNotificationCount(res.data.unread_count ?? 0);
   } catch (err) {
     console.error("Failed to refresh notification count:", err);
   }
@@ -114,10 +114,10 @@ const Dashboard = () => {
 
       setCalendarEvents([...(calendarResponse.data.events || []), ...meetingsEvents]);
 
-      const notificationsResponse = await axios.get(`${API_BASE_URL}/api/getusernotifications/`, {
+      const notificationsResponse = await axios.get(`${API_BASE_URL}/api/unreadnotificationcount/`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setNotificationCount(notificationsResponse.data.count);
+      setNotificationCount(notificationsResponse.data.unread_count);
 
       setError('');
     } catch (err) {
@@ -881,6 +881,7 @@ const Dashboard = () => {
           isOpen={showNotificationModal}
           onClose={() => {setShowNotificationModal(false); refreshNotificationCount();}}
           notificationCount={notificationCount}
+          onRead={refreshNotificationCount}
           buttonPosition={getButtonPosition()}
         />
       )}
@@ -138,7 +138,7 @@ const GroupLeaderDashboard = () => {
                 ? 'http://127.0.0.1:8000'
                 : 'https://pcp-backend-f4a2.onrender.com';
 
-            const response = await axios.post(`${API_BASE_URL}/api/getprojectlinks/`, { projectId }, {
+            const response = await axios.get(`${API_BASE_URL}/api/getprojectlinks/?projectId=${projectId}`, {
                 headers: { Authorization: `Bearer ${token}` },
             });
 
@@ -805,6 +805,7 @@ const GroupLeaderDashboard = () => {
                         `${API_BASE_URL}/api/createnotification/`,
                         {
                             emails: assignedMembers,
+                            project_id: projectId,
                             title: 'Task Deleted',
                             message: `${loggedInEmail} deleted "${taskNameForMsg}" in project "${projectData?.project_name || 'Unknown Project'}".`
                         },
@@ -872,6 +873,7 @@ const GroupLeaderDashboard = () => {
                         `${API_BASE_URL}/api/createnotification/`,
                         {
                             emails: assignedMembers,
+                            project_id: projectId,
                             title: 'Task Rejected',
                             message: `${leaderEmail} rejected "${taskName}" and sent it back for revision in project "${projectData?.project_name || 'Unknown Project'}".`,
                         },
@@ -938,6 +940,7 @@ const GroupLeaderDashboard = () => {
                         `${API_BASE_URL}/api/createnotification/`,
                         {
                             emails: assignedMembers,
+                            project_id: projectId,
                             title: 'Task Finalized',
                             message: `${leaderEmail} approved and finalized "${taskName}" in project "${projectData?.project_name || 'Unknown Project'}".`,
                         },
@@ -1109,9 +1112,8 @@ const GroupLeaderDashboard = () => {
                         ? 'http://127.0.0.1:8000'
                         : 'https://pcp-backend-f4a2.onrender.com';
 
-                    const response = await axios.post(
-                        `${API_BASE_URL}/api/getmembers/`,
-                        { projectId: projectId },
+                    const response = await axios.get(
+                        `${API_BASE_URL}/api/getmembers/?projectId=${projectId}`,
                         { headers: { Authorization: `Bearer ${token}` } }
                     );
 
@@ -1178,9 +1180,8 @@ const GroupLeaderDashboard = () => {
                 return null;
             }
 
-            const response = await axios.post(
-                `${getApiBase()}/api/getmembers/`,
-                { projectId },
+            const response = await axios.get(
+                `${getApiBase()}/api/getmembers/?projectId=${projectId}`,
                 { headers: { Authorization: `Bearer ${token}` } }
             );
 
@@ -146,6 +146,7 @@ const NewProjectModal = ({ onClose, onSuccess }) => {
                 `${API_BASE_URL}/api/createnotification/`,
                 {
                     emails: project_members,
+                    project_id: response.data.project_id,
                     title: 'New Project Created',
                     message: `${email} added you to project "${projectname}".`,
                 },
@@ -1,31 +1,53 @@
-import React, { useState, useEffect, useCallback } from "react";
+import React, { useState, useEffect, useCallback, useRef } from "react";
 import axios from "axios";
 import { FontAwesomeIcon } from "@fortawesome/react-fontawesome";
 import { faChevronRight, faChevronDown } from "@fortawesome/free-solid-svg-icons";
 import styles from "./NotificationModal.module.css";
 
-const NotificationModal = ({ isOpen, onClose, buttonPosition }) => {
+const NotificationModal = ({ isOpen, onClose, buttonPosition, onRead }) => {
   const [notifications, setNotifications] = useState([]);
   const [expanded, setExpanded] = useState({});
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Kept in a ref so a new callback from the parent does not refetch (and reset) the list
+  const onReadRef = useRef(onRead);
+  onReadRef.current = onRead;
+
+  const API_BASE_URL =
+    window.location.hostname === "localhost"
+      ? "http://127.0.0.1:8000"
+      : "https://pcp-backend-f4a2.onrender.com";
+
+  // Opening the modal (or loading more) marks the shown notifications as read
+  const markRead = useCallback(async (shown, token) => {
+    const unreadIds = shown.filter((n) => !n.is_read).map((n) => n.id);
+    if (unreadIds.length === 0) return;
+    try {
+      await axios.post(`${API_BASE_URL}/api/marknotificationsread/`, { notif_ids: unreadIds }, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (onReadRef.current) onReadRef.current();
+    } catch (err) {
+      console.error("Error marking notifications as read:", err);
+    }
+  }, [API_BASE_URL]);
+
+  // Fetch one page of notifications (newest first); `before` continues after the last page
+  const fetchNotifications = useCallback(async (before = null) => {
+    const token = localStorage.getItem("access_token");
+    if (!token) {
+      setError("No authentication token found. Please log in.");
+      return;
+    }
 
-  // Fetch notifications from backend
-  const fetchNotifications = useCallback(async () => {
+    let fetchedNotifications;
     try {
-      const token = localStorage.getItem("access_token");
-      if (!token) {
-        setError("No authentication token found. Please log in.");
-        return;
-      }
-      const API_BASE_URL =
-        window.location.hostname === "localhost"
-          ? "http://127.0.0.1:8000"
-          : "https://pcp-backend-f4a2.onrender.com";
-      const response = await axios.get(`${API_BASE_URL}/api/getusernotifications/`, {
+      const query = before ? `?before=${before}` : "";
+      const response = await axios.get(`${API_BASE_URL}/api/getusernotifications/${query}`, {
         headers: { Authorization: `Bearer ${token}` },
       });
 
-      let fetchedNotifications;
       if (Array.isArray(response.data.notifications)) {
         fetchedNotifications = response.data.notifications;
       } else if (Array.isArray(response.data)) {
@@ -35,14 +57,24 @@ const NotificationModal = ({ isOpen, onClose, buttonPosition }) => {
       }
 
       fetchedNotifications.sort((a, b) => new Date(b.time_sent) - new Date(a.time_sent));
-      setNotifications(fetchedNotifications);
+      setNotifications((prev) => (before ? [...prev, ...fetchedNotifications] : fetchedNotifications));
+      setNextCursor(response.data.has_more ? response.data.next_cursor : null);
       setError(null);
     } catch (err) {
       console.error("Error fetching notifications:", err);
       setError(err.response?.data?.error || "Failed to fetch notifications.");
-      setNotifications([]);
+      if (!before) setNotifications([]);
+      return;
     }
-  }, []);  // <-- Added empty dependency array
+
+    await markRead(fetchedNotifications, token);
+  }, [API_BASE_URL, markRead]);
+
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    await fetchNotifications(nextCursor);
+    setLoadingMore(false);
+  };
 
   // Fetch notifications whenever the modal opens
   useEffect(() => {
@@ -187,6 +219,15 @@ const NotificationModal = ({ isOpen, onClose, buttonPosition }) => {
                 ))}
               </ul>
 
+              {/* Older notifications, one page at a time */}
+              {nextCursor && (
+                <div className={styles.loadMoreContainer}>
+                  <button className={styles.loadMoreButton} onClick={handleLoadMore} disabled={loadingMore}>
+                    {loadingMore ? "Loading..." : "Load more"}
+                  </button>
+                </div>
+              )}
+
               {/* Remove All button */}
               <div className={styles.removeAllContainer}>
                 <button className={styles.removeAllButton} onClick={handleRemoveAll}>
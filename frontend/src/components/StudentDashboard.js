@@ -211,7 +211,7 @@ const StudentDashboard = () => {
         ? 'http://127.0.0.1:8000'
         : 'https://pcp-backend-f4a2.onrender.com';
 
-      const response = await axios.post(`${API_BASE_URL}/api/getprojectlinks/`, { projectId });
+      const response = await axios.get(`${API_BASE_URL}/api/getprojectlinks/?projectId=${projectId}`);
       setProjectLinks(response.data.links || []);
     } catch (err) {
       console.error('Error fetching links:', err);
@@ -385,7 +385,7 @@ const StudentDashboard = () => {
             ? 'http://127.0.0.1:8000'
             : 'https://pcp-backend-f4a2.onrender.com';
 
-          const response = await axios.post(`${API_BASE_URL}/api/getmembers/`, { projectId }, {
+          const response = await axios.get(`${API_BASE_URL}/api/getmembers/?projectId=${projectId}`, {
             headers: { Authorization: `Bearer ${token}` },
           });
 
@@ -699,9 +699,8 @@ const StudentDashboard = () => {
         return null;
       }
 
-      const response = await axios.post(
-        `${getApiBase()}/api/getmembers/`,
-        { projectId },
+      const response = await axios.get(
+        `${getApiBase()}/api/getmembers/?projectId=${projectId}`,
         { headers: { Authorization: `Bearer ${token}` } }
       );
 
@@ -120,7 +120,7 @@ const SupervisorDashboard = () => {
         ? 'http://127.0.0.1:8000'
         : 'https://pcp-backend-f4a2.onrender.com';
 
-      const response = await axios.post(`${API_BASE_URL}/api/getprojectlinks/`, { projectId });
+      const response = await axios.get(`${API_BASE_URL}/api/getprojectlinks/?projectId=${projectId}`);
       setProjectLinks(response.data.links || []);
     } catch (err) {
       console.error('Error fetching links:', err);
@@ -349,9 +349,8 @@ const SupervisorDashboard = () => {
       //Fetch all members of the project
       let projectMembers = [];
       try {
-        const membersResponse = await axios.post(
-          `${API_BASE_URL}/api/getmembers/`,
-          { projectId },
+        const membersResponse = await axios.get(
+          `${API_BASE_URL}/api/getmembers/?projectId=${projectId}`,
           { headers: { Authorization: `Bearer ${token}` } }
         );
         projectMembers = (membersResponse.data?.members || []).map((m) => m.email).filter(Boolean);
@@ -373,6 +372,7 @@ const SupervisorDashboard = () => {
               `${API_BASE_URL}/api/createnotification/`,
               {
                 emails: filteredRecipients,
+                project_id: projectId,
                 title: 'Project Graded',
                 message: `${supervisorEmail} graded your project "${projectData?.project_name || 'Unknown Project'}" and provided feedback.`,
               },
@@ -526,9 +526,8 @@ const SupervisorDashboard = () => {
       // --- Step 3: Fetch all project members ---
       let projectMembers = [];
       try {
-        const membersResponse = await axios.post(
-          `${API_BASE_URL}/api/getmembers/`,
-          { projectId },
+        const membersResponse = await axios.get(
+          `${API_BASE_URL}/api/getmembers/?projectId=${projectId}`,
           { headers: { Authorization: `Bearer ${token}` } }
         );
         projectMembers = (membersResponse.data?.members || []).map((m) => m.email).filter(Boolean);
@@ -550,6 +549,7 @@ const SupervisorDashboard = () => {
               `${API_BASE_URL}/api/createnotification/`,
               {
                 emails: filteredRecipients,
+                project_id: projectId,
                 title: 'Project Details Updated',
                 message: `${supervisorEmail} updated the details of project "${name}". Please review the latest description and due date.`,
               },
@@ -759,6 +759,7 @@ const SupervisorDashboard = () => {
         `${API_BASE_URL}/api/createnotification/`,
         {
           emails: [email],
+          project_id: projectId,
           title: 'Removed from Project',
           message: `${loggedInEmail} removed you from project "${projectData?.project_name}".`,
         },
@@ -912,9 +913,8 @@ const SupervisorDashboard = () => {
         ? 'http://127.0.0.1:8000'
         : 'https://pcp-backend-f4a2.onrender.com';
 
-      const response = await axios.post(
-        `${API_BASE_URL}/api/getmembers/`,
-        { projectId: projectId },
+      const response = await axios.get(
+        `${API_BASE_URL}/api/getmembers/?projectId=${projectId}`,
         { headers: { Authorization: `Bearer ${token}` } }
       );
 
@@ -1012,9 +1012,8 @@ const SupervisorDashboard = () => {
         return null;
       }
 
-      const response = await axios.post(
-        `${getApiBase()}/api/getmembers/`,
-        { projectId },
+      const response = await axios.get(
+        `${getApiBase()}/api/getmembers/?projectId=${projectId}`,
         { headers: { Authorization: `Bearer ${token}` } }
       );
 
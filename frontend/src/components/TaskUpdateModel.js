@@ -233,9 +233,8 @@ const TaskUpdateModel = ({ isOpen, onClose, projectId, projectName, taskId, onUp
         ? 'http://127.0.0.1:8000'
         : 'https://pcp-backend-f4a2.onrender.com';
 
-      const response = await axios.post(
-        `${API_BASE_URL}/api/getmembers/`,
-        { projectId },
+      const response = await axios.get(
+        `${API_BASE_URL}/api/getmembers/?projectId=${projectId}`,
         { headers: { Authorization: `Bearer ${token}` } }
       );
       setProjectMembers(response.data.members || []);
@@ -335,6 +334,7 @@ const TaskUpdateModel = ({ isOpen, onClose, projectId, projectName, taskId, onUp
           `${API_BASE_URL}/api/createnotification/`,
           {
             emails: [email],
+            project_id: projectId,
             title: 'Added to Task',
             message: `${loggedInEmail} added you to task "${taskName}" in project "${projectName}".`,
           },
@@ -380,6 +380,7 @@ const TaskUpdateModel = ({ isOpen, onClose, projectId, projectName, taskId, onUp
           `${API_BASE_URL}/api/createnotification/`,
           {
             emails: [email],
+            project_id: projectId,
             title: 'Removed from Task',
             message: `${loggedInEmail} removed you from task "${taskName}" in project "${projectName}".`,
           },